@@ -19,6 +19,9 @@ export function createConfig() {
     .map((s) => s.trim())
     .filter(Boolean)
 
+  const scraperWorkerRaw = String(process.env.SCRAPER_RESIDENT_WORKER || '').trim().toLowerCase()
+  const scraperWorkerEnabled = ['1', 'true', 'yes', 'on'].includes(scraperWorkerRaw)
+
   const adminUser = String(process.env.ADMIN_USER || '').trim().toLowerCase()
   const adminPass = String(process.env.ADMIN_PASS || '')
   const runtimeDir = join(serverDir, 'runtime')
@@ -49,7 +52,11 @@ export function createConfig() {
     timetableScraperScript: join(serverDir, 'scripts', 'scraper.py'),
     articlesScraperScript: join(serverDir, 'scripts', 'article_scraper.py'),
     documentsScraperScript: join(serverDir, 'scripts', 'documents_scraper.py'),
+    scraperWorkerScript: join(serverDir, 'scripts', 'scraper_worker.py'),
+    scraperWorkerEnabled,
     timetableFilePath: join(projectRoot, 'public', 'timetable_data.json'),
+    timetableV2FilePath: join(projectRoot, 'public', 'timetable_data.v2.json'),
+    timetableShardsDir: join(projectRoot, 'public', 'timetables'),
     timetableBackupsDir: join(runtimeDir, 'backups', 'timetables'),
     hubBackgroundManifestPath: join(runtimeDir, 'hub-backgrounds.json'),
     hubBackgroundsDir: join(projectRoot, 'public', 'hub-backgrounds'),
@@ -35,6 +35,7 @@ import {
   parseStructuredJobOutput,
   ensurePythonDepsInstalled,
 } from '../lib/command.js'
+import { createScraperRunner } from '../lib/scraperWorker.js'
 import {
   defaultAttendanceState,
   listAttendanceEntriesForUser,
@@ -73,7 +74,12 @@ export function createApp(config) {
     hubVisibilityPath: config.hubVisibilityPath,
     legacyOverridesPath: config.overridesPath,
   })
-  const timetableStore = createTimetableStore({ timetableFilePath: config.timetableFilePath, ttlMs: config.timetableCacheTtlMs })
+  const timetableStore = createTimetableStore({
+    timetableFilePath: config.timetableFilePath,
+    timetableV2FilePath: config.timetableV2FilePath,
+    shardsDir: config.timetableShardsDir,
+    ttlMs: config.timetableCacheTtlMs,
+  })
   const hubBackgroundStore = createHubBackgroundStore({
     manifestPath: config.hubBackgroundManifestPath,
     publicDir: config.publicDir,
@@ -89,6 +95,7 @@ export function createApp(config) {
   }
   const jobsStore = createJobsStore({ ttlMs: config.jobsTtlMs, max: config.jobsMax })
   jobsStore.startCleanupInterval()
+  const runScraperJob = createScraperRunner({ config, runCommand })
   const sessionStore = createSessionStore({
     ttlMs: config.sessionTtlMs,
     cleanupIntervalMs: config.sessionCleanupIntervalMs,
@@ -167,6 +174,7 @@ export function createApp(config) {
 
     detectPythonCommand,
     runCommand,
+    runScraperJob,
     parseStructuredJobOutput,
     ensurePythonDepsInstalled,
 
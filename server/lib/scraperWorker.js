@@ -0,0 +1,112 @@
+import { spawn } from 'node:child_process'
+import { createInterface } from 'node:readline'
+
+function pythonArgs(pythonCmd, script, args = []) {
+  return process.platform === 'win32' && pythonCmd === 'py' ? ['-3', script, ...args] : [script, ...args]
+}
+
+// Rezydentny proces scripts/scraper_worker.py: uruchamiany przy pierwszym zadaniu i trzymany
+// między zadaniami (bez startu interpretera, importów i nowych połączeń TLS). Zadania idą po kolei,
+// a wynik ma ten sam kształt co runCommand ({ code, stdout, stderr, timedOut }). Po timeoucie
+// proces jest zabijany i kolejne zadanie uruchamia nowy.
+export function createScraperWorker({ scriptPath, cwd, killAfterMs = 5000 }) {
+  let child = null
+  let pending = null
+  let queue = Promise.resolve()
+  let seq = 0
+
+  function settle(outcome) {
+    const job = pending
+    if (!job) return
+    pending = null
+    if (job.timeoutHandle) clearTimeout(job.timeoutHandle)
+    if (job.killHandle) clearTimeout(job.killHandle)
+    job.resolve({ code: outcome.code, stdout: job.stdout, stderr: job.stderr + (outcome.stderr || ''), timedOut: job.timedOut })
+  }
+
+  function start(pythonCmd) {
+    const proc = spawn(pythonCmd, pythonArgs(pythonCmd, scriptPath), { cwd, env: process.env })
+    let stderrTail = ''
+    proc.stderr.on('data', (d) => { stderrTail = (stderrTail + d.toString()).slice(-4000) })
+    proc.stdin.on('error', () => {})
+    proc.on('error', (err) => { stderrTail += String(err) })
+    createInterface({ input: proc.stdout }).on('line', (line) => {
+      let message = null
+      try { message = JSON.parse(line) } catch { return }
+      if (!pending || pending.proc !== proc || !message || message.id !== pending.id) return
+      if (message.event === 'log') {
+        if (message.stream === 'stderr') pending.stderr += message.line + '\n'
+        else pending.stdout += message.line + '\n'
+      } else if (message.event === 'result') {
+        // Linia wyniku na końcu stdout - parseStructuredJobOutput działa jak dla osobnego procesu.
+        if (message.result) pending.stdout += JSON.stringify(message.result) + '\n'
+        settle({ code: message.code })
+      }
+    })
+    proc.on('close', (code) => {
+      if (child === proc) child = null
+      if (pending && pending.proc === proc) settle({ code: code ?? 1, stderr: stderrTail })
+    })
+    return proc
+  }
+
+  function runJob(pythonCmd, job, args, timeoutMs) {
+    return new Promise((resolve) => {
+      if (!child) child = start(pythonCmd)
+      const proc = child
+      const id = String(++seq)
+      pending = { id, proc, resolve, stdout: '', stderr: '', timedOut: false, timeoutHandle: null, killHandle: null }
+      if (timeoutMs > 0) {
+        const job = pending
+        job.timeoutHandle = setTimeout(() => {
+          job.timedOut = true
+          try { proc.kill('SIGTERM') } catch {}
+          job.killHandle = setTimeout(() => {
+            try { proc.kill('SIGKILL') } catch {}
+          }, killAfterMs)
+        }, timeoutMs)
+      }
+      proc.stdin.write(JSON.stringify({ id, job, args }) + '\n')
+    })
+  }
+
+  function run(pythonCmd, job, { args = [], timeoutMs = 0 } = {}) {
+    const result = queue.then(() => runJob(pythonCmd, job, args, timeoutMs))
+    queue = result.catch(() => {})
+    return result
+  }
+
+  function close() {
+    if (!child) return
+    try { child.stdin.end() } catch {}
+    child = null
+  }
+
+  return { run, close }
+}
+
+// Termin dla scrapera planu: kilka sekund przed timeoutem, żeby zdążył zapisać punkt kontrolny
+// i linię wyniku częściowego, zanim proces zostanie zabity.
+const DEADLINE_MARGIN_MS = 5000
+
+function jobArgs(job, timeoutMs) {
+  if (job !== 'timetable' || !(timeoutMs > 0)) return []
+  return ['--deadline', String(Math.max(1, (timeoutMs - DEADLINE_MARGIN_MS) / 1000))]
+}
+
+// Uruchamia skrypt scrapera jako osobny proces albo (SCRAPER_RESIDENT_WORKER=1) w procesie rezydentnym.
+export function createScraperRunner({ config, runCommand }) {
+  const worker = config.scraperWorkerEnabled
+    ? createScraperWorker({ scriptPath: config.scraperWorkerScript, cwd: config.scriptsDir })
+    : null
+
+  return function runScraperJob(pythonCmd, job, script) {
+    const args = jobArgs(job, config.scraperTimeoutMs)
+    if (worker) return worker.run(pythonCmd, job, { args, timeoutMs: config.scraperTimeoutMs })
+    return runCommand(pythonCmd, pythonArgs(pythonCmd, script, args), {
+      cwd: config.scriptsDir,
+      env: process.env,
+      timeoutMs: config.scraperTimeoutMs,
+    })
+  }
+}
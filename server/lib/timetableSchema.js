@@ -5,6 +5,7 @@ const Meta = z.object({
   source: z.string().optional(),
   scraped_on: z.string().optional(),
   generation_date_from_page: z.string().optional(),
+  source_fingerprint: z.string().optional(),
 }).optional().default({})
 const RefObj = z.object({ id: z.string(), name: z.string() }).nullable()
 const Lesson = z.object({
@@ -26,6 +27,72 @@ export const TimetableDataSchema = z.object({
   timetables: Timetables,
 })
 
+// Pliki encji publikowane przez timetable_shards.py (public/timetables/).
+const ShardEntry = z.object({
+  domain: z.enum(['teachers', 'rooms', 'classes']).nullable(),
+  file: z.string().regex(/^[A-Za-z0-9][A-Za-z0-9._+-]*\.json$/),
+  sha256: z.string(),
+  size: z.number().int(),
+})
+export const TimetableShardManifestSchema = z.object({
+  format: z.literal('timetable-shards'),
+  version: z.literal(1),
+  metadata: Meta,
+  teachers: RefTables,
+  rooms: RefTables,
+  classes: RefTables,
+  entities: z.record(ShardEntry),
+})
+export const TimetableShardSchema = z.object({
+  id: z.string(),
+  domain: z.string().nullable(),
+  name: z.string(),
+  lessons: z.array(Lesson),
+})
+
+// Format v2 (timetable_v2.py): walidowana jest tylko struktura tablic, indeksy sprawdza validateTimetableV2.
+const Index = z.number().int()
+const LessonRowV2 = z.tuple([Index, z.string(), z.string().nullable(), Index, Index, Index, Index])
+export const TimetableDataV2Schema = z.object({
+  format: z.literal('timetable-v2'),
+  version: z.literal(2),
+  metadata: Meta,
+  teachers: RefTables,
+  rooms: RefTables,
+  classes: RefTables,
+  days: z.array(z.string()),
+  bells: z.record(z.string()),
+  subjects: z.array(z.string()),
+  refs: z.array(z.tuple([z.string(), z.string()])),
+  lessons: z.array(LessonRowV2),
+  timetables: z.record(z.array(Index)),
+})
+
+function v2IndexIssue(doc) {
+  const inRange = (idx, list, optional) => (optional && idx === -1) || (idx >= 0 && idx < list.length)
+  for (let i = 0; i < doc.lessons.length; i += 1) {
+    const [day, , , subject, teacher, group, room] = doc.lessons[i]
+    if (!inRange(day, doc.days, false) || !inRange(subject, doc.subjects, false)
+      || !inRange(teacher, doc.refs, true) || !inRange(group, doc.refs, true) || !inRange(room, doc.refs, true)) {
+      return { path: ['lessons', i], message: 'Index out of range' }
+    }
+  }
+  for (const [entityId, indices] of Object.entries(doc.timetables)) {
+    if (!indices.every((idx) => inRange(idx, doc.lessons, false))) {
+      return { path: ['timetables', entityId], message: 'Index out of range' }
+    }
+  }
+  return null
+}
+
+export function validateTimetableV2(payload) {
+  const parsed = TimetableDataV2Schema.safeParse(payload)
+  if (!parsed.success) return { ok: false, error: parsed.error }
+  const issue = v2IndexIssue(parsed.data)
+  if (issue) return { ok: false, error: { issues: [issue] } }
+  return { ok: true, data: parsed.data }
+}
+
 export function validateTimetableData(payload) {
   const parsed = TimetableDataSchema.safeParse(payload)
   if (parsed.success) return { ok: true, data: parsed.data }
@@ -1,7 +1,15 @@
+import { createHash } from 'node:crypto'
 import { existsSync, readFileSync, statSync } from 'node:fs'
-import { validateTimetableData } from './timetableSchema.js'
+import { join } from 'node:path'
+import {
+  TimetableShardManifestSchema,
+  TimetableShardSchema,
+  validateTimetableData,
+  validateTimetableV2,
+} from './timetableSchema.js'
+import { expandTimetableV2, isTimetableV2 } from './timetableV2.js'
 
-export function createTimetableStore({ timetableFilePath, ttlMs }) {
+export function createTimetableStore({ timetableFilePath, timetableV2FilePath = null, shardsDir = null, ttlMs }) {
   let cache = {
     data: null,
     mtimeMs: 0,
@@ -49,11 +57,29 @@ export function createTimetableStore({ timetableFilePath, ttlMs }) {
     }
   }
 
+  // Plik v2 (jeśli scraper go zapisuje) jest używany tylko, gdy nie jest starszy od v1 -
+  // np. przywrócony backup nadpisuje wyłącznie v1 i wtedy wygrywa v1.
+  function resolveSourcePath() {
+    if (!timetableV2FilePath || !existsSync(timetableV2FilePath)) return timetableFilePath
+    if (!existsSync(timetableFilePath)) return timetableV2FilePath
+    return statSync(timetableV2FilePath).mtimeMs >= statSync(timetableFilePath).mtimeMs
+      ? timetableV2FilePath
+      : timetableFilePath
+  }
+
+  function parseTimetable(parsed) {
+    if (!isTimetableV2(parsed)) return validateTimetableData(parsed)
+    const validated = validateTimetableV2(parsed)
+    if (!validated.ok) return validated
+    return { ok: true, data: expandTimetableV2(validated.data) }
+  }
+
   function readTimetableFile() {
-    if (!existsSync(timetableFilePath)) return null
+    if (!existsSync(timetableFilePath) && !(timetableV2FilePath && existsSync(timetableV2FilePath))) return null
     let currentMtimeMs = 0
     try {
-      const st = statSync(timetableFilePath)
+      const sourcePath = resolveSourcePath()
+      const st = statSync(sourcePath)
       currentMtimeMs = st.mtimeMs
       const now = Date.now()
       const cacheValid = !!cache.data
@@ -65,9 +91,9 @@ export function createTimetableStore({ timetableFilePath, ttlMs }) {
         && (now - cache.invalidAt) < ttlMs
       if (invalidCacheValid) return cache.data
 
-      const txt = readFileSync(timetableFilePath, 'utf8')
+      const txt = readFileSync(sourcePath, 'utf8')
       const parsed = JSON.parse(txt)
-      const validated = validateTimetableData(parsed)
+      const validated = parseTimetable(parsed)
       if (!validated.ok) {
         const firstIssue = validated.error?.issues?.[0]
         const issuePath = firstIssue?.path?.length ? firstIssue.path.join('.') : '(root)'
@@ -102,6 +128,75 @@ export function createTimetableStore({ timetableFilePath, ttlMs }) {
     }
   }
 
+  let shardCache = { manifest: null, mtimeMs: 0, loadedAt: 0, shards: new Map() }
+
+  // Manifest plików encji (public/timetables/manifest.json). Manifest starszy od timetable_data.json
+  // (np. po przywróceniu backupu) nie opisuje już aktualnych danych i jest pomijany.
+  function readShardManifest() {
+    if (!shardsDir) return null
+    const manifestPath = join(shardsDir, 'manifest.json')
+    if (!existsSync(manifestPath)) return null
+    try {
+      const st = statSync(manifestPath)
+      if (existsSync(timetableFilePath) && st.mtimeMs < statSync(timetableFilePath).mtimeMs) return null
+      const now = Date.now()
+      if (shardCache.manifest && shardCache.mtimeMs === st.mtimeMs && (now - shardCache.loadedAt) < ttlMs) {
+        return shardCache.manifest
+      }
+      const parsed = TimetableShardManifestSchema.safeParse(JSON.parse(readFileSync(manifestPath, 'utf8')))
+      if (!parsed.success) {
+        console.warn('[timetable] Invalid timetables/manifest.json, using timetable_data.json')
+        return null
+      }
+      const shards = new Map()
+      for (const [id, entry] of shardCache.shards) {
+        if (parsed.data.entities[id]?.sha256 === entry.sha256) shards.set(id, entry)
+      }
+      shardCache = { manifest: parsed.data, mtimeMs: st.mtimeMs, loadedAt: now, shards }
+      return parsed.data
+    } catch (error) {
+      const message = error instanceof Error ? error.message : String(error)
+      console.warn(`[timetable] Failed to read timetables/manifest.json: ${message}`)
+      return null
+    }
+  }
+
+  function readShardLessons(manifest, canonId) {
+    const entry = manifest.entities[canonId]
+    if (!entry) return null
+    const cached = shardCache.shards.get(canonId)
+    if (cached && cached.sha256 === entry.sha256) return cached.lessons
+    const raw = readFileSync(join(shardsDir, entry.file))
+    // Plik encji niezgodny z manifestem (np. trwa zapis) - odczyt z pełnego pliku.
+    if (createHash('sha256').update(raw).digest('hex') !== entry.sha256) return null
+    const parsed = TimetableShardSchema.safeParse(JSON.parse(raw.toString('utf8')))
+    if (!parsed.success || parsed.data.id !== canonId) return null
+    shardCache.shards.set(canonId, { sha256: entry.sha256, lessons: parsed.data.lessons })
+    return parsed.data.lessons
+  }
+
+  // Plan jednej encji: z pliku encji, jeśli jest aktualny, w przeciwnym razie z timetable_data.json.
+  function readEntityTimetable(domain, inputId) {
+    const manifest = readShardManifest()
+    if (manifest) {
+      try {
+        const resolved = resolveCanonicalId({ ...manifest, timetables: manifest.entities }, domain, inputId)
+        if (!resolved.ok) return resolved
+        const lessons = readShardLessons(manifest, resolved.id)
+        if (lessons) return { ok: true, id: resolved.id, lessons }
+      } catch (error) {
+        const message = error instanceof Error ? error.message : String(error)
+        console.warn(`[timetable] Failed to read timetable shard: ${message}`)
+      }
+    }
+    const data = readTimetableFile()
+    if (!data || !data.timetables) return { ok: false, error: 'no_data' }
+    const resolved = resolveCanonicalId(data, domain, inputId)
+    if (!resolved.ok) return resolved
+    const lessons = Array.isArray(data.timetables[resolved.id]) ? data.timetables[resolved.id] : []
+    return { ok: true, id: resolved.id, lessons }
+  }
+
   function getTimetableValidationStatus() {
     return validationStatus
   }
@@ -151,5 +246,6 @@ export function createTimetableStore({ timetableFilePath, ttlMs }) {
     getTimetableValidationStatus,
     setTimetableCacheHeaders,
     resolveCanonicalId,
+    readEntityTimetable,
   }
 }
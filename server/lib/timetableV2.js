@@ -0,0 +1,40 @@
+// Czytnik referencyjny formatu timetable-v2 (server/scripts/timetable_v2.py).
+// Rozwija znormalizowany dokument do kształtu timetable_data.json (v1).
+// Lekcje i obiekty {id, name} są współdzielone między encjami - wynik jest tylko do odczytu.
+
+export const TIMETABLE_V2_FORMAT = 'timetable-v2'
+export const TIMETABLE_V2_VERSION = 2
+
+export function isTimetableV2(payload) {
+  return !!payload && typeof payload === 'object' && payload.format === TIMETABLE_V2_FORMAT
+}
+
+export function expandTimetableV2(doc) {
+  if (!isTimetableV2(doc)) throw new Error('Not a timetable-v2 document')
+  if (doc.version !== TIMETABLE_V2_VERSION) throw new Error(`Unsupported timetable-v2 version: ${doc.version}`)
+
+  const { days, bells, subjects } = doc
+  const refs = doc.refs.map(([id, name]) => ({ id, name }))
+  const lessons = doc.lessons.map(([day, lessonNum, time, subject, teacher, group, room]) => ({
+    day: days[day],
+    lesson_num: lessonNum,
+    time: time === null ? (bells[lessonNum] ?? '') : time,
+    subject: subjects[subject],
+    teacher: teacher < 0 ? null : refs[teacher],
+    group: group < 0 ? null : refs[group],
+    room: room < 0 ? null : refs[room],
+  }))
+
+  const timetables = {}
+  for (const [entityId, indices] of Object.entries(doc.timetables)) {
+    timetables[entityId] = indices.map((idx) => lessons[idx])
+  }
+
+  return {
+    metadata: doc.metadata || {},
+    teachers: doc.teachers,
+    rooms: doc.rooms,
+    classes: doc.classes,
+    timetables,
+  }
+}
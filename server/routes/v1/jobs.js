@@ -5,7 +5,7 @@ export function registerJobRoutes(v1, {
   problem,
   detectPythonCommand,
   ensurePythonDepsInstalled,
-  runCommand,
+  runScraperJob,
   parseStructuredJobOutput,
   config,
   jobsStore,
@@ -46,23 +46,21 @@ export function registerJobRoutes(v1, {
         })
         if (deps && deps.error) throw new Error(deps.error)
 
-        const script = process.platform === 'win32' && pythonCmd === 'py'
-          ? ['-3', config.timetableScraperScript]
-          : [config.timetableScraperScript]
-        const run = await runCommand(pythonCmd, script, {
-          cwd: config.scriptsDir,
-          env: process.env,
-          timeoutMs: config.scraperTimeoutMs,
-        })
+        const run = await runScraperJob(pythonCmd, 'timetable', config.timetableScraperScript)
         const runResult = parseStructuredJobOutput(run.stdout)
         if (run.timedOut) {
           timedOut = true
           throw new Error(`Scraper timeout after ${config.scraperTimeoutMs}ms`)
         }
         if (run.code !== 0) throw new Error((runResult && (runResult.detail || runResult.error)) || run.stderr.slice(-4000))
-        if (runResult && runResult.ok === false) throw new Error(runResult.detail || runResult.error || 'Scraper failed')
+        if (runResult && runResult.ok === false) {
+          // Przebieg przerwany przed terminem: postęp (progress) zostaje w wyniku zadania.
+          if (runResult.partial) job.result = runResult
+          throw new Error(runResult.detail || runResult.error || 'Scraper failed')
+        }
 
-        invalidateTimetableCache()
+        // Scraper z niezmienionym źródłem nie nadpisuje pliku - cache klientów zostaje ważny.
+        if (!(runResult && runResult.unchanged)) invalidateTimetableCache()
         job.status = 'succeeded'
         job.finishedAt = new Date().toISOString()
         job.result = runResult
@@ -119,14 +117,7 @@ export function registerJobRoutes(v1, {
           })
           if (deps && deps.error) throw new Error(deps.error)
 
-          const script = process.platform === 'win32' && pythonCmd === 'py'
-            ? ['-3', config.articlesScraperScript]
-            : [config.articlesScraperScript]
-          const run = await runCommand(pythonCmd, script, {
-            cwd: config.scriptsDir,
-            env: process.env,
-            timeoutMs: config.scraperTimeoutMs,
-          })
+          const run = await runScraperJob(pythonCmd, 'articles', config.articlesScraperScript)
           const runResult = parseStructuredJobOutput(run.stdout)
           if (run.timedOut) {
             timedOut = true
@@ -187,14 +178,7 @@ export function registerJobRoutes(v1, {
           })
           if (deps && deps.error) throw new Error(deps.error)
 
-          const script = process.platform === 'win32' && pythonCmd === 'py'
-            ? ['-3', config.documentsScraperScript]
-            : [config.documentsScraperScript]
-          const run = await runCommand(pythonCmd, script, {
-            cwd: config.scriptsDir,
-            env: process.env,
-            timeoutMs: config.scraperTimeoutMs,
-          })
+          const run = await runScraperJob(pythonCmd, 'documents', config.documentsScraperScript)
           const runResult = parseStructuredJobOutput(run.stdout)
           if (run.timedOut) {
             timedOut = true
@@ -9,7 +9,7 @@ export function registerMaintenanceRoutes(v1, {
   problem,
   detectPythonCommand,
   ensurePythonDepsInstalled,
-  runCommand,
+  runScraperJob,
   parseStructuredJobOutput,
   config,
   invalidateTimetableCache,
@@ -84,14 +84,7 @@ export function registerMaintenanceRoutes(v1, {
         return problem(res, 500, 'jobs.pip_failed', 'Internal Server Error', deps.error, { step: 'pip' })
       }
 
-      const script = process.platform === 'win32' && pythonCmd === 'py'
-        ? ['-3', config.timetableScraperScript]
-        : [config.timetableScraperScript]
-      const run = await runCommand(pythonCmd, script, {
-        cwd: config.scriptsDir,
-        env: process.env,
-        timeoutMs: config.scraperTimeoutMs,
-      })
+      const run = await runScraperJob(pythonCmd, 'timetable', config.timetableScraperScript)
       isRunning = false
 
       const runResult = parseStructuredJobOutput(run.stdout)
@@ -105,7 +98,7 @@ export function registerMaintenanceRoutes(v1, {
         return problem(res, 500, 'jobs.scraper_failed', 'Internal Server Error', runResult.detail || runResult.error || 'Scraper failed', { step: 'scraper', output: run.stdout.slice(-4000) })
       }
 
-      invalidateTimetableCache()
+      if (!(runResult && runResult.unchanged)) invalidateTimetableCache()
       readTimetableFile()
       const validationStatus = getTimetableValidationStatus ? getTimetableValidationStatus() : null
       if (validationStatus?.ok === false) {
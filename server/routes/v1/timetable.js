@@ -1,9 +1,22 @@
 export function registerTimetableRoutes(v1, {
   readTimetableFile,
   setTimetableCacheHeaders,
-  resolveCanonicalId,
+  readEntityTimetable,
   problem,
 }) {
+  function readEntityOrProblem(res, domain, idIn, notFoundDetail) {
+    const result = readEntityTimetable(domain, String(idIn || '').trim())
+    if (result.ok) return result
+    if (result.error === 'no_data') {
+      problem(res, 404, 'timetable.missing', 'Not Found', 'Brak pliku timetable_data.json')
+    } else if (result.error === 'ambiguous') {
+      problem(res, 409, 'timetable.alias_ambiguous', 'Conflict', 'Alias matches multiple items', { candidates: result.candidates })
+    } else {
+      problem(res, 404, 'timetable.not_found', 'Not Found', notFoundDetail)
+    }
+    return null
+  }
+
   v1.get('/timetable/meta', (_req, res) => {
     const data = readTimetableFile()
     if (!data) return problem(res, 404, 'timetable.missing', 'Not Found', 'Brak pliku timetable_data.json')
@@ -33,37 +46,17 @@ export function registerTimetableRoutes(v1, {
   })
 
   v1.get('/teachers/:id/timetable', (req, res) => {
-    const data = readTimetableFile()
-    if (!data || !data.timetables) return problem(res, 404, 'timetable.missing', 'Not Found', 'Brak pliku timetable_data.json')
-    const idIn = String(req.params.id || '').trim()
-    let canon = idIn
-    if (!(canon in data.timetables)) {
-      const resolved = resolveCanonicalId(data, 'teachers', idIn)
-      if (!resolved.ok) {
-        if (resolved.error === 'ambiguous') return problem(res, 409, 'timetable.alias_ambiguous', 'Conflict', 'Alias matches multiple items', { candidates: resolved.candidates })
-        return problem(res, 404, 'timetable.not_found', 'Not Found', 'Nie znaleziono nauczyciela')
-      }
-      canon = resolved.id
-    }
-    const lessons = Array.isArray(data.timetables[canon]) ? data.timetables[canon] : []
+    const entity = readEntityOrProblem(res, 'teachers', req.params.id, 'Nie znaleziono nauczyciela')
+    if (!entity) return
+    const { id: canon, lessons } = entity
     setTimetableCacheHeaders(res)
     res.json({ ok: true, data: { id: canon, lessons } })
   })
 
   v1.get('/classes/:id/timetable', (req, res) => {
-    const data = readTimetableFile()
-    if (!data || !data.timetables) return problem(res, 404, 'timetable.missing', 'Not Found', 'Brak pliku timetable_data.json')
-    const idIn = String(req.params.id || '').trim()
-    let canon = idIn
-    if (!(canon in data.timetables)) {
-      const resolved = resolveCanonicalId(data, 'classes', idIn)
-      if (!resolved.ok) {
-        if (resolved.error === 'ambiguous') return problem(res, 409, 'timetable.alias_ambiguous', 'Conflict', 'Alias matches multiple items', { candidates: resolved.candidates })
-        return problem(res, 404, 'timetable.not_found', 'Not Found', 'Nie znaleziono klasy')
-      }
-      canon = resolved.id
-    }
-    const lessons = Array.isArray(data.timetables[canon]) ? data.timetables[canon] : []
+    const entity = readEntityOrProblem(res, 'classes', req.params.id, 'Nie znaleziono klasy')
+    if (!entity) return
+    const { id: canon, lessons } = entity
     const groupQuery = typeof req.query.group === 'string' ? req.query.group.trim() : null
     const includeWhole = req.query.includeWhole === undefined ? true : String(req.query.includeWhole).toLowerCase() !== 'false'
     let filtered = lessons
@@ -88,19 +81,9 @@ export function registerTimetableRoutes(v1, {
   })
 
   v1.get('/rooms/:id/timetable', (req, res) => {
-    const data = readTimetableFile()
-    if (!data || !data.timetables) return problem(res, 404, 'timetable.missing', 'Not Found', 'Brak pliku timetable_data.json')
-    const idIn = String(req.params.id || '').trim()
-    let canon = idIn
-    if (!(canon in data.timetables)) {
-      const resolved = resolveCanonicalId(data, 'rooms', idIn)
-      if (!resolved.ok) {
-        if (resolved.error === 'ambiguous') return problem(res, 409, 'timetable.alias_ambiguous', 'Conflict', 'Alias matches multiple items', { candidates: resolved.candidates })
-        return problem(res, 404, 'timetable.not_found', 'Not Found', 'Nie znaleziono sali')
-      }
-      canon = resolved.id
-    }
-    const lessons = Array.isArray(data.timetables[canon]) ? data.timetables[canon] : []
+    const entity = readEntityOrProblem(res, 'rooms', req.params.id, 'Nie znaleziono sali')
+    if (!entity) return
+    const { id: canon, lessons } = entity
     setTimetableCacheHeaders(res)
     res.json({ ok: true, data: { id: canon, lessons } })
   })
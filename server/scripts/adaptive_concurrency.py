@@ -0,0 +1,243 @@
+"""
+Adaptacyjny limit równoległych żądań HTTP (AIMD) dla etapów pobierania scraperów.
+
+Wątki pobierające zajmują miejsce przez AdaptiveLimiter.call(...), a limit zmienia się według
+wyniku żądań:
+- wzrost addytywny: każde udane żądanie przy wykorzystanym limicie dodaje 1/limit, czyli
+  ok. +1 na "rundę" (tyle żądań, ile wynosi limit), dopóki opóźnienie jest zdrowe,
+- spadek multiplikatywny: 429/503, inne 5xx i błędy połączenia mnożą limit przez DECREASE,
+  rosnące opóźnienie (średnia krocząca powyżej bazowego * LATENCY_FACTOR i o co najmniej
+  LATENCY_SLACK) - przez LATENCY_DECREASE. Jedna runda żądań daje najwyżej jeden spadek:
+  liczą się tylko żądania rozpoczęte po poprzednim,
+- Retry-After (sekundy albo data HTTP) wstrzymuje nowe żądania do podanej chwili
+  (najwyżej max_pause sekund).
+
+Opóźnienie bazowe to najmniejsze zaobserwowane. Przy limicie minimalnym dryfuje w stronę bieżących
+pomiarów, więc serwer trwale wolniejszy (a nie przeciążony) po pewnym czasie pozwala limitowi znów rosnąć.
+snapshot() podaje liczniki, opóźnienia i ślad zmian limitu (do wyniku zadania).
+
+Zmienne środowiskowe (limiter_from_env):
+    SCRAPER_ADAPTIVE          - 0 wyłącza adaptację (stały limit = maksimum, Retry-After nadal działa)
+    SCRAPER_ADAPTIVE_INITIAL  - limit początkowy (domyślnie 2)
+    SCRAPER_RETRY_AFTER_MAX   - najdłuższa respektowana przerwa z Retry-After w sekundach (domyślnie 60)
+"""
+
+import email.utils
+import math
+import os
+import threading
+import time
+
+
+DECREASE = 0.5
+LATENCY_DECREASE = 0.75
+LATENCY_FACTOR = 2.0
+LATENCY_SLACK = 0.05
+EWMA_ALPHA = 0.3
+BASELINE_DRIFT = 0.1
+THROTTLE_STATUSES = {429, 503}
+MAX_TRACE = 200
+
+
+def parse_retry_after(value, now=None):
+    """Liczba sekund z nagłówka Retry-After (sekundy albo data HTTP) albo None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, maximum, initial=2, minimum=1, adaptive=True, max_pause=60.0):
+        self.name = name
+        self.maximum = max(1, int(maximum))
+        self.minimum = max(1, min(int(minimum), self.maximum))
+        self.adaptive = adaptive
+        self.initial = self.maximum if not adaptive else max(self.minimum, min(int(initial), self.maximum))
+        self.max_pause = max(0.0, max_pause)
+        self.limit = float(self.initial)
+        self.inflight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.ewma = None
+        self.baseline = None
+        self.cond = threading.Condition()
+        self.started = time.monotonic()
+        self.latencies = []
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "increases": 0,
+            "decreases": 0,
+            "retry_after": 0,
+            "wait_seconds": 0.0,
+        }
+        self.peak_limit = self.initial
+        self.trace = []
+        self._record("start")
+
+    def current_limit(self):
+        return max(self.minimum, int(self.limit))
+
+    def _record(self, event):
+        self.trace.append(
+            {
+                "t": round(time.monotonic() - self.started, 3),
+                "event": event,
+                "limit": self.current_limit(),
+                "inflight": self.inflight,
+                "latency_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            }
+        )
+        if len(self.trace) > MAX_TRACE:
+            # Przerzedzenie zachowuje cały przebieg (początek i koniec) w ograniczonym rozmiarze.
+            self.trace = self.trace[:1] + self.trace[2::2]
+
+    def acquire(self):
+        with self.cond:
+            started = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self.cond.wait(self.paused_until - now)
+                elif self.inflight < self.current_limit():
+                    break
+                else:
+                    self.cond.wait()
+            self.inflight += 1
+            self.stats["wait_seconds"] += time.monotonic() - started
+
+    def release(self, started, status=None, error=False, retry_after=None):
+        """Zgłasza wynik żądania rozpoczętego w chwili started (time.monotonic())."""
+        now = time.monotonic()
+        latency = now - started
+        with self.cond:
+            used = self.inflight >= self.current_limit()
+            self.inflight -= 1
+            self.stats["requests"] += 1
+            throttled = status in THROTTLE_STATUSES
+            failed = error or throttled or (status is not None and status >= 500)
+            if error:
+                self.stats["errors"] += 1
+            elif throttled:
+                self.stats["throttled"] += 1
+            elif failed:
+                self.stats["server_errors"] += 1
+
+            pause = parse_retry_after(retry_after) if status in THROTTLE_STATUSES else None
+            if pause:
+                self.stats["retry_after"] += 1
+                self.paused_until = max(self.paused_until, now + min(pause, self.max_pause))
+                self._record("retry_after")
+
+            if failed:
+                self._decrease(started, now, DECREASE, "error" if error else f"status_{status}")
+            else:
+                self._observe(latency)
+                if self._congested():
+                    self._decrease(started, now, LATENCY_DECREASE, "latency")
+                elif used:
+                    self._increase()
+            self.cond.notify_all()
+
+    def _observe(self, latency):
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else self.ewma + EWMA_ALPHA * (latency - self.ewma)
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        elif self.current_limit() == self.minimum:
+            # Wolno także przy minimalnej równoległości - to bieżące opóźnienie serwera, nie przeciążenie.
+            self.baseline += BASELINE_DRIFT * (latency - self.baseline)
+
+    def _congested(self):
+        if self.ewma is None or self.baseline is None:
+            return False
+        return self.ewma > self.baseline * LATENCY_FACTOR and self.ewma - self.baseline > LATENCY_SLACK
+
+    def _increase(self):
+        if not self.adaptive or self.limit >= self.maximum:
+            return
+        before = self.current_limit()
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+        if self.current_limit() != before:
+            self.stats["increases"] += 1
+            self.peak_limit = max(self.peak_limit, self.current_limit())
+            self._record("increase")
+
+    def _decrease(self, started, now, factor, reason):
+        # Żądania wysłane przed poprzednim spadkiem widziały jeszcze stary limit - nie karzemy dwa razy.
+        if not self.adaptive or started < self.last_decrease:
+            return
+        self.last_decrease = now
+        self.limit = max(float(self.minimum), math.floor(self.limit * factor))
+        # Średnia po spadku liczona od nowa - inaczej stare, wysokie pomiary obniżałyby limit dalej.
+        self.ewma = None
+        self.stats["decreases"] += 1
+        self._record(reason)
+
+    def call(self, fn, *args, **kwargs):
+        """Wykonuje żądanie fn(*args, **kwargs) zwracające requests.Response w ramach limitu."""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            response = fn(*args, **kwargs)
+        except Exception:
+            self.release(started, error=True)
+            raise
+        self.release(started, status=response.status_code, retry_after=response.headers.get("Retry-After"))
+        return response
+
+    def snapshot(self):
+        with self.cond:
+            latencies = sorted(self.latencies)
+
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+            return {
+                "name": self.name,
+                "adaptive": self.adaptive,
+                "initial": self.initial,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "limit": self.current_limit(),
+                "peak_limit": self.peak_limit,
+                **{k: round(v, 4) if isinstance(v, float) else v for k, v in self.stats.items()},
+                "latency_ms": {
+                    "p50": pct(0.5),
+                    "p95": pct(0.95),
+                    "baseline": round(self.baseline * 1000, 1) if self.baseline is not None else None,
+                },
+                "trace": list(self.trace),
+            }
+
+    def summary(self):
+        s = self.stats
+        return (
+            f"Równoległość ({self.name}): "
+            f"limit={self.current_limit()} (start {self.initial}, szczyt {self.peak_limit}, max {self.maximum}), "
+            f"żądania={s['requests']}, błędy={s['errors']}, 429/503={s['throttled']}, 5xx={s['server_errors']}, "
+            f"wzrosty={s['increases']}, spadki={s['decreases']}, Retry-After={s['retry_after']}, "
+            f"oczekiwanie={s['wait_seconds']:.2f}s"
+        )
+
+
+def limiter_from_env(name, maximum):
+    adaptive = os.environ.get("SCRAPER_ADAPTIVE", "1").strip().lower() not in {"0", "false", "no", "off"}
+    return AdaptiveLimiter(
+        name,
+        maximum,
+        initial=max(1, int(os.environ.get("SCRAPER_ADAPTIVE_INITIAL", "2"))),
+        adaptive=adaptive,
+        max_pause=float(os.environ.get("SCRAPER_RETRY_AFTER_MAX", "60")),
+    )
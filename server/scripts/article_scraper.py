@@ -7,6 +7,8 @@ import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional, Dict
 
+import adaptive_concurrency
+
 # --- Konfiguracja ---
 BASE_URL = "https://e-qwerty.zse-zdwola.pl/"
 START_PAGE = BASE_URL
@@ -24,6 +26,16 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
 OUTPUT_FILE = os.path.join(PUBLIC_DIR, "articles.json")
 
+# Wspólna sesja HTTP (keep-alive). Pula połączeń mieści wszystkie wątki pobierające;
+# w procesie rezydentnym (scraper_worker.py) połączenia zostają otwarte między zadaniami.
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT})
+_ADAPTER = requests.adapters.HTTPAdapter(pool_maxsize=max(10, MAX_WORKERS))
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+# Adaptacyjny limit równoległych żądań (do MAX_WORKERS), tworzony na każdy przebieg w main().
+LIMITER = None
+
 def clean_html_content(soup_tag):
     """
     Czyści tagi HTML ze zbędnych atrybutów, pozostawiając tylko czystą strukturę.
@@ -54,7 +66,10 @@ def clean_html_content(soup_tag):
 def _get_with_retry(url: str) -> Optional[requests.Response]:
     for attempt in range(3):
         try:
-            r = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
+            if LIMITER:
+                r = LIMITER.call(SESSION.get, url, timeout=REQUEST_TIMEOUT)
+            else:
+                r = SESSION.get(url, timeout=REQUEST_TIMEOUT)
             r.raise_for_status()
             return r
         except Exception as e:
@@ -147,7 +162,9 @@ def scrape_article_page(url: str):
         return None
 
 def main():
-    """Główna funkcja scrapera."""
+    """Główna funkcja scrapera. Zwraca słownik wypisanej linii wyniku."""
+    global LIMITER
+    LIMITER = adaptive_concurrency.limiter_from_env("articles", MAX_WORKERS)
     all_articles: List[Dict] = []
     current_page_url = START_PAGE
     started_at = time.monotonic()
@@ -201,7 +218,10 @@ def main():
     os.replace(tmp_path, OUTPUT_FILE)
     
     print(f"\nScraping complete! Found and saved {len(all_articles)} articles to articles.json")
-    print(json.dumps({"ok": True, "count": len(all_articles), "output": OUTPUT_FILE}, ensure_ascii=False))
+    print(LIMITER.summary())
+    result = {"ok": True, "count": len(all_articles), "output": OUTPUT_FILE, "concurrency": LIMITER.snapshot()}
+    print(json.dumps(result, ensure_ascii=False))
+    return result
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,242 @@
+"""
+Benchmark end-to-end scraper.py na syntetycznej szkole (synthetic_school.py) serwowanej lokalnie.
+
+Dla każdej skali generowana jest szkoła, uruchamiany serwer HTTP z opóźnieniem, a scraper
+działa w osobnym procesie (pełna ścieżka: landing -> iframe -> strony planu -> zapis), więc
+szczytowa pamięć (max RSS) dotyczy tylko jednego przebiegu. Skala 1 to jeden oddział
+z --teachers nauczycielami i --rooms salami; skala 100 to 100 oddziałów itd.
+
+Użycie:
+    python bench_e2e.py [--scales 10,100,1000] [--modes modern,legacy] [--latency-ms N]
+                        [--jitter-ms N] [--capacity N] [--workdir KATALOG] [--side-outputs] [--backend NAZWA]
+                        [--teachers N] [--rooms N] [--days N] [--bells N] [--rowspan-rate P]
+                        [--subgroup-rate P] [--seed N]
+
+Kontrola poprawności: liczba encji i lekcji w planach oddziałów musi zgadzać się z modelem szkoły.
+--capacity N symuluje przeciążany hosting (opóźnienie rośnie ponad N równoczesnych żądań, ponad 2N
+odpowiedzi 429 z Retry-After); wynik podaje wtedy odrzucone żądania i przebieg adaptacyjnego limitu.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import html_tree
+import synthetic_school
+from scrape_metrics import peak_rss_kb
+
+
+MODES = ("modern", "legacy")
+
+
+def expected_class_lessons(school, mode):
+    """Liczba lekcji w planach oddziałów, jaką scraper powinien odczytać ze stron danego eksportu.
+
+    Nowy eksport pokazuje w planie oddziału jedną lekcję na slot (podgrupy odtwarza scraper
+    z planów nauczycieli), a lekcja blokowa to jedna komórka z rowspan. Stary eksport wypisuje
+    każdą podgrupę osobno i lekcję blokową w każdym wierszu.
+    """
+    if mode == "modern":
+        return len({(lesson.cls, lesson.day, lesson.bell) for lesson in school.lessons})
+    return sum(lesson.span for lesson in school.lessons)
+
+
+def run_child(out_dir):
+    """Przebieg scrapera w bieżącym procesie (wywoływany przez rodzica jako osobny proces)."""
+    import scraper
+
+    scraper.OUTPUT_FILE = os.path.join(out_dir, "timetable_data.json")
+    scraper.OUTPUT_V2_FILE = os.path.join(out_dir, "timetable_data.v2.json")
+    scraper.SHARDS_DIR = os.path.join(out_dir, "timetables")
+    scraper.OCCUPANCY_FILE = os.path.join(out_dir, "timetable_occupancy.json")
+    scraper.CONFLICTS_FILE = os.path.join(out_dir, "timetable_conflicts.json")
+    baseline_rss = peak_rss_kb()
+
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        scraper.main([])
+    elapsed = time.perf_counter() - started
+
+    result = None
+    for line in reversed(log.getvalue().splitlines()):
+        if line.startswith("{") and '"__structured_result__"' in line:
+            result = json.loads(line)
+            break
+    with open(os.path.join(out_dir, "scraper.log"), "w", encoding="utf-8") as f:
+        f.write(log.getvalue())
+    print(
+        json.dumps(
+            {
+                "result": result,
+                "seconds": elapsed,
+                "baseline_rss_kb": baseline_rss,
+                "max_rss_kb": peak_rss_kb(),
+            }
+        )
+    )
+    return 0
+
+
+def run_scrape(server, mode, out_dir, args):
+    os.makedirs(out_dir, exist_ok=True)
+    # Wszystkie pliki stanu scrapera w katalogu przebiegu - pomiar nie może dotknąć server/runtime.
+    cache_dir = os.path.join(out_dir, "scraper-cache")
+    env = dict(os.environ)
+    env.update(
+        {
+            "TIMETABLE_LANDING_URL": f"{server.base_url}{mode}/landing.html",
+            "TIMETABLE_FALLBACK_URL": f"{server.base_url}{mode}/index.html",
+            "SCRAPER_HTTP_CACHE": "0",
+            "SCRAPER_INCREMENTAL": "0",
+            "SCRAPER_FORCE": "1",
+            "SCRAPER_PARSER": args.backend,
+            "SCRAPER_LANDING_CACHE_FILE": os.path.join(cache_dir, "landing.json"),
+            "SCRAPER_HTTP_CACHE_DIR": os.path.join(cache_dir, "http"),
+            "SCRAPER_LEGACY_STATE": os.path.join(cache_dir, "legacy-pages.json"),
+            "SCRAPER_LEGACY_CHECKPOINT": os.path.join(cache_dir, "legacy-checkpoint.json"),
+        }
+    )
+    if not args.side_outputs:
+        env.update(
+            {
+                "SCRAPER_OUTPUT_SHARDS": "0",
+                "SCRAPER_OUTPUT_OCCUPANCY": "0",
+                "SCRAPER_OUTPUT_CONFLICTS": "0",
+                "SCRAPER_OUTPUT_V2": "0",
+            }
+        )
+
+    requests_before, bytes_before = server.counters()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", out_dir],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    requests_after, bytes_after = server.counters()
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"Przebieg scrapera ({mode}) zakończył się błędem:\n{proc.stderr[-2000:]}")
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+    child["pages"] = requests_after - requests_before
+    child["html_bytes"] = bytes_after - bytes_before
+    return child
+
+
+def check_output(school, mode, out_dir):
+    """Porównuje timetable_data.json z modelem szkoły. Zwraca (liczba wszystkich lekcji, lista błędów)."""
+    with open(os.path.join(out_dir, "timetable_data.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    errors = []
+    for domain, names in (("classes", school.classes), ("teachers", school.teachers), ("rooms", school.rooms)):
+        if len(data.get(domain, {})) != len(names):
+            errors.append(f"{domain}: {len(data.get(domain, {}))} != {len(names)}")
+    class_lessons = sum(len(data["timetables"].get(class_id, [])) for class_id in data.get("classes", {}))
+    expected = expected_class_lessons(school, mode)
+    if class_lessons != expected:
+        errors.append(f"lekcje oddziałów: {class_lessons} != {expected}")
+    total_lessons = sum(len(lessons) for lessons in data["timetables"].values())
+    return total_lessons, errors
+
+
+def bench_scale(scale, args, workdir):
+    started = time.perf_counter()
+    school = synthetic_school.school_from_args(args, scale)
+    site_dir = os.path.join(workdir, f"scale-{scale}", "site")
+    site_bytes = synthetic_school.write_site(site_dir, school, args.modes)
+    generate_seconds = time.perf_counter() - started
+
+    results = []
+    with synthetic_school.SyntheticServer(
+        site_dir, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, capacity=args.capacity
+    ) as server:
+        for mode in args.modes:
+            out_dir = os.path.join(workdir, f"scale-{scale}", f"out-{mode}")
+            throttled_before = server.throttled
+            child = run_scrape(server, mode, out_dir, args)
+            scrape = child["result"] or {}
+            concurrency = scrape.get("metrics", {}).get("concurrency") or {}
+            total_lessons, errors = check_output(school, mode, out_dir) if scrape.get("ok") else (0, ["scraper: brak wyniku"])
+            seconds = child["seconds"]
+            results.append(
+                {
+                    "mode": mode,
+                    "scale": scale,
+                    "classes": len(school.classes),
+                    "teachers": len(school.teachers),
+                    "rooms": len(school.rooms),
+                    "site_bytes": site_bytes[mode],
+                    "generate_s": round(generate_seconds, 3),
+                    "pages": child["pages"],
+                    "html_bytes": child["html_bytes"],
+                    "lessons": total_lessons,
+                    "seconds": round(seconds, 3),
+                    "pages_per_s": round(child["pages"] / seconds, 2),
+                    "lessons_per_s": round(total_lessons / seconds, 1),
+                    "html_mb_per_s": round(child["html_bytes"] / seconds / 1e6, 3),
+                    "output_bytes": scrape.get("output_bytes", 0),
+                    "max_rss_kb": child["max_rss_kb"],
+                    "rss_growth_kb": child["max_rss_kb"] - child["baseline_rss_kb"],
+                    "throttled": server.throttled - throttled_before,
+                    "peak_limit": concurrency.get("peak_limit"),
+                    "limit_decreases": concurrency.get("decreases"),
+                    "phases": {name: phase["seconds"] for name, phase in scrape.get("metrics", {}).get("phases", {}).items()},
+                    "ok": bool(scrape.get("ok")) and not errors,
+                    "errors": errors,
+                }
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", metavar="KATALOG", help=argparse.SUPPRESS)
+    parser.add_argument("--scales", default="10,100,1000", help="skale szkoły oddzielone przecinkami")
+    parser.add_argument("--modes", default=",".join(MODES), help="tryby scrapera: modern, legacy")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="opóźnienie każdej odpowiedzi serwera")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="losowy dodatek do opóźnienia")
+    parser.add_argument("--capacity", type=int, default=0, help="pojemność serwera w równoczesnych żądaniach (0 = bez limitu)")
+    parser.add_argument("--workdir", help="katalog na strony i wyniki (domyślnie tymczasowy, usuwany)")
+    parser.add_argument("--side-outputs", action="store_true", help="zapisuj też pliki encji/indeks/v2")
+    parser.add_argument("--backend", default=html_tree.DEFAULT_BACKEND, choices=html_tree.BACKENDS)
+    synthetic_school.add_school_arguments(parser)
+    parser.set_defaults(classes=1, teachers=2, rooms=2)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args.child)
+
+    args.modes = tuple(mode.strip() for mode in args.modes.split(",") if mode.strip())
+    if not args.modes or any(mode not in MODES for mode in args.modes):
+        parser.error(f"--modes: dozwolone {', '.join(MODES)}")
+    try:
+        scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    except ValueError:
+        parser.error("--scales: oczekiwano liczb całkowitych")
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-e2e-"))
+        results = []
+        for scale in scales:
+            for result in bench_scale(scale, args, workdir):
+                results.append(result)
+                summary = ", ".join(f"{k}={v}" for k, v in result.items() if k not in ("mode", "errors", "phases"))
+                print(f"{result['mode']}: {summary}")
+                print(f"  fazy: {', '.join(f'{name}={seconds:.3f}s' for name, seconds in result['phases'].items())}")
+                for error in result["errors"]:
+                    print(f"  BŁĄD: {error}")
+
+    ok = all(result["ok"] for result in results)
+    print(json.dumps({"ok": ok, "latency_ms": args.latency_ms, "backend": args.backend, "results": results}, ensure_ascii=False))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
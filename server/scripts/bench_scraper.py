@@ -0,0 +1,509 @@
+"""
+Mikro-benchmarki gorących ścieżek scraper.py.
+
+Użycie:
+    python bench_scraper.py [NAZWA ...] [--rows N] [--repeat N]
+
+Bez nazw uruchamiane są wszystkie benchmarki. Wynik: czasy (najlepszy z --repeat)
+oraz przyspieszenie względem implementacji referencyjnej, jeśli benchmark ją ma.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import resource
+import sys
+import time
+import tracemalloc
+
+import html_tree
+import scraper
+import synthetic_school
+import table_grid
+import text_norm
+import timetable_checks
+from lesson_records import Lesson
+
+
+DAYS = ["Poniedziałek", "Wtorek", "Środa", "Czwartek", "Piątek"]
+
+
+def synthetic_plan_table(rows, days=DAYS):
+    """Duża tabela table.plan w formacie planu nauczyciela (przedmiot + div.g, sala)."""
+    parts = ['<table class="plan" id="t1"><thead><tr><td>Nr</td><td>Godz</td>']
+    parts.extend(f'<td colspan="2">{day}</td>' for day in days)
+    parts.append("</tr></thead><tbody>")
+    for r in range(rows):
+        parts.append(f"<tr><td>{r + 1}</td><td>8:00-8:45</td>")
+        for d in range(len(days)):
+            mark = f" ({1 + (r + d) % 2}/2)" if (r + d) % 3 == 0 else ""
+            parts.append(
+                f'<td>matematyka rozszerzona <div class="g"><a href="#c{d}">{d + 1}AT</a>{mark}</div></td>'
+                f'<td><a href="#r{r % 40}">{100 + r % 40}</a></td>'
+            )
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def synthetic_legacy_page(rows, days=DAYS, lessons_per_cell=3):
+    """Strona planu w starym formacie Optivum (table.tabela, lekcje rozdzielone <br>)."""
+    parts = ['<html><body><table class="tabela"><tr><th>Nr</th><th>Godz</th>']
+    parts.extend(f"<th>{day}</th>" for day in days)
+    parts.append("</tr>")
+    for r in range(rows):
+        parts.append(f'<tr><td class="nr">{r + 1}</td><td class="g">8:00-8:45</td>')
+        for d in range(len(days)):
+            chunks = [
+                f'<span class="p">j.angielski-{k + 1}/{lessons_per_cell}</span> '
+                f'<a href="n{k + 1}.html" class="n">AB{k}</a> '
+                f'<a href="o{d + 1}.html" class="o">{d + 1}AT</a> '
+                f'<a href="s{r % 40 + 1}.html" class="s">{100 + r % 40}</a>'
+                for k in range(lessons_per_cell)
+            ]
+            parts.append('<td class="l">' + "<br>".join(chunks) + "</td>")
+        parts.append("</tr>")
+    parts.append('</table><table><tr><td class="op">wygenerowano 01.09.2024</td></tr></table></body></html>')
+    return "".join(parts)
+
+
+class _CountingSink:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def reference_subject_reparse(cell):
+    """Dawna implementacja: serializacja komórki i ponowne parsowanie bez div.g."""
+    clone = scraper.parse_html(str(cell))
+    for g in clone.select("div.g"):
+        g.decompose()
+    return scraper.normalize_text(clone.get_text(" ", strip=True))
+
+
+def bench_subject_extract(args):
+    soup = scraper.parse_html(synthetic_plan_table(args.rows))
+    cells = [cell for cell in soup.select("table.plan tbody td") if cell.find("div", class_="g")]
+    raw_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
+    names_map = {"teachers": {}, "rooms": {}, "classes": {}}
+
+    for cell in cells:
+        subject, _, _ = scraper.parse_subject_and_group(cell, raw_to_canon, names_map)
+        if subject != reference_subject_reparse(cell):
+            raise AssertionError(f"Różne wyniki dla komórki: {cell}")
+
+    reference = best_of(args.repeat, lambda: [reference_subject_reparse(c) for c in cells])
+    current = best_of(
+        args.repeat,
+        lambda: [scraper.parse_subject_and_group(c, raw_to_canon, names_map) for c in cells],
+    )
+    return {"cells": len(cells), "reference_s": reference, "current_s": current}
+
+
+def reference_legacy_chunks(cell):
+    """Dawna implementacja: podział str(cell) po <br> i osobne drzewo dla każdego fragmentu."""
+    cell_html = str(cell).replace("<br/>", "<br>").replace("<br />", "<br>")
+    return [scraper.parse_html(chunk) for chunk in cell_html.split("<br>")]
+
+
+def bench_legacy_chunks(args):
+    soup = scraper.parse_html(synthetic_legacy_page(args.rows))
+    cells = soup.find_all("td", class_="l")
+    ref = {"id": "o1", "name": "1AT"}
+
+    def parse_all(segmenter):
+        raw_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
+        names_map = {"teachers": {}, "rooms": {}, "classes": {}}
+        file_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
+        return [
+            scraper.parse_legacy_lesson_chunk(chunk, "classes", ref, raw_to_canon, names_map, file_to_canon)
+            for cell in cells
+            for chunk in segmenter(cell)
+        ]
+
+    if parse_all(reference_legacy_chunks) != parse_all(html_tree.split_on_br):
+        raise AssertionError("Segmentacja drzewa daje inne lekcje niż podział tekstu")
+
+    reference = best_of(args.repeat, lambda: parse_all(reference_legacy_chunks))
+    current = best_of(args.repeat, lambda: parse_all(html_tree.split_on_br))
+    return {"cells": len(cells), "reference_s": reference, "current_s": current}
+
+
+def reference_expand_rows(rows, spans_of):
+    """Dawna implementacja expand_tbody_rows (słownik aktywnych rowspanów przeszukiwany w każdym wierszu)."""
+    expanded = []
+    active = {}
+    for tr_cells in rows:
+        row = {}
+
+        def consume_active_until_gap(start_col):
+            c = start_col
+            while c in active:
+                cell, remaining = active[c]
+                row[c] = (cell, True)
+                if remaining <= 1:
+                    del active[c]
+                else:
+                    active[c] = (cell, remaining - 1)
+                c += 1
+            return c
+
+        col = consume_active_until_gap(0)
+        for cell in tr_cells:
+            col = consume_active_until_gap(col)
+            rowspan, colspan = spans_of(cell)
+            for offset in range(colspan):
+                idx = col + offset
+                row[idx] = (cell, False)
+                if rowspan > 1:
+                    active[idx] = (cell, rowspan - 1)
+            col += colspan
+            col = consume_active_until_gap(col)
+
+        while True:
+            if col in active:
+                cell, remaining = active[col]
+                row[col] = (cell, True)
+                if remaining <= 1:
+                    del active[col]
+                else:
+                    active[col] = (cell, remaining - 1)
+                col += 1
+                continue
+            higher = [k for k in active.keys() if k > col]
+            if not higher:
+                break
+            col = min(higher)
+        expanded.append(row)
+    return expanded
+
+
+def pathological_span_layouts():
+    """Układy komórek (rowspan, colspan) trudne dla rozwijania siatki; komórka to krotka (id, rowspan, colspan)."""
+    layouts = {
+        "empty": [[], [], []],
+        "full-height-rowspans": [[(f"c{c}", 50, 1) for c in range(40)]] + [[] for _ in range(49)],
+        "staircase": [[(f"r{r}", 60 - r, 1)] for r in range(60)],
+        "gaps-between-rowspans": [
+            [(f"a{r}", 1, 1)] + ([(f"long{r}", 30, 1), ("x", 1, 3), (f"far{r}", 30, 1)] if r == 0 else [])
+            for r in range(30)
+        ],
+        "overlapping-colspan": [
+            [("tall", 4, 1), ("b", 1, 1)],
+            [("wide", 1, 3)],
+            [("c", 3, 2)],
+            [("d", 1, 1), ("e", 1, 5)],
+            [],
+            [],
+        ],
+        "wide-long-rowspans": [
+            [(f"h{r}_{c}", 1 + (r * 7 + c * 3) % 9, 1 + (c % 3 == 0)) for c in range(0, 80, 1 + r % 3)]
+            for r in range(120)
+        ],
+    }
+    return layouts
+
+
+def bench_grid_expand(args):
+    spans_of = lambda cell: (cell[1], cell[2])  # noqa: E731
+    for name, rows in pathological_span_layouts().items():
+        expected = reference_expand_rows(rows, spans_of)
+        got = table_grid.expand_grid(rows, spans_of)
+        if len(expected) != len(got):
+            raise AssertionError(f"{name}: różna liczba wierszy")
+        for r, (exp_row, grid_row) in enumerate(zip(expected, got)):
+            got_row = {c: grid_row.get(c) for c in range(len(grid_row)) if grid_row.get(c) is not None}
+            if exp_row != got_row:
+                raise AssertionError(f"{name}: różnica w wierszu {r}: {exp_row} != {got_row}")
+
+    # Szeroka tabela: naprzemiennie długie i jednowierszowe rowspany - kolejne wiersze
+    # mają same przerwy między trwającymi rowspanami (najgorszy przypadek dawnego algorytmu).
+    width = 240
+    rows = [[(f"c{c}", args.rows if c % 2 == 0 else 1, 1) for c in range(width)]]
+    rows += [[("lead", 1, 1)] if r % 10 == 0 else [] for r in range(1, args.rows)]
+    reference = best_of(args.repeat, lambda: reference_expand_rows(rows, spans_of))
+    current = best_of(args.repeat, lambda: table_grid.expand_grid(rows, spans_of))
+    return {"layouts_checked": len(pathological_span_layouts()), "rows": len(rows), "reference_s": reference, "current_s": current}
+
+
+def bench_lesson_memory(args):
+    """Pamięć wewnętrznej reprezentacji lekcji (tracemalloc) dla dużej syntetycznej szkoły."""
+    n_classes = max(6, args.rows // 10)
+    school = synthetic_school.build_school(n_classes, n_classes * 2, n_classes)
+    soup = scraper.parse_html(synthetic_school.render_modern(school))
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        final_data = scraper.run_modern_scraper(soup, "http://synthetic/")
+    parsed_bytes, parse_peak = tracemalloc.get_traced_memory()
+    parsed_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.reset_peak()
+    sink = _CountingSink()
+    scraper.write_final_data_stream(sink, final_data, None)
+    write_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "classes": n_classes,
+        "output_chars": sink.size,
+        "retained_after_parse_bytes": parsed_bytes - baseline,
+        "retained_blocks": parsed_blocks,
+        "parse_peak_bytes": parse_peak - baseline,
+        "write_peak_bytes": write_peak - baseline,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def reference_normalize_text(value):
+    """Dawna implementacja normalizacji (wzorce przy każdym wywołaniu, bez pamięci wyników)."""
+    if value is None:
+        return ""
+    value = str(value).replace("\xa0", " ")
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def reference_normalize_subject_for_match(subject):
+    s = reference_normalize_text(subject).lower()
+    if not s:
+        return ""
+    s = re.sub(r"\s*-\s*([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\s*$", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"\s*\(([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\)\s*$", "", s, flags=re.IGNORECASE)
+    return reference_normalize_text(s)
+
+
+def reference_add_mark_to_subject(subject, mark):
+    subject = reference_normalize_text(subject)
+    mark = reference_normalize_text(mark)
+    if not subject or not mark:
+        return subject
+    if re.search(rf"(?:^|[\s\-(]){re.escape(mark)}(?:$|[\s)])", subject, flags=re.IGNORECASE):
+        return subject
+    return f"{subject} - {mark}"
+
+
+def reference_mark_sort_key(mark):
+    mark = reference_normalize_text(mark)
+    m = re.match(r"^(\d+)/(\d+)$", mark)
+    if m:
+        return (0, int(m.group(2)), int(m.group(1)), mark)
+    return (1, mark.lower(), mark)
+
+
+def reference_strip_group_mark(group_name):
+    return re.sub(r"\s*\([^()]+\)\s*$", "", reference_normalize_text(group_name))
+
+
+REFERENCE_NORMALIZATION = {
+    "normalize_text": reference_normalize_text,
+    "normalize_subject_for_match": reference_normalize_subject_for_match,
+    "add_mark_to_subject": reference_add_mark_to_subject,
+    "mark_sort_key": reference_mark_sort_key,
+    "strip_group_mark": reference_strip_group_mark,
+}
+
+
+@contextlib.contextmanager
+def reference_normalization():
+    """Podmienia w scraper.py funkcje normalizacji na dawne implementacje (ten sam algorytm wyżej)."""
+    saved = {name: getattr(scraper, name) for name in REFERENCE_NORMALIZATION}
+    for name, fn in REFERENCE_NORMALIZATION.items():
+        setattr(scraper, name, fn)
+    try:
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(scraper, name, fn)
+
+
+def copy_timetables(all_timetables):
+    return {
+        canon_id: [
+            Lesson(
+                lesson.day,
+                lesson.lesson_num,
+                lesson.time,
+                lesson.subject,
+                lesson.teacher,
+                lesson.group,
+                lesson.room,
+                source_domain=lesson.source_domain,
+                subject_base=lesson.subject_base,
+                subgroup_mark=lesson.subgroup_mark,
+            )
+            for lesson in lessons
+        ]
+        for canon_id, lessons in all_timetables.items()
+    }
+
+
+def synthetic_school_timetables(args):
+    """Lekcje wszystkich planów dużej syntetycznej szkoły w stanie sprzed odtwarzania podgrup."""
+    n_classes = max(6, args.rows // 10)
+    school = synthetic_school.build_school(n_classes, n_classes * 2, n_classes)
+    soup = scraper.parse_html(synthetic_school.render_modern(school))
+    captured = {}
+    reconstruct = scraper.reconstruct_class_subgroups
+
+    def capture(all_timetables):
+        captured.update(copy_timetables(all_timetables))
+        return reconstruct(all_timetables)
+
+    scraper.reconstruct_class_subgroups = capture
+    minimal_fetch, scraper.MINIMAL_FETCH = scraper.MINIMAL_FETCH, False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.run_modern_scraper(soup, "http://synthetic/")
+    finally:
+        scraper.reconstruct_class_subgroups = reconstruct
+        scraper.MINIMAL_FETCH = minimal_fetch
+    return n_classes, captured
+
+
+def best_of_fresh(repeat, make, fn):
+    """Jak best_of, ale każde powtórzenie dostaje świeże dane z make() (poza pomiarem)."""
+    best = None
+    for _ in range(repeat):
+        data = make()
+        started = time.perf_counter()
+        fn(data)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def cold(fn):
+    """Pomiar od pustej pamięci normalizacji - jak pierwszy przebieg w nowym procesie."""
+
+    def run(*args):
+        text_norm.cache_clear()
+        return fn(*args)
+
+    return run
+
+
+def bench_lesson_key(args):
+    n_classes, all_timetables = synthetic_school_timetables(args)
+    lessons = [lesson for lessons in all_timetables.values() for lesson in lessons]
+    with reference_normalization():
+        expected = [scraper.lesson_key(lesson) for lesson in lessons]
+    if [scraper.lesson_key(lesson) for lesson in lessons] != expected:
+        raise AssertionError("lesson_key daje inne klucze niż dawna normalizacja")
+
+    with reference_normalization():
+        reference = best_of(args.repeat, lambda: [scraper.lesson_key(lesson) for lesson in lessons])
+    current = best_of(args.repeat, cold(lambda: [scraper.lesson_key(lesson) for lesson in lessons]))
+    hit_rate = text_norm.cache_stats()["normalize_subject_for_match"]["hit_rate"]
+    return {"classes": n_classes, "lessons": len(lessons), "reference_s": reference, "current_s": current, "hit_rate": hit_rate}
+
+
+def bench_subgroups(args):
+    n_classes, all_timetables = synthetic_school_timetables(args)
+
+    def reconstructed(normalization):
+        timetables = copy_timetables(all_timetables)
+        with normalization:
+            counts = scraper.reconstruct_class_subgroups(timetables)
+        return counts, {k: [lesson.to_public() for lesson in v] for k, v in timetables.items()}
+
+    expected = reconstructed(reference_normalization())
+    if reconstructed(contextlib.nullcontext()) != expected:
+        raise AssertionError("reconstruct_class_subgroups daje inne lekcje niż z dawną normalizacją")
+
+    make = lambda: copy_timetables(all_timetables)  # noqa: E731
+    with reference_normalization():
+        reference = best_of_fresh(args.repeat, make, scraper.reconstruct_class_subgroups)
+    current = best_of_fresh(args.repeat, make, cold(scraper.reconstruct_class_subgroups))
+    return {
+        "classes": n_classes,
+        "lessons": sum(len(v) for v in all_timetables.values()),
+        "assigned": expected[0][0],
+        "reference_s": reference,
+        "current_s": current,
+        "text_cache": {name: e["hit_rate"] for name, e in text_norm.cache_stats().items() if e["hits"] + e["misses"]},
+    }
+
+
+def synthetic_final_data(n_classes):
+    school = synthetic_school.build_school(n_classes, n_classes * 2, n_classes)
+    soup = scraper.parse_html(synthetic_school.render_modern(school))
+    with contextlib.redirect_stdout(io.StringIO()):
+        final_data = scraper.run_modern_scraper(soup, "http://synthetic/")
+    final_data["timetables"] = dict(final_data["timetables"])
+    return final_data
+
+
+def bench_conflicts(args):
+    """Kontrola spójności na szkole N i 10N oddziałów - czas na lekcję powinien być podobny (koszt liniowy)."""
+    results = {}
+    for n_classes in (max(6, args.rows // 10), max(6, args.rows // 10) * 10):
+        final_data = synthetic_final_data(n_classes)
+        report = timetable_checks.build_report(final_data)
+        if any(report["summary"].values()):
+            raise AssertionError(f"Konflikty w szkole bez kolizji ({n_classes} oddziałów): {report['summary']}")
+        lessons = sum(len(v) for v in final_data["timetables"].values())
+        seconds = best_of(args.repeat, lambda: timetable_checks.build_report(final_data))
+        results[n_classes] = {"lessons": lessons, "seconds": seconds, "us_per_lesson": seconds / lessons * 1e6}
+    small, large = results.values()
+    return {
+        "lessons": small["lessons"],
+        "seconds": small["seconds"],
+        "lessons_10x": large["lessons"],
+        "seconds_10x": large["seconds"],
+        "per_lesson_ratio": round(large["us_per_lesson"] / small["us_per_lesson"], 2),
+    }
+
+
+BENCHMARKS = {
+    "grid-expand": bench_grid_expand,
+    "subject-extract": bench_subject_extract,
+    "legacy-chunks": bench_legacy_chunks,
+    "lesson-memory": bench_lesson_memory,
+    "lesson-key": bench_lesson_key,
+    "subgroups": bench_subgroups,
+    "conflicts": bench_conflicts,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help=f"benchmarki do uruchomienia ({', '.join(sorted(BENCHMARKS))})")
+    parser.add_argument("--rows", type=int, default=400, help="liczba wierszy syntetycznej tabeli")
+    parser.add_argument("--repeat", type=int, default=3, help="liczba powtórzeń (liczy się najlepszy czas)")
+    parser.add_argument("--backend", default=scraper.PARSER_BACKEND, choices=html_tree.BACKENDS)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"nieznane benchmarki: {', '.join(unknown)}")
+    scraper.PARSER_BACKEND = args.backend
+
+    results = {}
+    for name in args.names or sorted(BENCHMARKS):
+        result = BENCHMARKS[name](args)
+        if result.get("reference_s"):
+            result["speedup"] = round(result["reference_s"] / result["current_s"], 2)
+        results[name] = result
+        summary = ", ".join(
+            f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in result.items()
+        )
+        print(f"{name}: {summary}")
+    print(json.dumps({"ok": True, "backend": args.backend, "results": results}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
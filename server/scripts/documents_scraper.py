@@ -13,6 +13,7 @@ import subprocess
 import sys
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from statistics import median
 from urllib.parse import urljoin
@@ -21,6 +22,8 @@ import requests
 from bs4 import BeautifulSoup
 from bs4 import NavigableString
 
+import adaptive_concurrency
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
@@ -29,6 +32,18 @@ OUTPUT_FILE = os.path.join(PUBLIC_DIR, "documents.json")
 SOURCE_URL = "https://zse-zdwola.pl/regulaminy-dla-ucznia/"
 USER_AGENT = "Mozilla/5.0 (compatible; ZSE-DocScraper/1.0; +https://zse-zdwola.pl)"
 REQUEST_TIMEOUT = 15
+# Upper bound for parallel teaching-plan probes; the adaptive limiter decides how many actually run.
+PROBE_WORKERS = max(1, int(os.environ.get("SCRAPER_PROBE_WORKERS", "6")))
+
+# Wspólna sesja HTTP (keep-alive); w procesie rezydentnym (scraper_worker.py)
+# połączenia zostają otwarte między zadaniami.
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT})
+_ADAPTER = requests.adapters.HTTPAdapter(pool_maxsize=max(10, PROBE_WORKERS))
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+# Adaptive request limiter, created per run in main().
+LIMITER = None
 
 TEACHING_PLAN_PROFILES = {
     "TP": {
@@ -65,8 +80,14 @@ def emit(msg):
     print(f"[documents_scraper] {msg}", flush=True)
 
 
+def limited_get(url, **kwargs):
+    if LIMITER:
+        return LIMITER.call(SESSION.get, url, timeout=REQUEST_TIMEOUT, **kwargs)
+    return SESSION.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+
+
 def get_page(url):
-    r = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
+    r = limited_get(url)
     r.raise_for_status()
     return r.text
 
@@ -294,7 +315,7 @@ PROFILE_LETTERS = {"A", "I", "E", "G", "P"}
 
 def download_pdf_to_temp(url):
     """Download a PDF to a temp file, return its path."""
-    r = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
+    r = limited_get(url)
     r.raise_for_status()
     fd, path = tempfile.mkstemp(suffix=".pdf")
     os.write(fd, r.content)
@@ -679,54 +700,70 @@ def parse_teaching_plan_text(text, profile_key, class_num):
     return subjects
 
 
+def probe_teaching_plan(url):
+    """Check that a teaching plan PDF exists (headers only, the body is not downloaded)."""
+    response = limited_get(url, stream=True)
+    try:
+        response.raise_for_status()
+    finally:
+        response.close()
+
+
 def scrape_teaching_plans():
     """Build a simple list of teaching plan PDFs without parsing their table contents."""
-    plans = {}
-
+    probes = []
     for profile_key, profile in TEACHING_PLAN_PROFILES.items():
-        emit(f"Processing profile: {profile['name']} ({profile_key})")
-        profile_data = {
-            "name": profile["name"],
-            "code": profile["code"],
-            "classes": [],
-        }
-
         for cls in profile["classes"]:
             filename = f"{cls}{profile_key}.pdf"
-            url = TEACHING_PLAN_BASE_URL + filename
-            emit(f"  Registering {filename}...")
-
-            title = f"{filename} · {profile['name']}"
-
-            try:
-                response = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT}, stream=True)
-                response.raise_for_status()
-                response.close()
-
-                profile_data["classes"].append(
-                    {
-                        "classNum": cls,
-                        "url": url,
-                        "title": title,
-                    }
-                )
-            except Exception as e:
-                emit(f"  Error checking {filename}: {e}")
-                profile_data["classes"].append(
-                    {
-                        "classNum": cls,
-                        "url": url,
-                        "title": filename,
-                        "parseError": True,
-                    }
-                )
-
-        plans[profile_key] = profile_data
+            probes.append((profile_key, cls, filename, TEACHING_PLAN_BASE_URL + filename))
+
+    def probe(entry):
+        try:
+            probe_teaching_plan(entry[3])
+        except Exception as e:
+            return e
+        return None
+
+    # Probes run in parallel; results are assembled in the fixed profile/class order.
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as ex:
+        errors = list(ex.map(probe, probes))
+
+    plans = {}
+    for (profile_key, cls, filename, url), error in zip(probes, errors):
+        profile = TEACHING_PLAN_PROFILES[profile_key]
+        if profile_key not in plans:
+            emit(f"Processing profile: {profile['name']} ({profile_key})")
+            plans[profile_key] = {
+                "name": profile["name"],
+                "code": profile["code"],
+                "classes": [],
+            }
+        emit(f"  Registering {filename}...")
+        if error is None:
+            plans[profile_key]["classes"].append(
+                {
+                    "classNum": cls,
+                    "url": url,
+                    "title": f"{filename} · {profile['name']}",
+                }
+            )
+        else:
+            emit(f"  Error checking {filename}: {error}")
+            plans[profile_key]["classes"].append(
+                {
+                    "classNum": cls,
+                    "url": url,
+                    "title": filename,
+                    "parseError": True,
+                }
+            )
 
     return plans
 
 
 def main():
+    global LIMITER
+    LIMITER = adaptive_concurrency.limiter_from_env("documents", PROBE_WORKERS)
     started = time.time()
     emit("Starting documents scrape...")
 
@@ -763,19 +800,19 @@ def main():
     teaching_plan_count = sum(len(profile["classes"]) for profile in teaching_plans.values())
     emit(f"Done in {elapsed}s. Wrote {OUTPUT_FILE}")
     emit(f"  Documents: {len(general_docs)}, Teaching plans: {teaching_plan_count} files")
+    emit(LIMITER.summary())
 
     # Structured output for job system
-    print(
-        json.dumps(
-            {
-                "__structured_result__": True,
-                "documents": len(general_docs),
-                "teachingPlans": teaching_plan_count,
-                "elapsed": elapsed,
-            }
-        ),
-        flush=True,
-    )
+    result = {
+        "__structured_result__": True,
+        "ok": True,
+        "documents": len(general_docs),
+        "teachingPlans": teaching_plan_count,
+        "elapsed": elapsed,
+        "concurrency": LIMITER.snapshot(),
+    }
+    print(json.dumps(result), flush=True)
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,340 @@
+"""
+Wybór backendu parsera HTML dla scrapera planu lekcji.
+
+Obsługiwane backendy:
+- "html.parser" - BeautifulSoup z parserem z biblioteki standardowej (domyślny, najwolniejszy),
+- "lxml"        - BeautifulSoup z parserem lxml,
+- "lxml-raw"    - bezpośrednio lxml.html, bez budowania drzewa BeautifulSoup.
+
+Dla "lxml-raw" drzewo jest opakowane w LxmlNode, który udostępnia podzbiór API
+BeautifulSoup używany przez scraper.py (find/find_all/select/get_text/get/children).
+"""
+
+import re
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml jest w requirements.txt
+    lxml = None
+    etree = None
+
+
+BACKENDS = ("html.parser", "lxml", "lxml-raw")
+DEFAULT_BACKEND = "html.parser"
+# Nazwy kodeków Pythona, których libxml2 nie zna (BOM i tak rozpoznaje sam).
+_LIBXML_ENCODINGS = {"utf-8-sig": "utf-8"}
+
+
+def resolve_backend(name):
+    name = (name or "").strip().lower() or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Nieznany backend parsera: {name} (dostępne: {', '.join(BACKENDS)})")
+    if name != "html.parser" and etree is None:
+        print(f"Backend {name} wymaga lxml, który nie jest zainstalowany. Używam html.parser.")
+        return "html.parser"
+    return name
+
+
+def parse_html(markup, backend=DEFAULT_BACKEND, encoding=None):
+    """Parsuje str albo bajty. Dla bajtów podane kodowanie trafia prosto do parsera (bez dekodowania do str)."""
+    if backend == "lxml-raw":
+        return LxmlNode(_lxml_document(markup, encoding))
+    if isinstance(markup, bytes) and encoding:
+        return BeautifulSoup(markup, backend, from_encoding=encoding)
+    return BeautifulSoup(markup, backend)
+
+
+def _lxml_document(markup, encoding=None):
+    if not markup.strip():
+        return lxml.html.Element("html")
+    if isinstance(markup, bytes) and encoding:
+        try:
+            parser = lxml.html.HTMLParser(encoding=_LIBXML_ENCODINGS.get(encoding, encoding))
+        except LookupError:
+            # Kodowanie znane Pythonowi, ale nie libxml2 - dekodujemy sami.
+            return _lxml_document(markup.decode(encoding, errors="replace"))
+        try:
+            return lxml.html.document_fromstring(markup, parser=parser)
+        except etree.ParserError:
+            return lxml.html.Element("html")
+    try:
+        return lxml.html.document_fromstring(markup)
+    except ValueError:
+        # lxml odrzuca str z deklaracją kodowania XML - parsujemy bajty UTF-8.
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        return lxml.html.document_fromstring(markup.encode("utf-8"), parser=parser)
+    except etree.ParserError:
+        return lxml.html.Element("html")
+
+
+def _has_class(classes, class_):
+    if isinstance(classes, str):
+        classes = classes.split()
+    return class_ in (classes or ())
+
+
+def _iter_soup_strings(node, name, class_):
+    for child in node.children:
+        if isinstance(child, Tag):
+            if child.name == name and _has_class(child.get("class"), class_):
+                continue
+            yield from _iter_soup_strings(child, name, class_)
+        elif type(child) in (NavigableString, CData):
+            yield str(child)
+
+
+def _iter_lxml_strings(el, name, class_):
+    if el.text and isinstance(el.tag, str):
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            if not (child.tag.lower() == name and _has_class(child.get("class"), class_)):
+                yield from _iter_lxml_strings(child, name, class_)
+        if child.tail:
+            yield child.tail
+
+
+def get_text_excluding(node, name, class_, separator=" "):
+    """Odpowiednik node.get_text(separator, strip=True) z pominięciem poddrzew <name class="class_">.
+
+    Przechodzi istniejące drzewo jeden raz - bez kopiowania ani ponownego parsowania komórki.
+    """
+    if isinstance(node, LxmlNode):
+        strings = _iter_lxml_strings(node.el, name, class_)
+    else:
+        strings = _iter_soup_strings(node, name, class_)
+    return separator.join(t.strip() for t in strings if t.strip())
+
+
+def _soup_matches(tag, name, class_, attrs):
+    if name is not None and tag.name != name:
+        return False
+    if class_ is not None and not _has_class(tag.get("class"), class_):
+        return False
+    for key, expected in attrs.items():
+        value = tag.get(key)
+        if expected is True:
+            if value is None:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _lxml_matches(el, name, class_, attrs):
+    tag = el.tag
+    if not isinstance(tag, str):
+        return False
+    if name is not None:
+        tag = tag.lower()
+        if isinstance(name, (list, tuple, set)):
+            if tag not in name:
+                return False
+        elif tag != name:
+            return False
+    if class_ is not None and class_ not in (el.get("class") or "").split():
+        return False
+    for key, expected in attrs.items():
+        value = el.get(key)
+        if expected is True:
+            if value is None:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class NodeSegment:
+    """Fragment komórki między znacznikami <br> - lista węzłów i tekstów istniejącego drzewa.
+
+    Udostępnia find/find_all/get_text jak mini-drzewo, bez kopiowania ani ponownego parsowania.
+    Elementy to węzły BeautifulSoup (Tag/NavigableString) albo elementy lxml i teksty (str).
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items = []
+
+    def _iter_matches(self, name, class_, attrs):
+        # Własne przejście po potomkach - find_all BeautifulSoup ma duży koszt stały na wywołanie.
+        for item in self.items:
+            if isinstance(item, Tag):
+                if _soup_matches(item, name, class_, attrs):
+                    yield item
+                for desc in item.descendants:
+                    if isinstance(desc, Tag) and _soup_matches(desc, name, class_, attrs):
+                        yield desc
+            elif not isinstance(item, str):
+                for el in item.iter():
+                    if _lxml_matches(el, name, class_, attrs):
+                        yield LxmlNode(el)
+
+    def find_all(self, name=None, class_=None, **attrs):
+        return list(self._iter_matches(name, class_, attrs))
+
+    def find(self, name=None, class_=None, **attrs):
+        return next(self._iter_matches(name, class_, attrs), None)
+
+    def _iter_strings(self):
+        for item in self.items:
+            if isinstance(item, Tag):
+                yield from item.strings
+            elif isinstance(item, str):
+                if not isinstance(item, NavigableString) or type(item) in (NavigableString, CData):
+                    yield item
+            else:
+                yield from item.itertext()
+
+    def get_text(self, separator="", strip=False):
+        if strip:
+            return separator.join(t.strip() for t in self._iter_strings() if t.strip())
+        return separator.join(self._iter_strings())
+
+
+def _soup_contains_br(tag):
+    return tag.find("br") is not None
+
+
+def _split_soup(node, segments):
+    for child in node.children:
+        if isinstance(child, Tag):
+            if child.name == "br":
+                segments.append(NodeSegment())
+                continue
+            if _soup_contains_br(child):
+                # <br> zagnieżdżony głębiej: dzielimy zawartość, pomijając sam element opakowujący.
+                _split_soup(child, segments)
+                continue
+        segments[-1].items.append(child)
+
+
+def _split_lxml(el, segments):
+    if el.text:
+        segments[-1].items.append(el.text)
+    for child in el:
+        tag = child.tag
+        if isinstance(tag, str):
+            if tag.lower() == "br":
+                segments.append(NodeSegment())
+            elif next(child.iterdescendants("br"), None) is not None:
+                _split_lxml(child, segments)
+            else:
+                segments[-1].items.append(child)
+        if child.tail:
+            segments[-1].items.append(child.tail)
+
+
+def split_on_br(cell):
+    """Dzieli zawartość komórki na fragmenty rozdzielone znacznikami <br> (na dowolnej głębokości)."""
+    segments = [NodeSegment()]
+    if isinstance(cell, LxmlNode):
+        _split_lxml(cell.el, segments)
+    else:
+        _split_soup(cell, segments)
+    return segments
+
+
+_SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][a-zA-Z0-9]*|\*)?((?:\.[\w-]+)*)((?:\[[\w-]+\])*)$")
+
+
+def _selector_to_xpath(selector):
+    """Tłumaczy prosty selektor CSS (tag, .klasa, [atrybut], potomek, '>') na XPath."""
+    tokens = selector.replace(">", " > ").split()
+    parts = []
+    axis = ".//"
+    for token in tokens:
+        if token == ">":
+            axis = "./" if not parts else "/"
+            continue
+        m = _SIMPLE_SELECTOR_RE.match(token)
+        if not m:
+            raise ValueError(f"Nieobsługiwany selektor CSS dla lxml-raw: {selector}")
+        tag, classes, attrs = m.groups()
+        step = tag or "*"
+        for cls in filter(None, classes.split(".")):
+            step += f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+        for attr in re.findall(r"\[([\w-]+)\]", attrs):
+            step += f"[@{attr}]"
+        if parts and axis == ".//":
+            axis = "//"
+        parts.append(axis + step)
+        axis = ".//"
+    return "".join(parts)
+
+
+class LxmlNode:
+    """Minimalna nakładka na element lxml zgodna z API BeautifulSoup używanym przez scraper."""
+
+    __slots__ = ("el",)
+
+    def __init__(self, el):
+        self.el = el
+
+    def __eq__(self, other):
+        return isinstance(other, LxmlNode) and other.el is self.el
+
+    def __hash__(self):
+        return id(self.el)
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return etree.tostring(self.el, encoding="unicode", method="html", with_tail=False)
+
+    @property
+    def name(self):
+        tag = self.el.tag
+        return tag.lower() if isinstance(tag, str) else None
+
+    @property
+    def children(self):
+        for child in self.el:
+            if isinstance(child.tag, str):
+                yield LxmlNode(child)
+
+    def get(self, key, default=None):
+        value = self.el.get(key)
+        if value is None:
+            return default
+        if key == "class":
+            return value.split()
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get_text(self, separator="", strip=False):
+        texts = self.el.itertext()
+        if strip:
+            return separator.join(t.strip() for t in texts if t.strip())
+        return separator.join(texts)
+
+    def find_all(self, name=None, class_=None, recursive=True, **attrs):
+        candidates = self.el.iterdescendants() if recursive else iter(self.el)
+        return [LxmlNode(el) for el in candidates if _lxml_matches(el, name, class_, attrs)]
+
+    def find(self, name=None, class_=None, recursive=True, **attrs):
+        candidates = self.el.iterdescendants() if recursive else iter(self.el)
+        for el in candidates:
+            if _lxml_matches(el, name, class_, attrs):
+                return LxmlNode(el)
+        return None
+
+    def select(self, selector):
+        return [LxmlNode(el) for el in self.el.xpath(_selector_to_xpath(selector))]
+
+    def select_one(self, selector):
+        found = self.el.xpath(_selector_to_xpath(selector))
+        return LxmlNode(found[0]) if found else None
+
+    def decompose(self):
+        # drop_tree zachowuje tekst następujący po elemencie (jak decompose w BeautifulSoup).
+        self.el.drop_tree()
@@ -0,0 +1,205 @@
+"""
+Trwała pamięć podręczna HTTP z warunkowymi żądaniami (ETag / Last-Modified).
+
+Dla każdego URL zapisywane są walidatory, skrót SHA-256 i typ treści; same treści
+leżą w plikach nazwanych skrótem (identyczne strony zajmują miejsce raz).
+Przy kolejnym pobraniu wysyłane są If-None-Match / If-Modified-Since, a odpowiedź
+304 jest uzupełniana zapisaną treścią. Rozmiar jest ograniczony (eksmisja LRU).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+
+INDEX_FILE = "index.json"
+
+
+class ConditionalCache:
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, "bodies")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {
+            "requests": 0,
+            "conditional": 0,
+            "not_modified": 0,
+            "stored": 0,
+            "store_errors": 0,
+            "evicted": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+        }
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data.get("entries", {}) if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _body_path(self, sha256):
+        return os.path.join(self.bodies_dir, sha256)
+
+    def conditional_headers(self, url):
+        with self.lock:
+            self.stats["requests"] += 1
+            entry = self.entries.get(url)
+            if not entry or not os.path.exists(self._body_path(entry["sha256"])):
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            if headers:
+                self.stats["conditional"] += 1
+            return headers
+
+    def restore(self, url, response):
+        """Uzupełnia odpowiedź 304 zapisaną treścią. Zwraca None, gdy wpisu brakuje."""
+        with self.lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return None
+            try:
+                with open(self._body_path(entry["sha256"]), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self.entries.pop(url, None)
+                self._dirty = True
+                return None
+            entry["last_used"] = time.time()
+            self._dirty = True
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += len(body)
+
+        response._content = body
+        response.status_code = 200
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        # 304 potwierdza zapisaną wersję - jej walidatory obowiązują, o ile serwer nie podał nowych.
+        for header, key in (("ETag", "etag"), ("Last-Modified", "last_modified")):
+            if entry.get(key) and header not in response.headers:
+                response.headers[header] = entry[key]
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def store(self, url, response):
+        body = response.content
+        sha256 = hashlib.sha256(body).hexdigest()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        path = self._body_path(sha256)
+        tmp = None
+        error = None
+        if (etag or last_modified) and not os.path.exists(path):
+            # Zapis treści poza blokadą - równoległe pobrania nie czekają na dysk.
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(self.bodies_dir, exist_ok=True)
+                with open(tmp, "wb") as f:
+                    f.write(body)
+            except OSError as e:
+                error = e
+        with self.lock:
+            self.stats["bytes_downloaded"] += len(body)
+            if not etag and not last_modified:
+                # Bez walidatorów nie da się zapytać warunkowo - nie ma sensu trzymać treści.
+                if self.entries.pop(url, None) is not None:
+                    self._dirty = True
+                return
+            if tmp and error is None:
+                # Podmiana pod blokadą: save() nie usunie treści, zanim trafi ona do indeksu.
+                try:
+                    os.replace(tmp, path)
+                except OSError as e:
+                    error = e
+            if error is None:
+                self.entries[url] = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "sha256": sha256,
+                    "size": len(body),
+                    "content_type": response.headers.get("Content-Type"),
+                    "last_used": time.time(),
+                }
+                self.stats["stored"] += 1
+                self._dirty = True
+                return
+            # Cache jest opcjonalny: błąd zapisu (pełny dysk, brak uprawnień) oznacza tylko brak wpisu.
+            if self.entries.pop(url, None) is not None:
+                self._dirty = True
+            self.stats["store_errors"] += 1
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        print(f"Cache HTTP: nie zapisano treści {url}: {error}")
+
+    def _evict(self):
+        # Treść współdzielona przez kilka URL zwalnia miejsce dopiero z ostatnim wpisem.
+        sizes = {}
+        refs = {}
+        for entry in self.entries.values():
+            sizes[entry["sha256"]] = entry.get("size", 0)
+            refs[entry["sha256"]] = refs.get(entry["sha256"], 0) + 1
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self.entries.items(), key=lambda kv: kv[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            del self.entries[url]
+            self.stats["evicted"] += 1
+            refs[entry["sha256"]] -= 1
+            if not refs[entry["sha256"]]:
+                total -= sizes[entry["sha256"]]
+
+    def save(self):
+        """Zapisuje indeks (atomowo) i usuwa treści, do których nie odwołuje się żaden wpis."""
+        with self.lock:
+            if not self._dirty:
+                return
+            self._evict()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            index_path = os.path.join(self.cache_dir, INDEX_FILE)
+            tmp = index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, ensure_ascii=False)
+            os.replace(tmp, index_path)
+            live = {entry["sha256"] for entry in self.entries.values()}
+            try:
+                names = os.listdir(self.bodies_dir)
+            except OSError:
+                names = []
+            for name in names:
+                if name not in live and not name.endswith(".tmp"):
+                    try:
+                        os.remove(os.path.join(self.bodies_dir, name))
+                    except OSError:
+                        pass
+            self._dirty = False
+
+    def summary(self):
+        s = self.stats
+        return (
+            "Cache HTTP: "
+            f"żądania={s['requests']}, "
+            f"warunkowe={s['conditional']}, "
+            f"304={s['not_modified']}, "
+            f"zapisane={s['stored']}, "
+            f"błędy_zapisu={s['store_errors']}, "
+            f"wyeksmitowane={s['evicted']}, "
+            f"pobrane_bajty={s['bytes_downloaded']}, "
+            f"zaoszczędzone_bajty={s['bytes_saved']}"
+        )
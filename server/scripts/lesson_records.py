@@ -0,0 +1,103 @@
+"""
+Wewnętrzna reprezentacja lekcji scrapera.
+
+Lesson to rekord ze __slots__ (bez słownika na instancję). Odnośniki teacher/group/room
+są internowane: jeden współdzielony słownik {"id", "name"} na parę (id, nazwa), więc
+tysiące lekcji tego samego nauczyciela wskazują ten sam obiekt. Internowane odnośniki
+są niezmienne - zmiana nazwy (np. dopisanie podgrupy) to podmiana na inny odnośnik.
+Pula żyje przez jeden przebieg - scrape_and_save czyści ją na starcie (reset_ref_pool),
+żeby proces rezydentny nie gromadził odnośników z kolejnych wersji planu.
+Kształt publiczny (słownik lekcji) powstaje dopiero przy serializacji (to_public).
+"""
+
+import sys
+
+
+_REF_POOL = {}
+
+
+def intern_ref(ref):
+    """Zwraca współdzielony słownik {"id", "name"} dla odnośnika (albo None)."""
+    if not ref:
+        return None
+    key = (ref.get("id"), ref.get("name"))
+    shared = _REF_POOL.get(key)
+    if shared is None:
+        shared = {"id": key[0], "name": key[1]}
+        _REF_POOL[key] = shared
+    return shared
+
+
+def reset_ref_pool():
+    _REF_POOL.clear()
+
+
+def make_ref(ref_id, name):
+    return intern_ref({"id": ref_id, "name": name})
+
+
+def intern_text(value):
+    return sys.intern(value) if value else ""
+
+
+class Lesson:
+    __slots__ = (
+        "day",
+        "lesson_num",
+        "time",
+        "subject",
+        "teacher",
+        "group",
+        "room",
+        "source_domain",
+        "subject_base",
+        "subgroup_mark",
+    )
+
+    def __init__(
+        self,
+        day,
+        lesson_num,
+        time,
+        subject,
+        teacher,
+        group,
+        room,
+        source_domain="",
+        subject_base="",
+        subgroup_mark=None,
+    ):
+        self.day = intern_text(day)
+        self.lesson_num = intern_text(lesson_num)
+        self.time = intern_text(time)
+        self.subject = subject or ""
+        self.teacher = intern_ref(teacher)
+        self.group = intern_ref(group)
+        self.room = intern_ref(room)
+        self.source_domain = source_domain
+        self.subject_base = subject_base or ""
+        self.subgroup_mark = subgroup_mark
+
+    def ref(self, field):
+        """Odnośnik teacher/group/room po nazwie pola."""
+        return getattr(self, field)
+
+    def to_public(self):
+        return {
+            "day": self.day,
+            "lesson_num": self.lesson_num,
+            "time": self.time,
+            "subject": self.subject,
+            "teacher": self.teacher,
+            "group": self.group,
+            "room": self.room,
+        }
+
+    def to_state(self):
+        """Zwarta postać do pliku stanu przyrostowego (pola publiczne w stałej kolejności)."""
+        return [self.day, self.lesson_num, self.time, self.subject, self.teacher, self.group, self.room]
+
+    @classmethod
+    def from_state(cls, row, source_domain):
+        day, lesson_num, time, subject, teacher, group, room = row
+        return cls(day, lesson_num, time, subject, teacher, group, room, source_domain)
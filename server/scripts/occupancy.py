@@ -0,0 +1,213 @@
+"""
+Indeks zajętości slotów (dzień x numer lekcji) dla nauczycieli, sal i oddziałów.
+
+Każda encja ma bitmapę zajętych slotów: bit (indeks_dnia * liczba_lekcji + indeks_lekcji)
+jest ustawiony, gdy encja ma w tym slocie lekcję (we własnym planie albo jako nauczyciel/sala/grupa
+lekcji z innego planu). Przy wczytaniu indeks jest dodatkowo transponowany: dla każdego slotu
+i domeny powstaje bitmapa zajętych encji, więc pytanie o wolne sale w danym slocie to jedna
+operacja bitowa.
+
+Plik (public/timetable_occupancy.json):
+    {"format": "timetable-occupancy", "version": 1, "days": [...], "lesson_nums": [...],
+     "times": {numer: godziny}, "occupancy": {"teachers": {id: hex}, "rooms": {...}, "classes": {...}}}
+
+Użycie:
+    python occupancy.py free-rooms DZIEŃ NUMER [--file PLIK]
+    python occupancy.py free-teachers DZIEŃ NUMER [--file PLIK]
+    python occupancy.py free-slots ID [ID ...] [--file PLIK]   # wspólne wolne sloty encji
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+FORMAT_NAME = "timetable-occupancy"
+FORMAT_VERSION = 1
+DOMAINS = ("teachers", "rooms", "classes")
+DEFAULT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "public",
+    "timetable_occupancy.json",
+)
+
+
+def _lesson_num_key(num):
+    return (0, int(num), num) if num.isdigit() else (1, 0, num)
+
+
+def build_index(final_data, days=None):
+    """Buduje dokument indeksu z danych planu. `days` - kolejność dni (domyślnie kolejność wystąpienia)."""
+    timetables = final_data.get("timetables", {})
+    seen_days = {}
+    times = {}
+    for lessons in timetables.values():
+        for lesson in lessons:
+            seen_days.setdefault(lesson.get("day") or "", None)
+            num = lesson.get("lesson_num") or ""
+            if num and num not in times:
+                times[num] = lesson.get("time") or ""
+    day_list = [day for day in (days or []) if day in seen_days]
+    day_list += [day for day in seen_days if day not in day_list]
+    lesson_nums = sorted(times, key=_lesson_num_key)
+
+    day_idx = {day: i for i, day in enumerate(day_list)}
+    num_idx = {num: i for i, num in enumerate(lesson_nums)}
+    width = len(lesson_nums)
+    entity_domain = {}
+    for domain in DOMAINS:
+        for entity_id in final_data.get(domain, {}):
+            entity_domain.setdefault(entity_id, domain)
+
+    bits = {domain: {entity_id: 0 for entity_id in final_data.get(domain, {})} for domain in DOMAINS}
+    for owner_id, lessons in timetables.items():
+        owner_domain = entity_domain.get(owner_id)
+        for lesson in lessons:
+            num = lesson.get("lesson_num") or ""
+            if num not in num_idx:
+                continue
+            bit = 1 << (day_idx[lesson.get("day") or ""] * width + num_idx[num])
+            if owner_domain:
+                bits[owner_domain][owner_id] = bits[owner_domain].get(owner_id, 0) | bit
+            for domain, field in (("teachers", "teacher"), ("rooms", "room"), ("classes", "group")):
+                ref = lesson.get(field)
+                ref_id = ref.get("id") if ref else None
+                if ref_id and entity_domain.get(ref_id) == domain:
+                    bits[domain][ref_id] |= bit
+
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "days": day_list,
+        "lesson_nums": lesson_nums,
+        "times": times,
+        "occupancy": {
+            domain: {entity_id: format(mask, "x") for entity_id, mask in bits[domain].items()}
+            for domain in DOMAINS
+        },
+    }
+
+
+class OccupancyIndex:
+    """Zapytania o wolne sloty na bitmapach. Koszt zapytania nie zależy od liczby lekcji."""
+
+    def __init__(self, doc):
+        if not isinstance(doc, dict) or doc.get("format") != FORMAT_NAME:
+            raise ValueError("To nie jest indeks timetable-occupancy")
+        if doc.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja indeksu zajętości: {doc.get('version')}")
+        self.days = doc["days"]
+        self.lesson_nums = doc["lesson_nums"]
+        self.times = doc.get("times", {})
+        self.width = len(self.lesson_nums)
+        self.slot_count = len(self.days) * self.width
+        self.all_slots = (1 << self.slot_count) - 1
+        self._day_idx = {day.lower(): i for i, day in enumerate(self.days)}
+        self._num_idx = {num: i for i, num in enumerate(self.lesson_nums)}
+
+        self.ids = {}
+        self.masks = {}
+        self.domain_of = {}
+        self.by_slot = {}
+        for domain in DOMAINS:
+            entries = doc.get("occupancy", {}).get(domain, {})
+            self.ids[domain] = list(entries)
+            self.masks[domain] = {entity_id: int(mask, 16) for entity_id, mask in entries.items()}
+            for entity_id in entries:
+                self.domain_of.setdefault(entity_id, domain)
+            # Transpozycja: slot -> bitmapa encji domeny zajętych w tym slocie.
+            slots = [0] * self.slot_count
+            for pos, entity_id in enumerate(self.ids[domain]):
+                mask = self.masks[domain][entity_id]
+                while mask:
+                    low = mask & -mask
+                    slots[low.bit_length() - 1] |= 1 << pos
+                    mask ^= low
+            self.by_slot[domain] = slots
+
+    @classmethod
+    def load(cls, path=DEFAULT_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def slot(self, day, lesson_num):
+        """Indeks slotu dla nazwy dnia (bez względu na wielkość liter) lub numeru dnia od 0."""
+        key = str(day).strip().lower()
+        d = self._day_idx.get(key)
+        if d is None and key.isdigit() and int(key) < len(self.days):
+            d = int(key)
+        n = self._num_idx.get(str(lesson_num).strip())
+        if d is None or n is None:
+            raise KeyError(f"Nieznany slot: {day} / {lesson_num}")
+        return d * self.width + n
+
+    def slot_label(self, slot):
+        day, num = divmod(slot, self.width)
+        lesson_num = self.lesson_nums[num]
+        return self.days[day], lesson_num, self.times.get(lesson_num, "")
+
+    def _decode(self, domain, mask):
+        ids = self.ids[domain]
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(ids[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def free_entities(self, domain, day, lesson_num):
+        busy = self.by_slot[domain][self.slot(day, lesson_num)]
+        everyone = (1 << len(self.ids[domain])) - 1
+        return self._decode(domain, everyone & ~busy)
+
+    def free_rooms(self, day, lesson_num):
+        return self.free_entities("rooms", day, lesson_num)
+
+    def free_teachers(self, day, lesson_num):
+        return self.free_entities("teachers", day, lesson_num)
+
+    def is_free(self, entity_id, day, lesson_num):
+        domain = self.domain_of[entity_id]
+        return not (self.masks[domain][entity_id] >> self.slot(day, lesson_num)) & 1
+
+    def common_free_mask(self, entity_ids):
+        busy = 0
+        for entity_id in entity_ids:
+            busy |= self.masks[self.domain_of[entity_id]][entity_id]
+        return self.all_slots & ~busy
+
+    def common_free_slots(self, entity_ids):
+        """Sloty (dzień, numer, godziny), w których wszystkie podane encje są wolne."""
+        mask = self.common_free_mask(entity_ids)
+        return [self.slot_label(slot) for slot in range(self.slot_count) if (mask >> slot) & 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("free-rooms", "free-teachers", "free-slots"))
+    parser.add_argument("args", nargs="+")
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    args = parser.parse_args(argv)
+    index = OccupancyIndex.load(args.file)
+
+    try:
+        if args.command == "free-slots":
+            result = [
+                {"day": day, "lesson_num": num, "time": time}
+                for day, num, time in index.common_free_slots(args.args)
+            ]
+        else:
+            if len(args.args) != 2:
+                parser.error(f"{args.command} wymaga argumentów DZIEŃ NUMER")
+            domain = "rooms" if args.command == "free-rooms" else "teachers"
+            result = index.free_entities(domain, *args.args)
+    except KeyError as e:
+        print(json.dumps({"ok": False, "error": str(e.args[0])}, ensure_ascii=False))
+        return 1
+    print(json.dumps({"ok": True, "data": result}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Harness sprawdzający, że scraper.py daje bajtowo identyczny timetable_data.json
+niezależnie od backendu parsera HTML (html.parser, lxml, lxml-raw).
+
+Użycie:
+    python parser_equivalence.py record KATALOG   # nagraj strony źródłowe (prawdziwa sieć)
+    python parser_equivalence.py check KATALOG    # odtwórz nagranie dla każdego backendu i porównaj wyniki
+
+Nagranie to katalog z plikiem index.json (URL -> status, nagłówki, plik z treścią)
+oraz surowymi treściami odpowiedzi. Odtwarzanie nie wykonuje żadnych żądań sieciowych.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import html_tree
+import scraper
+
+
+INDEX_FILE = "index.json"
+RECORDED_HEADERS = ("content-type", "location", "etag", "last-modified")
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, record_dir, index):
+        super().__init__()
+        self.record_dir = record_dir
+        self.index = index
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        body = response.content
+        filename = hashlib.sha256(request.url.encode("utf-8")).hexdigest()[:16] + ".body"
+        with open(os.path.join(self.record_dir, filename), "wb") as f:
+            f.write(body)
+        self.index["responses"][request.url] = {
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in RECORDED_HEADERS},
+            "file": filename,
+        }
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, record_dir, index):
+        super().__init__()
+        self.record_dir = record_dir
+        self.index = index
+
+    def send(self, request, **kwargs):
+        entry = self.index["responses"].get(request.url)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if entry is None:
+            response.status_code = 404
+            response._content = b""
+            response.headers = CaseInsensitiveDict()
+        else:
+            with open(os.path.join(self.record_dir, entry["file"]), "rb") as f:
+                response._content = f.read()
+            response.status_code = entry["status"]
+            response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        pass
+
+
+class _FrozenDatetime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2000, 1, 1, tzinfo=tz)
+
+
+def load_index(record_dir):
+    with open(os.path.join(record_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(record_dir):
+    os.makedirs(record_dir, exist_ok=True)
+    index = {
+        "landing_url": scraper.TIMETABLE_LANDING_URL,
+        "fallback_url": scraper.TIMETABLE_FALLBACK_URL,
+        "responses": {},
+    }
+    session = scraper.create_session()
+    adapter = RecordingAdapter(record_dir, index)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    original = (scraper.FORCE_REBUILD, scraper.LEGACY_CHECKPOINT_FILE)
+    # Nagranie musi objąć cały przebieg, także gdy opublikowany plan pochodzi z tych samych stron.
+    scraper.FORCE_REBUILD = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Punkt kontrolny produkcji nie może skrócić nagrania ani zostać przez nie usunięty.
+            scraper.LEGACY_CHECKPOINT_FILE = os.path.join(tmp, "legacy-checkpoint.json")
+            final_data = scraper.scrape_timetable(session)
+    finally:
+        scraper.FORCE_REBUILD, scraper.LEGACY_CHECKPOINT_FILE = original
+    with open(os.path.join(record_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    print(f"Nagrano {len(index['responses'])} odpowiedzi do {record_dir}")
+    return final_data is not None
+
+
+def run_backend(record_dir, index, backend, output_file):
+    """Uruchamia pełny przebieg scrapera na nagraniu z danym backendem i zapisuje wynik."""
+    scraper.PARSER_BACKEND = backend
+    scraper.TIMETABLE_LANDING_URL = index["landing_url"]
+    scraper.TIMETABLE_FALLBACK_URL = index["fallback_url"]
+    scraper.OUTPUT_FILE = output_file
+    # Porównanie wymaga pełnego przebiegu niezależnie od odcisku w pliku wyjściowym.
+    scraper.FORCE_REBUILD = True
+    session = scraper.create_session()
+    adapter = ReplayAdapter(record_dir, index)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        final_data = scraper.scrape_timetable(session)
+    elapsed = time.perf_counter() - started
+    if final_data is None:
+        return None, elapsed
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper.save_final_data(final_data)
+    with open(output_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest(), elapsed
+
+
+def check(record_dir, backends=html_tree.BACKENDS):
+    index = load_index(record_dir)
+    original = (
+        scraper.PARSER_BACKEND,
+        scraper.TIMETABLE_LANDING_URL,
+        scraper.TIMETABLE_FALLBACK_URL,
+        scraper.OUTPUT_FILE,
+        scraper.FORCE_REBUILD,
+        scraper.datetime,
+        scraper.INCREMENTAL_ENABLED,
+        scraper.LEGACY_CHECKPOINT_FILE,
+        scraper.SHARDS_ENABLED,
+        scraper.OUTPUT_V2_ENABLED,
+        scraper.OCCUPANCY_ENABLED,
+        scraper.CONFLICTS_ENABLED,
+    )
+    # Zamrożony zegar, żeby metadata.scraped_on nie różniło plików.
+    scraper.datetime = types.SimpleNamespace(datetime=_FrozenDatetime)
+    # Każdy backend musi sparsować wszystkie strony sam, bez wyników poprzedniego przebiegu.
+    scraper.INCREMENTAL_ENABLED = False
+    # Porównywany jest tylko timetable_data.json - bez zapisu plików pobocznych do public/.
+    scraper.SHARDS_ENABLED = False
+    scraper.OUTPUT_V2_ENABLED = False
+    scraper.OCCUPANCY_ENABLED = False
+    scraper.CONFLICTS_ENABLED = False
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Bez wznawiania z punktu kontrolnego produkcji (i bez jego usuwania po przebiegu).
+            scraper.LEGACY_CHECKPOINT_FILE = os.path.join(tmp, "legacy-checkpoint.json")
+            for backend in backends:
+                digest, elapsed = run_backend(record_dir, index, backend, os.path.join(tmp, f"{backend}.json"))
+                results[backend] = {"sha256": digest, "parse_seconds": round(elapsed, 3)}
+                print(f"{backend:12s} {digest or 'BŁĄD':64s} {elapsed:8.3f}s")
+    finally:
+        (
+            scraper.PARSER_BACKEND,
+            scraper.TIMETABLE_LANDING_URL,
+            scraper.TIMETABLE_FALLBACK_URL,
+            scraper.OUTPUT_FILE,
+            scraper.FORCE_REBUILD,
+            scraper.datetime,
+            scraper.INCREMENTAL_ENABLED,
+            scraper.LEGACY_CHECKPOINT_FILE,
+            scraper.SHARDS_ENABLED,
+            scraper.OUTPUT_V2_ENABLED,
+            scraper.OCCUPANCY_ENABLED,
+            scraper.CONFLICTS_ENABLED,
+        ) = original
+
+    digests = {r["sha256"] for r in results.values()}
+    identical = len(digests) == 1 and None not in digests
+    print("Wyniki identyczne." if identical else "RÓŻNICE między backendami!")
+    print(json.dumps({"ok": identical, "backends": results}, ensure_ascii=False))
+    return identical
+
+
+def main(argv):
+    if len(argv) != 3 or argv[1] not in {"record", "check"}:
+        print(__doc__)
+        return 2
+    if argv[1] == "record":
+        return 0 if record(argv[2]) else 1
+    return 0 if check(argv[2]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
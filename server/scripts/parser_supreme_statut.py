@@ -148,20 +148,31 @@ def parse_html_statut(filepath):
     return result
 
 # ---- Uruchomienie skryptu ----
-if __name__ == "__main__":
+def main():
+    """Parsuje statut do JSON-a. Zwraca (i wypisuje) linię wyniku {"ok", "output"|"error"}."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(script_dir))
     input_file = os.environ.get('STATUT_INPUT_FILE', os.path.join(project_root, 'docs', 'sources', 'statut-szkolny.html'))
     output_file = os.environ.get('STATUT_OUTPUT_FILE', os.path.join(project_root, 'public', 'statut.json'))
+    result = {"ok": False, "output": output_file}
     try:
         parsed_data = parse_html_statut(input_file)
         if parsed_data and parsed_data.get("chapters"):
             with open(output_file, 'w', encoding='utf-8') as f:
                 json.dump(parsed_data, f, indent=2, ensure_ascii=False)
             print(f"Parsowanie zakończone pomyślnie. Wynik zapisano w pliku: {output_file}")
+            result.update({"ok": True, "chapters": len(parsed_data["chapters"])})
         else:
             print("Parsowanie nie powiodło się lub dokument jest pusty. Nie utworzono pliku wyjściowego.")
+            result["error"] = "empty_document"
     except FileNotFoundError:
         print(f"Błąd: Nie znaleziono pliku '{input_file}'. Upewnij się, że plik znajduje się w tym samym folderze co skrypt.")
+        result["error"] = "input_not_found"
     except Exception as e:
         print(f"Wystąpił nieoczekiwany błąd podczas parsowania: {e}")
+        result["error"] = str(e)
+    print(json.dumps(result, ensure_ascii=False))
+    return result
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Pomiar przebiegu scrapera: czasy faz, czasy pojedynczych tabel/stron, liczniki i szczytowa pamięć.
+
+Fazy (discover, fetch, parse, write, ...) mierzone są w wątku głównym i się nie nakładają,
+więc ich suma plus "other_seconds" daje czas całego przebiegu. Pozycje ("items", np. każda
+tabela albo strona planu) są zawarte w fazach - raportowana jest ich liczba, suma czasu
+i najwolniejsza pozycja. Liczniki (żądania, bajty, czas żądań w wątkach pobierających)
+są bezpieczne wątkowo. Szczyt pamięci jest zerowany na starcie przebiegu, o ile system
+na to pozwala (peak_rss_scope: "run"); inaczej to szczyt całego procesu ("process"),
+co w procesie rezydentnym obejmuje też wcześniejsze zadania.
+"""
+
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_kb():
+    """Szczytowe RSS bieżącego procesu w KB.
+
+    Na Linuksie czytane z VmHWM: ru_maxrss po fork+exec zawiera też szczyt procesu
+    rodzica (np. serwera Node albo benchmarku), więc zawyżałby wynik przebiegu.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS podaje ru_maxrss w bajtach, Linux w KB.
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def reset_peak_rss():
+    """Zeruje VmHWM do bieżącego RSS (Linux >= 4.0). Zwraca False, gdy się nie da."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class RunMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.items = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.peak_rss_scope = "run" if reset_peak_rss() else "process"
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    def add_phase(self, name, seconds):
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "count": 0})
+        entry["seconds"] += seconds
+        entry["count"] += 1
+
+    def add_item(self, kind, seconds, item):
+        entry = self.items.get(kind)
+        if entry is None:
+            entry = self.items[kind] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "max_item": None}
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        if seconds >= entry["max_seconds"]:
+            entry["max_seconds"] = seconds
+            entry["max_item"] = item
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        total = time.perf_counter() - self.started
+        phases = {name: {"seconds": round(e["seconds"], 4), "count": e["count"]} for name, e in self.phases.items()}
+        items = {
+            kind: {
+                "count": e["count"],
+                "seconds": round(e["seconds"], 4),
+                "max_seconds": round(e["max_seconds"], 4),
+                "max_item": e["max_item"],
+            }
+            for kind, e in self.items.items()
+        }
+        with self.lock:
+            counters = {k: round(v, 4) if isinstance(v, float) else v for k, v in self.counters.items()}
+        return {
+            "total_seconds": round(total, 4),
+            "other_seconds": round(max(0.0, total - sum(e["seconds"] for e in self.phases.values())), 4),
+            "phases": phases,
+            "items": items,
+            "counters": counters,
+            "peak_rss_kb": peak_rss_kb(),
+            "peak_rss_scope": self.peak_rss_scope,
+        }
+
+    def summary(self):
+        """Jednoliniowe podsumowanie faz do logu."""
+        parts = [f"{name}={e['seconds']:.3f}s" for name, e in self.phases.items()]
+        scope = "przebiegu" if self.peak_rss_scope == "run" else "procesu"
+        return f"Czasy faz: {', '.join(parts)}; szczyt RSS {scope}={peak_rss_kb()} KB"
@@ -1,18 +1,54 @@
+import argparse
+import codecs
+import cProfile
 import datetime
+import hashlib
 import json
 import os
+import pstats
+import queue
 import re
-from collections import defaultdict
+import threading
+import time
+from collections import ChainMap, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from urllib.parse import quote, urljoin, urlparse
 
 import requests
-from bs4 import BeautifulSoup
+
+import adaptive_concurrency
+import html_tree
+import http_cache
+import occupancy
+import scrape_metrics
+import table_grid
+import text_norm
+import timetable_checks
+import timetable_shards
+import timetable_v2
+from lesson_records import Lesson, make_ref, reset_ref_pool
+from text_norm import (
+    SUBJECT_DASH_MARK_RE,
+    add_mark_to_subject,
+    extract_chunk_mark,
+    mark_sort_key,
+    maybe_add_mark_to_group_name,
+    normalize_subject_for_match,
+    normalize_text,
+    normalize_time,
+    strip_group_mark,
+)
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
 OUTPUT_FILE = os.path.join(PUBLIC_DIR, "timetable_data.json")
+OUTPUT_V2_FILE = os.path.join(PUBLIC_DIR, "timetable_data.v2.json")
+SHARDS_DIR = os.path.join(PUBLIC_DIR, "timetables")
+OCCUPANCY_FILE = os.path.join(PUBLIC_DIR, "timetable_occupancy.json")
+CONFLICTS_FILE = os.path.join(PUBLIC_DIR, "timetable_conflicts.json")
+RUNTIME_DIR = os.path.join(PROJECT_ROOT, "server", "runtime")
 
 # Strona WordPress osadzająca iframe z właściwym planem
 TIMETABLE_LANDING_URL = os.environ.get(
@@ -24,27 +60,64 @@ TIMETABLE_FALLBACK_URL = os.environ.get(
     "TIMETABLE_FALLBACK_URL",
     "https://planlekcji.zse-zdwola.pl/",
 )
+# Wykrywanie źródła: strona osadzająca i fallback URL pobierane równolegle - fallback startuje po
+# SCRAPER_HEDGE_DELAY s (albo od razu po błędzie strony osadzającej), wygrywa pierwsza poprawna strona planu.
+# Wykryty src iframe jest pamiętany w SCRAPER_LANDING_CACHE_FILE przez SCRAPER_LANDING_CACHE_TTL s (0 = bez pamięci).
+HEDGE_DELAY = max(0.0, float(os.environ.get("SCRAPER_HEDGE_DELAY", "2")))
+LANDING_CACHE_TTL = max(0.0, float(os.environ.get("SCRAPER_LANDING_CACHE_TTL", "86400")))
+LANDING_CACHE_FILE = os.environ.get("SCRAPER_LANDING_CACHE_FILE", os.path.join(RUNTIME_DIR, "scraper-cache", "landing.json"))
 
 REQUEST_TIMEOUT = float(os.environ.get("SCRAPER_TIMEOUT", "20"))
 REQUEST_RETRIES = max(1, int(os.environ.get("SCRAPER_RETRIES", "3")))
+# Liczba równoległych pobrań stron planów w trybie legacy (1 = sekwencyjnie)
+LEGACY_FETCH_WORKERS = max(1, int(os.environ.get("SCRAPER_LEGACY_WORKERS", "6")))
+# Trwały cache warunkowych żądań HTTP (ETag/Last-Modified) dla stron źródłowych planu
+HTTP_CACHE_ENABLED = os.environ.get("SCRAPER_HTTP_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+HTTP_CACHE_DIR = os.environ.get("SCRAPER_HTTP_CACHE_DIR", os.path.join(RUNTIME_DIR, "scraper-cache", "http"))
+HTTP_CACHE_MAX_BYTES = int(float(os.environ.get("SCRAPER_HTTP_CACHE_MAX_MB", "64")) * 1024 * 1024)
+# Tryb przyrostowy legacy: strony o niezmienionej treści nie są parsowane, lekcje pochodzą z pliku stanu
+INCREMENTAL_ENABLED = os.environ.get("SCRAPER_INCREMENTAL", "1").strip().lower() not in {"0", "false", "no", "off"}
+LEGACY_STATE_FILE = os.environ.get("SCRAPER_LEGACY_STATE", os.path.join(RUNTIME_DIR, "scraper-cache", "legacy-pages.json"))
+# Odcisk źródła: przy niezmienionych stronach źródłowych pomijamy parsowanie i zapis (SCRAPER_FORCE=1 wymusza pełny przebieg)
+FORCE_REBUILD = os.environ.get("SCRAPER_FORCE", "").strip().lower() in {"1", "true", "yes", "on"}
+# Termin zadania (--deadline): zapas na zapis punktu kontrolnego i wyniku przed zabiciem procesu przez serwer.
+DEADLINE_RESERVE = max(0.0, float(os.environ.get("SCRAPER_DEADLINE_RESERVE", "10")))
+LEGACY_CHECKPOINT_FILE = os.environ.get(
+    "SCRAPER_LEGACY_CHECKPOINT", os.path.join(RUNTIME_DIR, "scraper-cache", "legacy-checkpoint.json")
+)
+LEGACY_CHECKPOINT_TTL = max(0.0, float(os.environ.get("SCRAPER_LEGACY_CHECKPOINT_TTL", "21600")))
+LEGACY_CHECKPOINT_INTERVAL = max(1.0, float(os.environ.get("SCRAPER_LEGACY_CHECKPOINT_INTERVAL", "30")))
+# Tryb obserwacji (--watch): lekkie sprawdzenie źródła co SCRAPER_WATCH_INTERVAL s; gdy nic się nie zmienia, odstęp
+# rośnie x SCRAPER_WATCH_BACKOFF do SCRAPER_WATCH_MAX_INTERVAL. Pełny przebieg tylko po zmianie sygnałów źródła
+# (albo co SCRAPER_WATCH_FULL_CHECK s, 0 = nigdy) - niezmienione strony i tak kończą go przed parsowaniem.
+WATCH_INTERVAL = max(1.0, float(os.environ.get("SCRAPER_WATCH_INTERVAL", "300")))
+WATCH_MAX_INTERVAL = max(WATCH_INTERVAL, float(os.environ.get("SCRAPER_WATCH_MAX_INTERVAL", "1800")))
+WATCH_BACKOFF = max(1.0, float(os.environ.get("SCRAPER_WATCH_BACKOFF", "1.5")))
+WATCH_FULL_CHECK = max(0.0, float(os.environ.get("SCRAPER_WATCH_FULL_CHECK", "21600")))
+# Backend parsera HTML: html.parser (domyślny), lxml albo lxml-raw (lxml.html bez BeautifulSoup)
+PARSER_BACKEND = html_tree.resolve_backend(os.environ.get("SCRAPER_PARSER"))
+SHARDS_ENABLED = os.environ.get("SCRAPER_OUTPUT_SHARDS", "1").strip().lower() not in {"0", "false", "no", "off"}
+OCCUPANCY_ENABLED = os.environ.get("SCRAPER_OUTPUT_OCCUPANCY", "1").strip().lower() not in {"0", "false", "no", "off"}
+CONFLICTS_ENABLED = os.environ.get("SCRAPER_OUTPUT_CONFLICTS", "1").strip().lower() not in {"0", "false", "no", "off"}
+COMPACT_JSON = os.environ.get("SCRAPER_COMPACT_JSON", "").strip().lower() in {"1", "true", "yes", "on"}
+OUTPUT_V2_ENABLED = os.environ.get("SCRAPER_OUTPUT_V2", "").strip().lower() in {"1", "true", "yes", "on"}
+# Tryb minimalny: parsuj tylko plany oddziałów, plany nauczycieli i sal wyprowadzaj przez odwrócenie lekcji
+MINIMAL_FETCH = os.environ.get("SCRAPER_MINIMAL_FETCH", "").strip().lower() in {"1", "true", "yes", "on"}
+# Procesy parsujące tabele nowego formatu: 1 = w procesie głównym, 0 = liczba rdzeni.
+PARSE_WORKERS = max(0, int(os.environ.get("SCRAPER_PARSE_WORKERS", "1"))) or os.cpu_count() or 1
 USER_AGENT = os.environ.get(
     "SCRAPER_UA",
     "Mozilla/5.0 (compatible; ZSE-TimetableScraper/2.0; +https://zse-zdwola.pl)",
 )
 
 
-def normalize_text(value):
-    if value is None:
-        return ""
-    value = str(value).replace("\xa0", " ")
-    return re.sub(r"\s+", " ", value).strip()
+def parse_html(markup, encoding=None):
+    return html_tree.parse_html(markup, PARSER_BACKEND, encoding)
 
 
-def normalize_time(value):
-    text = normalize_text(value)
-    text = text.replace("–", "-").replace("—", "-")
-    text = re.sub(r"\s*-\s*", " - ", text)
-    return normalize_text(text)
+def parse_response(response):
+    """Drzewo HTML prosto z bajtów odpowiedzi i ustalonego kodowania (bez pośredniego str)."""
+    return parse_html(response.content, response.encoding)
 
 
 def parse_int_attr(value, default=1):
@@ -127,45 +200,444 @@ def ensure_entity(domain, raw_id, label, raw_to_canon, names_map):
     return canon
 
 
+# Deklaracja kodowania szukana jest tylko w początku dokumentu (jak w przeglądarkach).
+ENCODING_SNIFF_BYTES = 4096
+META_CHARSET_RE = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([A-Za-z0-9._:-]+)""", re.IGNORECASE)
+# Domyślne kodowanie requests dla text/* bez charset (i częsta błędna deklaracja) - nie ufamy mu.
+UNTRUSTED_ENCODINGS = {"iso-8859-1", "latin-1", "latin1", "ascii", "us-ascii"}
+
+
+def known_encoding(label):
+    """Etykieta kodowania, o ile Python ją zna (i nie jest niewiarygodnym latin-1/ascii), inaczej None."""
+    label = (label or "").strip().lower()
+    if not label or label in UNTRUSTED_ENCODINGS:
+        return None
+    try:
+        codecs.lookup(label)
+    except LookupError:
+        return None
+    return label
+
+
+def sniff_encoding(head):
+    """Kodowanie z BOM albo z <meta charset>/http-equiv w początku dokumentu. Zwraca (kodowanie, ścieżka)."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig", "bom"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16", "bom"
+    match = META_CHARSET_RE.search(head)
+    if match:
+        encoding = known_encoding(match.group(1).decode("ascii"))
+        if encoding:
+            return encoding, "meta"
+    return None, None
+
+
 def prepare_response_encoding(response, fallback="utf-8"):
-    """Prefer apparent UTF-8 when server omits/sets legacy latin-1 charset."""
-    encoding = (response.encoding or "").lower()
-    if not encoding or encoding in {"iso-8859-1", "latin-1", "latin1", "ascii"}:
-        apparent = (response.apparent_encoding or "").strip()
-        if apparent:
-            response.encoding = apparent
-        else:
-            response.encoding = fallback
+    """Ustala kodowanie odpowiedzi bez statystycznego wykrywania, o ile się da.
+
+    Kolejność: BOM, charset z nagłówka (poza latin-1/ascii, które requests przyjmuje domyślnie),
+    <meta charset>/http-equiv z pierwszych KB, poprawne UTF-8. Wykrywanie statystyczne
+    (apparent_encoding - przebieg po całej treści) tylko na końcu. Ścieżka trafia do liczników encoding_*.
+    """
+    body = response.content or b""
+    head = body[:ENCODING_SNIFF_BYTES]
+    encoding, path = None, None
+    if not head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        if "charset" in response.headers.get("Content-Type", "").lower():
+            encoding, path = known_encoding(response.encoding), "header"
+    if not encoding:
+        encoding, path = sniff_encoding(head)
+    if not encoding:
+        try:
+            body.decode("utf-8")
+            encoding, path = "utf-8", "utf8"
+        except UnicodeDecodeError:
+            pass
+    if not encoding:
+        encoding, path = (response.apparent_encoding or "").strip() or fallback, "detect"
+        print(f"  -> Kodowanie {response.url} wykryte statystycznie: {encoding}")
+    response.encoding = encoding
+    METRICS.count(f"encoding_{path}")
     return response
 
 
-def request_with_retries(session, url):
+def response_text(response):
+    """Treść odpowiedzi jako str, dekodowana raz (requests dekoduje przy każdym odczycie .text)."""
+    text = getattr(response, "_decoded_text", None)
+    if text is None:
+        text = response._decoded_text = response.text
+    return text
+
+
+HTTP_CACHE = None
+# Termin bieżącego przebiegu (Deadline) albo None - ustawiany przez main(--deadline).
+DEADLINE = None
+# Adaptacyjny limit równoległych pobrań stron legacy (do SCRAPER_LEGACY_WORKERS), tworzony na przebieg.
+LIMITER = None
+# Pomiar bieżącego przebiegu (fazy, liczniki, pamięć) - trafia do linii __structured_result__.
+METRICS = scrape_metrics.RunMetrics()
+
+
+class Deadline:
+    """Termin przebiegu liczony zegarem monotonicznym, z zapasem na zapis punktu kontrolnego i wyniku."""
+
+    def __init__(self, seconds, reserve=DEADLINE_RESERVE):
+        self.seconds = seconds
+        self.end = time.monotonic() + seconds
+        # Przy krótkim terminie zapas nie może zjeść całego czasu pracy.
+        self.reserve = min(reserve, seconds / 4)
+
+    def remaining(self):
+        return self.end - time.monotonic()
+
+    def near(self, share=1.0):
+        """True, gdy do terminu zostało mniej niż share * zapas."""
+        return self.remaining() < self.reserve * share
+
+    def request_timeout(self, timeout):
+        return max(1.0, min(timeout, self.remaining() - self.reserve / 2))
+
+
+class RequestCancelled(Exception):
+    """Żądanie przegranej ścieżki wykrywania źródła - jego wynik nie jest już potrzebny."""
+
+
+def is_cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def timed_get(session, url, limiter=None, cancel=None, **kwargs):
+    started = time.perf_counter()
+    timeout = DEADLINE.request_timeout(REQUEST_TIMEOUT) if DEADLINE else REQUEST_TIMEOUT
+    try:
+        if limiter:
+            resp = limiter.call(session.get, url, timeout=timeout, **kwargs)
+        else:
+            resp = session.get(url, timeout=timeout, **kwargs)
+    finally:
+        # Odpowiedź po anulowaniu mogłaby trafić do pomiaru następnego zadania procesu rezydentnego.
+        if not is_cancelled(cancel):
+            METRICS.count("requests")
+            METRICS.count("request_seconds", time.perf_counter() - started)
+    if is_cancelled(cancel):
+        raise RequestCancelled(url)
+    if resp.status_code != 304:
+        METRICS.count("bytes_downloaded", len(resp.content))
+    return resp
+
+
+def request_with_retries(session, url, limiter=None, cancel=None):
+    """GET z ponowieniami. limiter - AdaptiveLimiter ograniczający równoległe żądania (429/503 z Retry-After
+    wstrzymują kolejne próby do wskazanej chwili). cancel - threading.Event; po jego ustawieniu kolejne
+    kroki kończą się RequestCancelled bez liczników, logu i zapisu do cache."""
     last_err = None
     for attempt in range(1, REQUEST_RETRIES + 1):
+        if is_cancelled(cancel):
+            raise RequestCancelled(url)
         try:
-            resp = session.get(url, timeout=REQUEST_TIMEOUT)
+            headers = HTTP_CACHE.conditional_headers(url) if HTTP_CACHE else {}
+            resp = timed_get(session, url, limiter, cancel, headers=headers)
+            if resp.status_code == 304 and HTTP_CACHE:
+                restored = HTTP_CACHE.restore(url, resp)
+                if restored is None:
+                    resp = timed_get(session, url, limiter, cancel)
+                else:
+                    METRICS.count("bytes_from_cache", len(restored.content))
+                    return prepare_response_encoding(restored)
             resp.raise_for_status()
+            if HTTP_CACHE:
+                HTTP_CACHE.store(url, resp)
             return prepare_response_encoding(resp)
         except requests.RequestException as e:
+            if is_cancelled(cancel):
+                raise RequestCancelled(url) from e
             last_err = e
+            METRICS.count("request_errors")
             print(f"  -> Próba {attempt}/{REQUEST_RETRIES} nieudana dla {url}: {e}")
+            if DEADLINE and DEADLINE.near():
+                break
     raise last_err
 
 
-def discover_source_url(session):
-    print(f"Pobieranie strony osadzającej plan: {TIMETABLE_LANDING_URL}")
+class SourceUnchanged(Exception):
+    """Strony źródłowe są identyczne z tymi, z których zbudowano opublikowany plan."""
+
+    def __init__(self, fingerprint, generation_date=""):
+        super().__init__(fingerprint)
+        self.fingerprint = fingerprint
+        self.generation_date = generation_date
+
+
+class DeadlineReached(Exception):
+    """Przebieg przerwany przed terminem zadania; saved - czy zapisano punkt kontrolny do wznowienia."""
+
+    def __init__(self, done, total, saved=False):
+        super().__init__(f"{done}/{total}")
+        self.done = done
+        self.total = total
+        self.saved = saved
+
+
+# Wszystkie lokalne moduły importowane przez scraper - zmiana któregokolwiek może zmienić pliki wyjściowe.
+CODE_MODULES = (
+    "scraper.py",
+    "adaptive_concurrency.py",
+    "html_tree.py",
+    "http_cache.py",
+    "lesson_records.py",
+    "occupancy.py",
+    "scrape_metrics.py",
+    "table_grid.py",
+    "text_norm.py",
+    "timetable_checks.py",
+    "timetable_shards.py",
+    "timetable_v2.py",
+)
+
+
+def _code_fingerprint():
+    h = hashlib.sha256()
+    for name in CODE_MODULES:
+        try:
+            with open(os.path.join(SCRIPT_DIR, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(name.encode("utf-8"))
+    return h.hexdigest()
+
+
+def body_digest(response):
+    return hashlib.sha256(response.content).hexdigest()
+
+
+def compute_source_fingerprint(pages, generation_date=""):
+    """Odcisk przebiegu: wersja kodu, tryb, ustawienia wyjścia, data z planu oraz (URL, skrót treści) każdej strony źródłowej."""
+    h = hashlib.sha256()
+    h.update(_code_fingerprint().encode("ascii"))
+    h.update(f"minimal={int(MINIMAL_FETCH)}\ngeneration_date={generation_date}\n".encode("utf-8"))
+    # Zmiana ustawień zapisu (format, pliki pochodne) wymaga pełnego przebiegu mimo tych samych stron.
+    h.update(
+        f"compact={int(COMPACT_JSON)}\nv2={int(OUTPUT_V2_ENABLED)}\nshards={int(SHARDS_ENABLED)}\n"
+        f"occupancy={int(OCCUPANCY_ENABLED)}\nconflicts={int(CONFLICTS_ENABLED)}\n".encode("utf-8")
+    )
+    for url, digest in pages:
+        h.update(f"{url}\n{digest}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def read_published_fingerprint(path=None):
+    """Czyta metadata.source_fingerprint z początku opublikowanego pliku (metadata jest zapisywane jako pierwsze)."""
     try:
-        landing_resp = request_with_retries(session, TIMETABLE_LANDING_URL)
-        soup = BeautifulSoup(landing_resp.text, "html.parser")
-        iframe = soup.find("iframe", id="planIframe") or soup.find("iframe")
-        if iframe and iframe.get("src"):
-            source = urljoin(landing_resp.url, iframe["src"])
-            print(f"Wykryto źródło planu z iframe: {source}")
-            return source
-        print("Nie znaleziono iframe z planem. Używam fallback URL.")
-    except requests.RequestException as e:
-        print(f"Nie udało się pobrać strony landing: {e}. Używam fallback URL.")
-    return TIMETABLE_FALLBACK_URL
+        with open(path or OUTPUT_FILE, "r", encoding="utf-8") as f:
+            head = f.read(8192)
+    except OSError:
+        return None
+    m = re.search(r'"source_fingerprint"\s*:\s*"([0-9a-f]{64})"', head)
+    return m.group(1) if m else None
+
+
+def published_outputs_present():
+    """Czy istnieją wszystkie włączone pliki pochodne (mogły zostać usunięte niezależnie od głównego)."""
+    paths = []
+    if OUTPUT_V2_ENABLED:
+        paths.append(OUTPUT_V2_FILE)
+    if OCCUPANCY_ENABLED:
+        paths.append(OCCUPANCY_FILE)
+    if CONFLICTS_ENABLED:
+        paths.append(CONFLICTS_FILE)
+    if SHARDS_ENABLED:
+        paths.append(os.path.join(SHARDS_DIR, timetable_shards.MANIFEST_FILE))
+    return all(os.path.exists(path) for path in paths)
+
+
+def ensure_source_changed(fingerprint, generation_date=""):
+    if FORCE_REBUILD:
+        return
+    if read_published_fingerprint() == fingerprint and published_outputs_present():
+        raise SourceUnchanged(fingerprint, generation_date)
+
+
+def sniff_generation_date(html_text):
+    """Tania ekstrakcja daty wygenerowania planu (stopka / komórka .op) bez parsowania drzewa."""
+    m = re.search(r"wygenerowano\s+(\d{2}\.\d{2}\.\d{4})", html_text, flags=re.IGNORECASE)
+    if m:
+        return m.group(1)
+    m = re.search(r"<footer\b.*?(\d{2}\.\d{2}\.\d{4})", html_text, flags=re.IGNORECASE | re.DOTALL)
+    return m.group(1) if m else ""
+
+
+def create_session(pool_size=LEGACY_FETCH_WORKERS):
+    session = requests.Session()
+    session.headers.update({"User-Agent": USER_AGENT})
+    # Pula połączeń musi pomieścić wszystkie wątki pobierające, inaczej urllib3 odrzuca nadmiarowe połączenia.
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(10, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_pages_in_order(session, urls, workers=LEGACY_FETCH_WORKERS, limiter=None):
+    """Pobiera strony równolegle (ograniczona pula wątków), zwracając wyniki w kolejności wejściowej.
+
+    Generator zwraca krotki (url, response, error). Okno zleconych pobrań jest ograniczone,
+    więc w pamięci naraz trzyma się najwyżej kilka pobranych stron. workers to górna granica;
+    limiter (AdaptiveLimiter) ustala, ile żądań naraz faktycznie trafia do serwera.
+    """
+    urls = list(urls)
+    if workers <= 1:
+        for url in urls:
+            try:
+                yield url, request_with_retries(session, url, limiter), None
+            except requests.RequestException as e:
+                yield url, None, e
+        return
+
+    window = workers * 2
+    ex = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    next_idx = 0
+    try:
+        while next_idx < len(urls) or pending:
+            while next_idx < len(urls) and len(pending) < window:
+                url = urls[next_idx]
+                pending.append((url, ex.submit(request_with_retries, session, url, limiter)))
+                next_idx += 1
+            url, fut = pending.popleft()
+            try:
+                yield url, fut.result(), None
+            except requests.RequestException as e:
+                yield url, None, e
+    finally:
+        # Generator zamknięty wcześniej (np. termin zadania): niezaczęte pobrania są anulowane,
+        # a na trwające nie czekamy - ich wyniki i tak nie zostaną użyte.
+        ex.shutdown(wait=not pending, cancel_futures=True)
+
+
+def looks_like_plan(html_text):
+    return bool(MODERN_TABLE_RE.search(html_text) or LEGACY_MARKER_RE.search(html_text))
+
+
+def read_cached_source_url():
+    """src iframe zapamiętany przy poprzednim wykryciu (dla tej samej strony osadzającej i w ramach TTL)."""
+    if not LANDING_CACHE_TTL:
+        return None
+    try:
+        with open(LANDING_CACHE_FILE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("landing_url") != TIMETABLE_LANDING_URL:
+        return None
+    if time.time() - float(cached.get("resolved_at") or 0) > LANDING_CACHE_TTL:
+        return None
+    return cached.get("source_url") or None
+
+
+def save_cached_source_url(source_url):
+    if not LANDING_CACHE_TTL:
+        return
+    tmp_file = f"{LANDING_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(LANDING_CACHE_FILE), exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"landing_url": TIMETABLE_LANDING_URL, "source_url": source_url, "resolved_at": time.time()}, f)
+        os.replace(tmp_file, LANDING_CACHE_FILE)
+    except OSError as e:
+        print(f"Nie udało się zapisać źródła planu ze strony osadzającej: {e}")
+
+
+def find_landing_source_url(session, cancel=None):
+    """src iframe z planem ze strony osadzającej (None, gdy strona nie ma iframe)."""
+    print(f"Pobieranie strony osadzającej plan: {TIMETABLE_LANDING_URL}")
+    landing_resp = request_with_retries(session, TIMETABLE_LANDING_URL, cancel=cancel)
+    soup = parse_response(landing_resp)
+    if is_cancelled(cancel):
+        raise RequestCancelled(TIMETABLE_LANDING_URL)
+    iframe = soup.find("iframe", id="planIframe") or soup.find("iframe")
+    if iframe and iframe.get("src"):
+        source = urljoin(landing_resp.url, iframe["src"])
+        print(f"Wykryto źródło planu z iframe: {source}")
+        save_cached_source_url(source)
+        return source
+    print("Nie znaleziono iframe z planem.")
+    return None
+
+
+def discover_plan(session):
+    """Pobiera stronę planu. Zwraca (URL, odpowiedź).
+
+    Najpierw zapamiętany src iframe. Bez niego (albo gdy nie działa) ścieżki "strona osadzająca ->
+    iframe -> plan" i "fallback URL" ścigają się: fallback startuje po HEDGE_DELAY s albo od razu,
+    gdy strona osadzająca zawiedzie. Wygrywa pierwsza odpowiedź wyglądająca na plan; przegrana
+    ścieżka kończy trwające żądanie w wątku w tle, ale przebieg na nią nie czeka, a jej późny wynik
+    jest odrzucany (bez liczników, logu i zapisu cache).
+    """
+    cached = read_cached_source_url()
+    if cached:
+        print(f"Źródło planu z poprzedniego wykrycia: {cached}")
+        try:
+            response = request_with_retries(session, cached)
+            if looks_like_plan(response_text(response)):
+                return response.url, response
+            print("Zapamiętane źródło nie wygląda na plan - wykrywam ponownie.")
+        except requests.RequestException as e:
+            print(f"Zapamiętane źródło nie odpowiada: {e}. Wykrywam ponownie.")
+
+    cancel = threading.Event()
+
+    def via_landing():
+        source = find_landing_source_url(session, cancel)
+        if not source:
+            raise LookupError("brak iframe z planem na stronie osadzającej")
+        return request_with_retries(session, source, cancel=cancel)
+
+    def via_fallback():
+        print(f"Pobieranie planu z fallback URL: {TIMETABLE_FALLBACK_URL}")
+        return request_with_retries(session, TIMETABLE_FALLBACK_URL, cancel=cancel)
+
+    results = queue.Queue()
+
+    def start(name, fetch):
+        def run():
+            try:
+                results.put((name, fetch(), None))
+            except Exception as e:
+                results.put((name, None, e))
+
+        # Wątek w tle (daemon): wolna przegrana ścieżka nie blokuje zakończenia procesu.
+        threading.Thread(target=run, name=f"discover-{name}", daemon=True).start()
+        started.append(name)
+
+    started = []
+    finished = {}
+    start("landing", via_landing)
+    while len(finished) < len(started):
+        try:
+            name, response, error = results.get(timeout=None if "fallback" in started else HEDGE_DELAY)
+        except queue.Empty:
+            print(f"Strona osadzająca nie odpowiedziała w {HEDGE_DELAY:g}s - równolegle pobieram fallback URL.")
+            start("fallback", via_fallback)
+            continue
+        if error is None and looks_like_plan(response_text(response)):
+            cancel.set()
+            METRICS.count(f"discover_{name}")
+            return response.url, response
+        finished[name] = (response, error)
+        if error is not None:
+            print(f"Ścieżka {name} nie dała planu: {error}")
+        if "fallback" not in started:
+            start("fallback", via_fallback)
+
+    # Żadna odpowiedź nie wygląda na plan - jak wcześniej przekazujemy dalej to, co się pobrało.
+    for name in ("landing", "fallback"):
+        response, error = finished.get(name, (None, None))
+        if response is not None:
+            return response.url, response
+    error = finished.get("fallback", (None, None))[1] or finished.get("landing", (None, None))[1]
+    if isinstance(error, requests.RequestException):
+        raise error
+    raise requests.RequestException(f"Nie udało się pobrać planu: {error}")
 
 
 def parse_navigation_entities(soup):
@@ -236,58 +708,16 @@ def extract_day_columns(table):
     return day_cols
 
 
-def expand_tbody_rows(tbody):
-    rows = []
-    active = {}  # col_idx -> (cell, remaining_rows)
-
-    for tr in tbody.find_all("tr", recursive=False):
-        row = {}  # col_idx -> (cell, from_active)
-        col = 0
-
-        def consume_active_until_gap(start_col):
-            c = start_col
-            while c in active:
-                cell, remaining = active[c]
-                row[c] = (cell, True)
-                if remaining <= 1:
-                    del active[c]
-                else:
-                    active[c] = (cell, remaining - 1)
-                c += 1
-            return c
-
-        col = consume_active_until_gap(col)
-        for cell in tr.find_all("td", recursive=False):
-            col = consume_active_until_gap(col)
-            rowspan = parse_int_attr(cell.get("rowspan"), 1)
-            colspan = parse_int_attr(cell.get("colspan"), 1)
-
-            for offset in range(colspan):
-                idx = col + offset
-                row[idx] = (cell, False)
-                if rowspan > 1:
-                    active[idx] = (cell, rowspan - 1)
-            col += colspan
-            col = consume_active_until_gap(col)
-
-        while True:
-            if col in active:
-                cell, remaining = active[col]
-                row[col] = (cell, True)
-                if remaining <= 1:
-                    del active[col]
-                else:
-                    active[col] = (cell, remaining - 1)
-                col += 1
-                continue
-            higher = [k for k in active.keys() if k > col]
-            if not higher:
-                break
-            col = min(higher)
+def cell_spans(cell):
+    return parse_int_attr(cell.get("rowspan"), 1), parse_int_attr(cell.get("colspan"), 1)
 
-        rows.append(row)
 
-    return rows
+def expand_tbody_rows(tbody):
+    """Rozwija wiersze tbody (rowspan/colspan) do listy table_grid.GridRow."""
+    return table_grid.expand_grid(
+        (tr.find_all("td", recursive=False) for tr in tbody.find_all("tr", recursive=False)),
+        cell_spans,
+    )
 
 
 def parse_ref_from_cell(cell, domain, raw_to_canon, names_map):
@@ -328,61 +758,29 @@ def parse_subject_and_group(cell, raw_to_canon, names_map):
         if m:
             subgroup_mark = normalize_text(m.group(1))
 
-    clone = BeautifulSoup(str(cell), "html.parser")
-    for g in clone.select("div.g"):
-        g.decompose()
-    subject = normalize_text(clone.get_text(" ", strip=True))
+    subject = normalize_text(html_tree.get_text_excluding(cell, "div", "g"))
     if not subject:
         subject = None
 
     return subject, group_ref, subgroup_mark
 
 
-def normalize_subject_for_match(subject):
-    s = normalize_text(subject).lower()
-    if not s:
-        return ""
-    s = re.sub(r"\s*-\s*([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\s*$", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s*\(([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\)\s*$", "", s, flags=re.IGNORECASE)
-    return normalize_text(s)
-
-
-def add_mark_to_subject(subject, mark):
-    subject = normalize_text(subject)
-    mark = normalize_text(mark)
-    if not subject or not mark:
-        return subject
-    if re.search(rf"(?:^|[\s\-(]){re.escape(mark)}(?:$|[\s)])", subject, flags=re.IGNORECASE):
-        return subject
-    return f"{subject} - {mark}"
-
-
 def lesson_key(lesson):
-    group_id = lesson.get("group", {}).get("id", "") if lesson.get("group") else ""
-    teacher_id = lesson.get("teacher", {}).get("id", "") if lesson.get("teacher") else ""
-    room_id = lesson.get("room", {}).get("id", "") if lesson.get("room") else ""
-    subject_norm = normalize_subject_for_match(lesson.get("_subject_base") or lesson.get("subject") or "")
+    group_id = lesson.group.get("id", "") if lesson.group else ""
+    teacher_id = lesson.teacher.get("id", "") if lesson.teacher else ""
+    room_id = lesson.room.get("id", "") if lesson.room else ""
+    subject_norm = normalize_subject_for_match(lesson.subject_base or lesson.subject or "")
     return (
         group_id,
-        lesson.get("day") or "",
-        lesson.get("lesson_num") or "",
-        lesson.get("time") or "",
+        lesson.day,
+        lesson.lesson_num,
+        lesson.time,
         subject_norm,
         teacher_id,
         room_id,
     )
 
 
-def mark_sort_key(mark):
-    mark = normalize_text(mark)
-    m = re.match(r"^(\d+)/(\d+)$", mark)
-    if m:
-        num = int(m.group(1))
-        den = int(m.group(2))
-        return (0, den, num, mark)
-    return (1, mark.lower(), mark)
-
-
 def parse_table(
     table,
     domain,
@@ -441,24 +839,24 @@ def parse_table(
                 room = parse_ref_from_cell(room_cell, "rooms", raw_to_canon, names_map)
                 if not any([subject, teacher, room, parsed_group]):
                     continue
-                group = parsed_group or dict(current_ref)
+                group = parsed_group or current_ref
             else:
                 other_cell = other_entry_1[0] if other_entry_1 else None
                 if domain == "teachers":
-                    teacher = dict(current_ref)
+                    teacher = current_ref
                     room = parse_ref_from_cell(other_cell, "rooms", raw_to_canon, names_map)
                     group = parsed_group
                     if not any([subject, room, parsed_group]):
                         continue
                 elif domain == "rooms":
                     teacher = parse_ref_from_cell(other_cell, "teachers", raw_to_canon, names_map)
-                    room = dict(current_ref)
+                    room = current_ref
                     group = parsed_group
                     if not any([subject, teacher, parsed_group]):
                         continue
                 else:
                     # Teoretycznie nie powinno wystąpić dla tabel klas.
-                    group = parsed_group or dict(current_ref)
+                    group = parsed_group or current_ref
                     if not any([subject, teacher, room, parsed_group]):
                         continue
 
@@ -469,18 +867,18 @@ def parse_table(
                 continue
 
             parsed_lessons.append(
-                {
-                    "day": day,
-                    "lesson_num": lesson_num,
-                    "time": time,
-                    "subject": subject or "",
-                    "teacher": teacher,
-                    "group": group,
-                    "room": room,
-                    "_source_domain": domain,
-                    "_subject_base": subject or "",
-                    "_subgroup_mark": subgroup_mark,
-                }
+                Lesson(
+                    day,
+                    lesson_num,
+                    time,
+                    subject,
+                    teacher,
+                    group,
+                    room,
+                    source_domain=domain,
+                    subject_base=subject,
+                    subgroup_mark=subgroup_mark,
+                )
             )
 
     return parsed_lessons
@@ -492,14 +890,14 @@ def build_subgroup_pools(all_timetables):
 
     for lessons in all_timetables.values():
         for lesson in lessons:
-            mark = normalize_text(lesson.get("_subgroup_mark"))
-            group = lesson.get("group")
+            mark = normalize_text(lesson.subgroup_mark)
+            group = lesson.group
             if not mark or not group or not str(group.get("id", "")).startswith("o"):
                 continue
             key = lesson_key(lesson)
-            if lesson.get("_source_domain") == "teachers":
+            if lesson.source_domain == "teachers":
                 teacher_pool[key].append(mark)
-            elif lesson.get("_source_domain") == "rooms":
+            elif lesson.source_domain == "rooms":
                 room_pool[key].append(mark)
     return teacher_pool, room_pool
 
@@ -508,13 +906,14 @@ def apply_subgroup_mark(lesson, mark):
     mark = normalize_text(mark)
     if not mark:
         return
-    lesson["_subgroup_mark"] = mark
-    if lesson.get("subject"):
-        lesson["subject"] = add_mark_to_subject(lesson["subject"], mark)
-    group = lesson.get("group")
+    lesson.subgroup_mark = mark
+    if lesson.subject:
+        lesson.subject = add_mark_to_subject(lesson.subject, mark)
+    group = lesson.group
     if group and group.get("name"):
-        base_name = re.sub(r"\s*\([^()]+\)\s*$", "", normalize_text(group["name"]))
-        group["name"] = f"{base_name} ({mark})"
+        # Odnośniki są internowane (współdzielone) - podmieniamy odnośnik zamiast zmieniać nazwę w miejscu.
+        base_name = strip_group_mark(group["name"])
+        lesson.group = make_ref(group["id"], f"{base_name} ({mark})")
 
 
 def reconstruct_class_subgroups(all_timetables):
@@ -525,9 +924,9 @@ def reconstruct_class_subgroups(all_timetables):
     class_groups = defaultdict(list)  # key -> list of lesson refs
     for lessons in all_timetables.values():
         for lesson in lessons:
-            if lesson.get("_source_domain") != "classes":
+            if lesson.source_domain != "classes":
                 continue
-            if lesson.get("_subgroup_mark"):
+            if lesson.subgroup_mark:
                 continue
             class_groups[lesson_key(lesson)].append(lesson)
 
@@ -559,38 +958,274 @@ def reconstruct_class_subgroups(all_timetables):
     return assigned, ambiguous
 
 
+def referenced_entity_ids(all_timetables):
+    """Zwraca id nauczycieli i sal, które występują w lekcjach planów oddziałów."""
+    covered = set()
+    for lessons in all_timetables.values():
+        for lesson in lessons:
+            if lesson.source_domain != "classes":
+                continue
+            for ref in (lesson.teacher, lesson.room):
+                if ref and ref.get("id"):
+                    covered.add(ref["id"])
+    return covered
+
+
+def infer_day_order(slot_sequences):
+    """Odtwarza kolejność dni z nagłówków tabel na podstawie kolejności lekcji w wierszach planów.
+
+    slot_sequences - dla każdego planu sekwencja par (dzień, numer lekcji) w kolejności lekcji.
+    """
+    first_seen = {}
+    successors = defaultdict(set)
+    for slots in slot_sequences:
+        prev_day = prev_num = None
+        for day, lesson_num in slots:
+            day = day or ""
+            first_seen.setdefault(day, len(first_seen))
+            if prev_day is not None and prev_num == lesson_num and prev_day != day:
+                successors[prev_day].add(day)
+            prev_day, prev_num = day, lesson_num
+
+    indegree = {day: 0 for day in first_seen}
+    for day, nexts in successors.items():
+        for nxt in nexts:
+            indegree[nxt] += 1
+    ready = sorted((day for day, deg in indegree.items() if deg == 0), key=first_seen.get)
+    order = []
+    while ready:
+        day = ready.pop(0)
+        order.append(day)
+        for nxt in sorted(successors.get(day, ()), key=first_seen.get):
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                ready.append(nxt)
+                ready.sort(key=first_seen.get)
+    # Cykl w danych (niespójne nagłówki) - dopisz resztę w kolejności wystąpienia.
+    order.extend(day for day in sorted(first_seen, key=first_seen.get) if day not in order)
+    return {day: idx for idx, day in enumerate(order)}
+
+
+def lesson_slot_sort_key(lesson, day_order):
+    lesson_num = lesson.lesson_num
+    num = int(lesson_num) if lesson_num.isdigit() else float("inf")
+    return (num, lesson_num, day_order.get(lesson.day, len(day_order)))
+
+
+def derived_subject(subject):
+    """Przedmiot lekcji z planu oddziału w postaci z planu nauczyciela/sali.
+
+    Plan oddziału legacy potrafi mieć oznaczenie sklejone z przedmiotem ("religia-1/2"),
+    a plany nauczycieli i sal dopisują je przez add_mark_to_subject ("religia - 1/2").
+    """
+    m = SUBJECT_DASH_MARK_RE.search(subject)
+    if not m:
+        return subject
+    return add_mark_to_subject(subject[: m.start()], m.group(1))
+
+
+def derive_views_from_classes(all_timetables, covered_ids):
+    """Buduje plany nauczycieli i sal przez odwrócenie lekcji z planów oddziałów (tryb minimalny legacy).
+
+    Lekcje są sortowane wiersz po wierszu (numer lekcji, potem dzień), tak jak w tabeli planu.
+    Zwracane są tylko encje z `covered_ids`; pozostałe wymagają pełnego parsowania.
+    """
+    derived = defaultdict(list)
+    day_order = infer_day_order(
+        ((lesson.day, lesson.lesson_num) for lesson in lessons) for lessons in all_timetables.values()
+    )
+    for lessons in all_timetables.values():
+        for lesson in lessons:
+            if lesson.source_domain != "classes":
+                continue
+            for domain, ref in (("teachers", lesson.teacher), ("rooms", lesson.room)):
+                if not ref or ref.get("id") not in covered_ids:
+                    continue
+                # Odnośniki są współdzielone i niezmienne - bez kopiowania.
+                derived[ref["id"]].append(
+                    Lesson(
+                        lesson.day,
+                        lesson.lesson_num,
+                        lesson.time,
+                        derived_subject(lesson.subject),
+                        lesson.teacher,
+                        lesson.group,
+                        lesson.room,
+                        source_domain=domain,
+                        subject_base=lesson.subject_base,
+                        subgroup_mark=lesson.subgroup_mark,
+                    )
+                )
+
+    for lessons in derived.values():
+        lessons.sort(key=lambda lesson: lesson_slot_sort_key(lesson, day_order))
+    return dict(derived)
+
+
 def to_public_lessons(lessons):
-    out = []
-    for lesson in lessons:
-        out.append(
-            {
-                "day": lesson.get("day", ""),
-                "lesson_num": lesson.get("lesson_num", ""),
-                "time": lesson.get("time", ""),
-                "subject": lesson.get("subject", ""),
-                "teacher": lesson.get("teacher"),
-                "group": lesson.get("group"),
-                "room": lesson.get("room"),
-            }
-        )
-    return out
+    return [lesson.to_public() for lesson in lessons]
 
 
-def save_final_data(final_data):
-    tmp_file = OUTPUT_FILE + ".tmp"
-    print(f"Zapisywanie danych do: {OUTPUT_FILE}")
+def iter_public_timetables(all_timetables):
+    """Publiczne kopie planów encja po encji; wewnętrzne listy lekcji są zwalniane na bieżąco.
+
+    Generator jest konsumowany dopiero przy zapisie, więc w pamięci nie ma naraz
+    wszystkich list wewnętrznych i ich publicznych kopii.
+    """
+    for tid in list(all_timetables):
+        yield tid, to_public_lessons(all_timetables.pop(tid))
+
+
+def _json_fragment(value, indent, depth):
+    if indent is None:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    # Wcięcia json.dumps są względne - przesunięcie o poziom zagnieżdżenia daje wynik jak json.dump całości.
+    return json.dumps(value, ensure_ascii=False, indent=indent).replace("\n", "\n" + " " * (indent * depth))
+
+
+def write_final_data_stream(f, final_data, indent=None):
+    """Zapisuje final_data klucz po kluczu, a "timetables" encja po encji (dict albo iterowalne pary id -> lekcje).
+
+    Dla indent=2 wynik jest bajtowo identyczny z json.dump(final_data, f, ensure_ascii=False, indent=2).
+    """
+    newline = "" if indent is None else "\n"
+    colon = ":" if indent is None else ": "
+
+    def pad(depth):
+        return "" if indent is None else " " * (indent * depth)
+
+    def key(name):
+        return json.dumps(name, ensure_ascii=False)
+
+    f.write("{")
+    first = True
+    for name, value in final_data.items():
+        f.write(("" if first else ",") + newline + pad(1) + key(name) + colon)
+        first = False
+        if name != "timetables":
+            f.write(_json_fragment(value, indent, 1))
+            continue
+        f.write("{")
+        first_entity = True
+        for tid, lessons in value.items() if isinstance(value, dict) else value:
+            f.write(("" if first_entity else ",") + newline + pad(2) + key(tid) + colon + _json_fragment(lessons, indent, 2))
+            first_entity = False
+        f.write("}" if first_entity else newline + pad(1) + "}")
+    f.write("}" if first else newline + "}")
+
+
+class _TimedWriter:
+    """Plik tekstowy liczący czas spędzony w write() (odróżnia I/O od serializacji)."""
+
+    __slots__ = ("f", "seconds")
+
+    def __init__(self, f):
+        self.f = f
+        self.seconds = 0.0
+
+    def write(self, text):
+        started = time.perf_counter()
+        self.f.write(text)
+        self.seconds += time.perf_counter() - started
+
+
+def write_file_atomic(path, write):
+    """Zapis przez plik tymczasowy z fsync przed os.replace (po awarii zostaje stary albo cały nowy plik).
+
+    Zwraca czas I/O w sekundach (write, flush, fsync, podmiana pliku) - bez czasu serializacji.
+    """
+    tmp_file = path + ".tmp"
     try:
         with open(tmp_file, "w", encoding="utf-8") as f:
-            json.dump(final_data, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_file, OUTPUT_FILE)
-        print("--- Zakończono pomyślnie! ---")
-    except IOError as e:
-        print(f"Błąd podczas zapisu: {e}")
+            timed = _TimedWriter(f)
+            write(timed)
+            started = time.perf_counter()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+        io_seconds = timed.seconds + time.perf_counter() - started
+    except IOError:
         try:
             if os.path.exists(tmp_file):
                 os.remove(tmp_file)
         except OSError:
             pass
+        raise
+    started = time.perf_counter()
+    try:
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return io_seconds
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+    return io_seconds + time.perf_counter() - started
+
+
+def save_final_data(final_data):
+    """Zapisuje plan (i pliki poboczne). Zwraca statystyki zapisu albo None przy błędzie."""
+    print(f"Zapisywanie danych do: {OUTPUT_FILE}")
+    timetables = final_data.get("timetables", {})
+    if (OUTPUT_V2_ENABLED or OCCUPANCY_ENABLED or CONFLICTS_ENABLED or SHARDS_ENABLED) and not isinstance(timetables, dict):
+        # Pliki poboczne potrzebują całej mapy planów - budujemy ją raz, zanim powstanie v1.
+        with METRICS.phase("serialize"):
+            final_data["timetables"] = dict(timetables)
+    try:
+        started = time.perf_counter()
+        indent = None if COMPACT_JSON else 2
+        io_seconds = write_file_atomic(OUTPUT_FILE, lambda f: write_final_data_stream(f, final_data, indent))
+        elapsed = time.perf_counter() - started
+        # Zapis jest strumieniowy: serializacja (budowa i kodowanie lekcji) przeplata się z I/O.
+        METRICS.add_phase("serialize", elapsed - io_seconds)
+        METRICS.add_phase("write", io_seconds)
+        stats = {
+            "output_bytes": os.path.getsize(OUTPUT_FILE),
+            "write_seconds": round(elapsed, 3),
+        }
+        print(f"Zapisano {stats['output_bytes']} B w {stats['write_seconds']:.3f}s ({'kompaktowy' if COMPACT_JSON else 'z wcięciami'})")
+        # v2 zapisywany po v1, więc jest co najmniej tak świeży jak v1 (serwer wybiera nowszy plik).
+        if OUTPUT_V2_ENABLED:
+            print(f"Zapisywanie formatu v2 do: {OUTPUT_V2_FILE}")
+            with METRICS.phase("output_v2"):
+                write_file_atomic(OUTPUT_V2_FILE, lambda f: timetable_v2.dump(timetable_v2.compact(final_data), f))
+        elif os.path.exists(OUTPUT_V2_FILE):
+            os.remove(OUTPUT_V2_FILE)
+        if OCCUPANCY_ENABLED:
+            with METRICS.phase("output_occupancy"):
+                day_order = infer_day_order(
+                    ((lesson["day"], lesson["lesson_num"]) for lesson in lessons)
+                    for lessons in final_data.get("timetables", {}).values()
+                )
+                index = occupancy.build_index(final_data, list(day_order))
+                print(f"Zapisywanie indeksu zajętości do: {OCCUPANCY_FILE}")
+                write_file_atomic(OCCUPANCY_FILE, lambda f: json.dump(index, f, ensure_ascii=False, separators=(",", ":")))
+        if CONFLICTS_ENABLED:
+            with METRICS.phase("output_conflicts"):
+                report = timetable_checks.build_report(final_data)
+                print(timetable_checks.summary_line(report))
+                write_file_atomic(CONFLICTS_FILE, lambda f: json.dump(report, f, ensure_ascii=False, separators=(",", ":")))
+            stats["conflicts"] = report["summary"]
+        if SHARDS_ENABLED:
+            with METRICS.phase("output_shards"):
+                shard_stats = timetable_shards.write_shards(final_data, SHARDS_DIR)
+            print(
+                f"Pliki encji w {SHARDS_DIR}: "
+                f"encje={shard_stats['shards']}, "
+                f"zapisane={shard_stats['written']}, "
+                f"bez_zmian={shard_stats['unchanged']}, "
+                f"usunięte={shard_stats['removed']}, "
+                f"zapisane_bajty={shard_stats['bytes_written']}"
+            )
+            stats["shards_written"] = shard_stats["written"]
+        stats["total_write_seconds"] = round(time.perf_counter() - started, 3)
+        print("--- Zakończono pomyślnie! ---")
+        return stats
+    except IOError as e:
+        print(f"Błąd podczas zapisu: {e}")
+        return None
 
 
 def detect_legacy_root(source_url):
@@ -611,8 +1246,10 @@ def parse_legacy_entities(session, source_url):
     root_url = detect_legacy_root(source_url)
     list_url = urljoin(root_url, "lista.html")
     print(f"Tryb legacy: pobieranie listy planów: {list_url}")
-    response = request_with_retries(session, list_url)
-    soup = BeautifulSoup(response.text, "html.parser")
+    with METRICS.phase("fetch"):
+        response = request_with_retries(session, list_url)
+    parse_started = time.perf_counter()
+    soup = parse_response(response)
 
     raw_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
     names_map = {"teachers": {}, "rooms": {}, "classes": {}}
@@ -649,6 +1286,7 @@ def parse_legacy_entities(session, source_url):
         file_to_canon[domain][file_id] = canon
         urls_by_canon[domain][canon] = urljoin(response.url, href)
 
+    METRICS.add_phase("parse", time.perf_counter() - parse_started)
     if not any(urls_by_canon[d] for d in ("teachers", "rooms", "classes")):
         raise RuntimeError("Nie znaleziono żadnych planów w legacy lista.html")
 
@@ -659,15 +1297,23 @@ def parse_legacy_entities(session, source_url):
         f"{len(names_map['classes'])} oddziałów."
     )
 
-    return root_url, raw_to_canon, names_map, file_to_canon, urls_by_canon
+    return root_url, raw_to_canon, names_map, file_to_canon, urls_by_canon, (list_url, body_digest(response))
 
 
-def parse_legacy_ref(anchor, domain, raw_to_canon, names_map, file_to_canon):
+def parse_legacy_ref(anchor, domain, raw_to_canon, names_map, file_to_canon, ref_log=None):
     if anchor is None:
         return None
 
     file_id = extract_file_id_from_href(anchor.get("href"))
     label = normalize_text(anchor.get_text(" ", strip=True))
+    ref = resolve_legacy_ref(domain, file_id, label, raw_to_canon, names_map, file_to_canon)
+    if ref_log is not None:
+        # Kopia - parse_legacy_lesson_chunk dopisuje później oznaczenie podgrupy do nazwy grupy.
+        ref_log.setdefault((domain, file_id or "", label), dict(ref) if ref else None)
+    return ref
+
+
+def resolve_legacy_ref(domain, file_id, label, raw_to_canon, names_map, file_to_canon):
     canon = None
     if file_id:
         canon = file_to_canon[domain].get(file_id)
@@ -681,50 +1327,17 @@ def parse_legacy_ref(anchor, domain, raw_to_canon, names_map, file_to_canon):
     return {"id": canon, "name": names_map[domain].get(canon) or label}
 
 
-def extract_chunk_mark(chunk_text, group_name="", subject=""):
-    subject_norm = normalize_text(subject)
-    m_subject = re.search(r"\s*-\s*([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\s*$", subject_norm, flags=re.IGNORECASE)
-    if m_subject:
-        return normalize_text(m_subject.group(1))
-
-    chunk_norm = normalize_text(chunk_text)
-    group_norm = normalize_text(group_name)
-    if group_norm:
-        m_group = re.search(
-            rf"{re.escape(group_norm)}\s*-\s*([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\b",
-            chunk_norm,
-            flags=re.IGNORECASE,
-        )
-        if m_group:
-            return normalize_text(m_group.group(1))
-
-    m_any = re.search(r"-\s*([0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+)\b", chunk_norm, flags=re.IGNORECASE)
-    if m_any:
-        return normalize_text(m_any.group(1))
-
-    return None
-
-
-def maybe_add_mark_to_group_name(group_name, mark):
-    gn = normalize_text(group_name)
-    mk = normalize_text(mark)
-    if not gn or not mk:
-        return gn
-    if re.search(rf"\({re.escape(mk)}\)\s*$", gn, flags=re.IGNORECASE):
-        return gn
-    return f"{gn} ({mk})"
-
-
 def parse_legacy_lesson_chunk(
-    chunk_soup,
+    chunk,
     domain,
     current_ref,
     raw_to_canon,
     names_map,
     file_to_canon,
+    ref_log=None,
 ):
     subject = None
-    subject_tags = chunk_soup.find_all("span", class_="p")
+    subject_tags = chunk.find_all("span", class_="p")
     if subject_tags:
         for st in subject_tags:
             txt = normalize_text(st.get_text(" ", strip=True))
@@ -735,25 +1348,28 @@ def parse_legacy_lesson_chunk(
             subject = normalize_text(subject_tags[0].get_text(" ", strip=True))
 
     teacher_ref = parse_legacy_ref(
-        chunk_soup.find("a", class_="n", href=True),
+        chunk.find("a", class_="n", href=True),
         "teachers",
         raw_to_canon,
         names_map,
         file_to_canon,
+        ref_log,
     )
     room_ref = parse_legacy_ref(
-        chunk_soup.find("a", class_="s", href=True),
+        chunk.find("a", class_="s", href=True),
         "rooms",
         raw_to_canon,
         names_map,
         file_to_canon,
+        ref_log,
     )
     group_ref = parse_legacy_ref(
-        chunk_soup.find("a", class_="o", href=True),
+        chunk.find("a", class_="o", href=True),
         "classes",
         raw_to_canon,
         names_map,
         file_to_canon,
+        ref_log,
     )
 
     # Puste komórki planu nie mogą tworzyć "lekcji widmo".
@@ -772,7 +1388,7 @@ def parse_legacy_lesson_chunk(
         group = dict(current_ref)
 
     group_name = group.get("name") if group else ""
-    chunk_text = normalize_text(chunk_soup.get_text(" ", strip=True))
+    chunk_text = normalize_text(chunk.get_text(" ", strip=True))
     mark = extract_chunk_mark(chunk_text, group_name=group_name, subject=subject)
     if mark and subject:
         subject = add_mark_to_subject(subject, mark)
@@ -791,14 +1407,15 @@ def parse_legacy_lesson_chunk(
 
 
 def parse_legacy_timetable_page(
-    html_text,
+    response,
     domain,
     current_ref,
     raw_to_canon,
     names_map,
     file_to_canon,
+    ref_log=None,
 ):
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = parse_response(response)
     table = soup.find("table", class_="tabela")
     if not table:
         return [], ""
@@ -826,29 +1443,29 @@ def parse_legacy_timetable_page(
             if idx >= len(days):
                 continue
             day = days[idx]
-            cell_html = str(cell).replace("<br/>", "<br>").replace("<br />", "<br>")
-            for chunk in cell_html.split("<br>"):
-                chunk_soup = BeautifulSoup(chunk, "html.parser")
+            for chunk in html_tree.split_on_br(cell):
                 parsed = parse_legacy_lesson_chunk(
-                    chunk_soup,
+                    chunk,
                     domain,
                     current_ref,
                     raw_to_canon,
                     names_map,
                     file_to_canon,
+                    ref_log,
                 )
                 if not parsed:
                     continue
                 lessons.append(
-                    {
-                        "day": day,
-                        "lesson_num": lesson_num,
-                        "time": time,
-                        "subject": parsed["subject"],
-                        "teacher": parsed["teacher"],
-                        "group": parsed["group"],
-                        "room": parsed["room"],
-                    }
+                    Lesson(
+                        day,
+                        lesson_num,
+                        time,
+                        parsed["subject"],
+                        parsed["teacher"],
+                        parsed["group"],
+                        parsed["room"],
+                        source_domain=domain,
+                    )
                 )
 
     gen_date = ""
@@ -862,47 +1479,396 @@ def parse_legacy_timetable_page(
     return lessons, gen_date
 
 
+LEGACY_STATE_VERSION = 2
+
+
+def load_legacy_state():
+    """Wczytuje wyniki parsowania stron legacy z poprzedniego przebiegu (URL -> wpis strony)."""
+    if not INCREMENTAL_ENABLED or FORCE_REBUILD:
+        return {}
+    try:
+        with open(LEGACY_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(state, dict) or state.get("version") != LEGACY_STATE_VERSION:
+        return {}
+    # Zmiana kodu scrapera może zmienić wynik parsowania - stare wpisy są wtedy bezużyteczne.
+    if state.get("code") != _code_fingerprint():
+        return {}
+    pages = state.get("pages")
+    return pages if isinstance(pages, dict) else {}
+
+
+def save_legacy_state(pages):
+    if not INCREMENTAL_ENABLED:
+        return
+    tmp_file = LEGACY_STATE_FILE + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(LEGACY_STATE_FILE), exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": LEGACY_STATE_VERSION, "code": _code_fingerprint(), "pages": pages},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp_file, LEGACY_STATE_FILE)
+    except OSError as e:
+        print(f"Nie udało się zapisać stanu przyrostowego legacy: {e}")
+
+
+def replay_legacy_refs(refs, raw_to_canon, names_map, file_to_canon):
+    """Powtarza rozwiązywanie odnośników zapisanej strony (rejestruje encje spoza lista.html w tej samej kolejności).
+
+    Zwraca False, gdy którykolwiek odnośnik rozwiązuje się dziś inaczej niż przy parsowaniu -
+    wtedy zapisane lekcje mogłyby mieć inne id/nazwy i stronę trzeba sparsować ponownie.
+    """
+    for domain, file_id, label, expected in refs:
+        if resolve_legacy_ref(domain, file_id, label, raw_to_canon, names_map, file_to_canon) != expected:
+            return False
+    return True
+
+
+LEGACY_CHECKPOINT_VERSION = 1
+
+
+def load_legacy_checkpoint(root_url, list_page, job_urls):
+    """Punkt kontrolny przerwanego przebiegu legacy albo None, gdy nie pasuje do bieżącego źródła.
+
+    Punkt kontrolny obejmuje początkowe strony w ustalonej kolejności zadań: ich wpisy (jak w stanie
+    przyrostowym), skróty do odcisku źródła i mapy id po ich sparsowaniu. Pasuje tylko do tej samej
+    lista.html (URL i skrót), tej samej listy stron i tej samej wersji kodu.
+    """
+    if FORCE_REBUILD:
+        return None
+    try:
+        with open(LEGACY_CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != LEGACY_CHECKPOINT_VERSION:
+        return None
+    if checkpoint.get("code") != _code_fingerprint():
+        return None
+    if checkpoint.get("root_url") != root_url or checkpoint.get("list_page") != list(list_page):
+        return None
+    saved_at = checkpoint.get("saved_at")
+    if not isinstance(saved_at, (int, float)) or (LEGACY_CHECKPOINT_TTL and time.time() - saved_at > LEGACY_CHECKPOINT_TTL):
+        return None
+    pages = checkpoint.get("pages")
+    if not isinstance(pages, list) or not pages or [url for url, _ in pages] != job_urls[: len(pages)]:
+        return None
+    if len(checkpoint.get("digests") or []) != len(pages) or not isinstance(checkpoint.get("maps"), dict):
+        return None
+    return checkpoint
+
+
+def save_legacy_checkpoint(checkpoint):
+    tmp_file = LEGACY_CHECKPOINT_FILE + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(LEGACY_CHECKPOINT_FILE), exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, LEGACY_CHECKPOINT_FILE)
+    except OSError as e:
+        print(f"Nie udało się zapisać punktu kontrolnego legacy: {e}")
+        return False
+    return True
+
+
+def remove_legacy_checkpoint():
+    try:
+        os.remove(LEGACY_CHECKPOINT_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Nie udało się usunąć punktu kontrolnego legacy: {e}")
+
+
+class StaleCheckpoint(Exception):
+    """Punkt kontrolny legacy opisuje starszy eksport planu niż strony pobrane w tym przebiegu."""
+
+
 def run_legacy_scraper(session, source_url):
-    root_url, raw_to_canon, names_map, file_to_canon, urls_by_canon = parse_legacy_entities(session, source_url)
+    """Przebieg legacy; przy nieaktualnym punkcie kontrolnym jedna ponowna próba bez wznawiania."""
+    try:
+        return run_legacy_pass(session, source_url)
+    except StaleCheckpoint:
+        print("Data planu zmieniła się od punktu kontrolnego - zaczynam przebieg legacy od nowa.")
+        remove_legacy_checkpoint()
+        return run_legacy_pass(session, source_url, resume=False)
+
+
+def run_legacy_pass(session, source_url, resume=True):
+    root_url, raw_to_canon, names_map, file_to_canon, urls_by_canon, list_page = parse_legacy_entities(session, source_url)
 
     all_timetables = {}
     generation_date = ""
     total_pages = sum(len(urls_by_canon[d]) for d in ("teachers", "rooms", "classes"))
-    processed = 0
 
+    # Kolejność stron jest ustalona z góry; parsowanie (które nadaje id nowym encjom)
+    # odbywa się sekwencyjnie w tej kolejności, więc wynik nie zależy od równoległości pobierania.
+    jobs = []
     for domain in ("teachers", "rooms", "classes"):
         for canon_id, plan_url in sorted(
             urls_by_canon[domain].items(),
             key=lambda kv: names_map[domain].get(kv[0], kv[0]).lower(),
         ):
+            jobs.append((domain, canon_id, plan_url))
+
+    def fetch_pages(page_jobs):
+        """Pobiera strony zadań; przy zbliżającym się terminie przerywa i zwraca pobrany początek listy."""
+        fetched = []
+        with METRICS.phase("fetch"):
+            pages = fetch_pages_in_order(session, [plan_url for _, _, plan_url in page_jobs], limiter=LIMITER)
+            try:
+                for job, (_, response, error) in zip(page_jobs, pages):
+                    fetched.append((job, response, error))
+                    if DEADLINE and DEADLINE.near():
+                        break
+            finally:
+                pages.close()
+        return fetched
+
+    def page_digests(fetched):
+        return [
+            (plan_url, body_digest(response) if error is None else f"error:{type(error).__name__}")
+            for (_, _, plan_url), response, error in fetched
+        ]
+
+    def sniff_pages_generation_date(fetched):
+        return next(
+            (sniff_generation_date(response_text(response)) for _, response, error in fetched if error is None),
+            "",
+        )
+
+    def check_fingerprint(fetched):
+        page_gen_date = resumed_gen_date or sniff_pages_generation_date(fetched)
+        fingerprint = compute_source_fingerprint([list_page] + resumed_digests + page_digests(fetched), page_gen_date)
+        ensure_source_changed(fingerprint, page_gen_date)
+        return fingerprint
+
+    def parse_pages(fetched, share=None):
+        """Parsuje strony po kolei. share - przerwij, gdy do terminu zostanie share * zapas (zwraca False)."""
+        with METRICS.phase("parse"):
+            return _parse_pages(fetched, share)
+
+    def _parse_pages(fetched, share):
+        nonlocal generation_date, processed, reused, checkpoint_at
+        for (domain, canon_id, plan_url), response, error in fetched:
+            if share is not None and DEADLINE and DEADLINE.near(share):
+                return False
             processed += 1
-            print(f"[legacy {processed}/{total_pages}] Przetwarzam: {plan_url}")
             current_ref = {"id": canon_id, "name": names_map[domain].get(canon_id) or canon_id}
-            try:
-                response = request_with_retries(session, plan_url)
-            except requests.RequestException as e:
-                print(f"  -> Błąd pobierania {plan_url}: {e}")
+            if error is not None:
+                print(f"[legacy {processed}/{total_pages}] Przetwarzam: {plan_url}")
+                print(f"  -> Błąd pobierania {plan_url}: {error}")
                 all_timetables[canon_id] = []
+                state_pages.pop(plan_url, None)
+                done_pages.append([plan_url, None])
+                done_digests.append([plan_url, f"error:{type(error).__name__}"])
                 continue
 
-            lessons, page_gen_date = parse_legacy_timetable_page(
-                response.text,
-                domain,
-                current_ref,
-                raw_to_canon,
-                names_map,
-                file_to_canon,
-            )
+            digest = body_digest(response)
+            cached = previous_pages.get(plan_url)
+            if (
+                cached
+                and cached.get("digest") == digest
+                and cached.get("domain") == domain
+                and cached.get("ref") == current_ref
+                and replay_legacy_refs(cached.get("refs", []), raw_to_canon, names_map, file_to_canon)
+            ):
+                reused += 1
+                METRICS.count("pages_reused")
+                lessons = [Lesson.from_state(row, domain) for row in cached.get("lessons", [])]
+                page_gen_date = cached.get("generation_date", "")
+                state_pages[plan_url] = cached
+            else:
+                print(f"[legacy {processed}/{total_pages}] Przetwarzam: {plan_url}")
+                ref_log = {}
+                page_started = time.perf_counter()
+                lessons, page_gen_date = parse_legacy_timetable_page(
+                    response,
+                    domain,
+                    current_ref,
+                    raw_to_canon,
+                    names_map,
+                    file_to_canon,
+                    ref_log,
+                )
+                METRICS.add_item("page", time.perf_counter() - page_started, plan_url)
+                state_pages[plan_url] = {
+                    "digest": digest,
+                    "domain": domain,
+                    "ref": current_ref,
+                    "generation_date": page_gen_date,
+                    "refs": [[d, f, label, ref] for (d, f, label), ref in ref_log.items()],
+                    "lessons": [lesson.to_state() for lesson in lessons],
+                }
             if page_gen_date and not generation_date:
                 generation_date = page_gen_date
             all_timetables[canon_id] = lessons
+            done_pages.append([plan_url, state_pages[plan_url]])
+            done_digests.append([plan_url, digest])
+            if not done_gen_date:
+                done_gen_date.append(sniff_generation_date(response_text(response)))
+            # Przy terminie zadania punkt kontrolny powstaje też w trakcie parsowania - na wypadek zabicia procesu.
+            if (
+                share is not None
+                and DEADLINE
+                and not MINIMAL_FETCH
+                and time.monotonic() - checkpoint_at >= LEGACY_CHECKPOINT_INTERVAL
+            ):
+                write_checkpoint()
+        return True
+
+    def write_checkpoint():
+        nonlocal checkpoint_at
+        checkpoint_at = time.monotonic()
+        # Zapis wypada także w fazie "parse" - licznik zamiast fazy, żeby czasy faz się nie nakładały.
+        started = time.perf_counter()
+        try:
+            return save_legacy_checkpoint(
+                {
+                    "version": LEGACY_CHECKPOINT_VERSION,
+                    "code": _code_fingerprint(),
+                    "saved_at": time.time(),
+                    "root_url": root_url,
+                    "list_page": list(list_page),
+                    "generation_date": generation_date,
+                    "page_generation_date": done_gen_date[0] if done_gen_date else "",
+                    "pages": done_pages,
+                    "digests": done_digests,
+                    "maps": {"raw_to_canon": raw_to_canon, "names_map": names_map, "file_to_canon": file_to_canon},
+                }
+            )
+        finally:
+            METRICS.count("checkpoints")
+            METRICS.count("checkpoint_seconds", time.perf_counter() - started)
+
+    def stop_at_deadline():
+        saved = not MINIMAL_FETCH and bool(done_pages) and write_checkpoint()
+        print(
+            f"Zbliża się termin zadania - przerywam po {processed}/{total_pages} stronach"
+            + (" (punkt kontrolny zapisany, następny przebieg wznowi pracę)." if saved else ".")
+        )
+        METRICS.count("deadline_stops")
+        raise DeadlineReached(processed, total_pages, saved)
+
+    # Stan przyrostowy: strony o niezmienionej treści nie są parsowane ponownie.
+    with METRICS.phase("state"):
+        previous_pages = load_legacy_state()
+    job_urls = [plan_url for _, _, plan_url in jobs]
+    job_url_set = set(job_urls)
+    state_pages = {url: entry for url, entry in previous_pages.items() if url in job_url_set}
+    processed = 0
+    reused = 0
+    # Strony już przetworzone w tym przebiegu (razem ze wznowionymi) - treść punktu kontrolnego.
+    done_pages = []
+    done_digests = []
+    done_gen_date = []
+    checkpoint_at = time.monotonic()
+    resumed_digests = []
+    resumed_gen_date = ""
+    if MINIMAL_FETCH:
+        # Tryb minimalny wybiera strony zapasowe po sparsowaniu planów oddziałów - bez punktu kontrolnego.
+        class_jobs = [job for job in jobs if job[0] == "classes"]
+        total_pages = len(class_jobs)
+        class_pages = fetch_pages(class_jobs)
+        if len(class_pages) < len(class_jobs) or not parse_pages(class_pages, share=0.5):
+            stop_at_deadline()
+        covered = referenced_entity_ids(all_timetables)
+        fallback_jobs = [job for job in jobs if job[0] != "classes" and job[1] not in covered]
+        total_pages += len(fallback_jobs)
+        print(
+            "Tryb minimalny: "
+            f"plany oddziałów={len(class_jobs)}, "
+            f"wyprowadzone plany nauczycieli/sal={len(jobs) - len(class_jobs) - len(fallback_jobs)}, "
+            f"pełne parsowanie (brak lekcji w planach oddziałów)={len(fallback_jobs)}"
+        )
+        fallback_pages = fetch_pages(fallback_jobs)
+        if len(fallback_pages) < len(fallback_jobs):
+            stop_at_deadline()
+        # Zestaw stron zapasowych wynika z planów oddziałów, więc odcisk liczymy dopiero po ich parsowaniu.
+        fingerprint = check_fingerprint(class_pages + fallback_pages)
+        if not parse_pages(fallback_pages, share=0.5):
+            stop_at_deadline()
+        with METRICS.phase("derive"):
+            all_timetables.update(derive_views_from_classes(all_timetables, covered))
+        # Zachowaj kolejność kluczy z pełnego przebiegu (nauczyciele, sale, oddziały).
+        all_timetables = {
+            canon_id: all_timetables[canon_id]
+            for _, canon_id, _ in jobs
+            if canon_id in all_timetables
+        }
+    else:
+        with METRICS.phase("state"):
+            checkpoint = load_legacy_checkpoint(root_url, list_page, job_urls) if resume else None
+        if checkpoint:
+            # Wznowienie: mapy id i lekcje stron sprzed przerwania, dalej od pierwszej nieprzetworzonej strony.
+            for name, target in (("raw_to_canon", raw_to_canon), ("names_map", names_map), ("file_to_canon", file_to_canon)):
+                for domain in target:
+                    target[domain].clear()
+                    target[domain].update(checkpoint["maps"][name][domain])
+            for (domain, canon_id, plan_url), (_, entry) in zip(jobs, checkpoint["pages"]):
+                if entry is None:
+                    all_timetables[canon_id] = []
+                    state_pages.pop(plan_url, None)
+                else:
+                    all_timetables[canon_id] = [Lesson.from_state(row, domain) for row in entry.get("lessons", [])]
+                    state_pages[plan_url] = entry
+            done_pages.extend(checkpoint["pages"])
+            done_digests.extend(checkpoint["digests"])
+            resumed_digests = list(done_digests)
+            resumed_gen_date = checkpoint.get("page_generation_date") or ""
+            if resumed_gen_date:
+                done_gen_date.append(resumed_gen_date)
+            generation_date = checkpoint.get("generation_date") or ""
+            processed = len(done_pages)
+            print(f"Wznawiam przebieg legacy z punktu kontrolnego: {processed}/{total_pages} stron przetworzonych.")
+        remaining_jobs = jobs[processed:]
+        if LEGACY_FETCH_WORKERS > 1:
+            start_limit = LIMITER.current_limit() if LIMITER else LEGACY_FETCH_WORKERS
+            print(
+                f"Pobieranie {len(remaining_jobs)} stron planów "
+                f"(do {LEGACY_FETCH_WORKERS} równoległych połączeń, na start {start_limit})"
+            )
+        pages = fetch_pages(remaining_jobs)
+        if checkpoint:
+            sniffed = sniff_pages_generation_date(pages)
+            if resumed_gen_date and sniffed and sniffed != resumed_gen_date:
+                # Nowy eksport planu między przebiegami - punkt kontrolny opisuje starą wersję.
+                raise StaleCheckpoint()
+            METRICS.count("pages_resumed", len(resumed_digests))
+        if len(pages) < len(remaining_jobs):
+            # Pobrany początek listy parsujemy od razu, żeby punkt kontrolny objął jak najwięcej stron.
+            parse_pages(pages, share=0.5)
+            stop_at_deadline()
+        try:
+            fingerprint = check_fingerprint(pages)
+        except SourceUnchanged:
+            remove_legacy_checkpoint()
+            raise
+        if not parse_pages(pages, share=0.5):
+            stop_at_deadline()
+        remove_legacy_checkpoint()
 
     for domain in ("teachers", "rooms", "classes"):
         for canon_id in names_map[domain].keys():
             all_timetables.setdefault(canon_id, [])
 
+    with METRICS.phase("state"):
+        save_legacy_state(state_pages)
+
     total_lessons = sum(len(v) for v in all_timetables.values())
-    print(f"Podsumowanie parsowania legacy: strony={total_pages}, lekcje={total_lessons}")
+    print(
+        "Podsumowanie parsowania legacy: "
+        f"strony={total_pages}, "
+        f"ponownie_użyte={reused}, "
+        f"sparsowane={total_pages - reused}, "
+        f"lekcje={total_lessons}"
+    )
     if generation_date:
         print(f"Data obowiązywania planu: {generation_date}")
 
@@ -911,65 +1877,57 @@ def run_legacy_scraper(session, source_url):
             "source": root_url,
             "scraped_on": datetime.datetime.now().isoformat(),
             "generation_date_from_page": generation_date,
+            "source_fingerprint": fingerprint,
         },
         "teachers": names_map["teachers"],
         "rooms": names_map["rooms"],
         "classes": names_map["classes"],
-        "timetables": all_timetables,
+        "timetables": iter_public_timetables(all_timetables),
     }
 
 
-def main():
-    print("--- Rozpoczynam scrapowanie planu lekcji ---")
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+def run_modern_scraper(soup, source_url, table_fragments=None):
+    """Parsuje stronę nowego formatu.
 
-    session = requests.Session()
-    session.headers.update({"User-Agent": USER_AGENT})
-
-    source_url = discover_source_url(session)
-    print(f"Pobieranie właściwego planu: {source_url}")
-
-    try:
-        response = request_with_retries(session, source_url)
-    except requests.RequestException as e:
-        print(f"Błąd pobierania planu: {e}")
-        return
-
-    source_url = response.url
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    has_modern_tables = bool(soup.select("table.plan"))
-    legacy_marker = bool(soup.find("frameset")) or bool(
-        re.search(r"lista\.html|class=['\"]tabela['\"]", response.text, flags=re.IGNORECASE)
-    )
-    if not has_modern_tables and legacy_marker:
-        print("Wykryto stary format Optivum. Przełączam parser na tryb legacy.")
-        try:
-            final_data = run_legacy_scraper(session, source_url)
-            save_final_data(final_data)
-        except Exception as e:
-            print(f"Błąd trybu legacy: {e}")
-        return
-
-    try:
-        raw_to_canon, names_map = parse_navigation_entities(soup)
-    except RuntimeError as e:
-        print(f"Błąd parsowania nowego formatu: {e}")
-        print("Próba fallback do trybu legacy...")
-        try:
-            final_data = run_legacy_scraper(session, source_url)
-            save_final_data(final_data)
-        except Exception as e2:
-            print(f"Błąd trybu legacy: {e2}")
-        return
+    table_fragments - tabele wycięte przez split_modern_document; `soup` to wtedy reszta
+    dokumentu (nawigacja, stopka), a tabele parsowane są w puli procesów.
+    """
+    parse_started = time.perf_counter()
+    if MINIMAL_FETCH:
+        # Podgrupy w planach oddziałów odtwarzane są z planów nauczycieli i sal - odwrócenie lekcji by je zgubiło.
+        print("Tryb minimalny dotyczy tylko formatu legacy - nowy format jest parsowany w całości.")
+    raw_to_canon, names_map = parse_navigation_entities(soup)
 
     all_timetables_internal = {}
+    pending_tables = []
     table_count = 0
     unknown_table_ids = 0
 
-    for table in soup.select("table.plan"):
+    use_pool = table_fragments is not None and all(
+        not raw_id or any(raw_id in raw_to_canon[domain] for domain in raw_to_canon)
+        for raw_id, _ in table_fragments
+    )
+    if use_pool:
+        table_sources = table_fragments
+    elif table_fragments is not None:
+        # Tabela spoza nawigacji rejestruje encję w trakcie pętli - kolejność ma znaczenie.
+        print("Tabele spoza nawigacji - parsowanie w procesie głównym.")
+        table_sources = [(raw_id, parse_html(fragment).select_one("table.plan")) for raw_id, fragment in table_fragments]
+    else:
+        table_sources = [(table.get("id"), table) for table in soup.select("table.plan")]
+
+    def parse_batch(entries):
+        if use_pool:
+            return parse_tables_in_pool(entries, raw_to_canon, names_map)
+        parsed = []
+        for table, domain, current_ref in entries:
+            table_started = time.perf_counter()
+            parsed.append(parse_table(table, domain, current_ref, raw_to_canon, names_map))
+            METRICS.add_item("table", time.perf_counter() - table_started, current_ref["id"])
+        return parsed
+
+    for raw_table_id, table in table_sources:
         table_count += 1
-        raw_table_id = table.get("id")
         if not raw_table_id:
             continue
         raw_table_id = normalize_text(raw_table_id)
@@ -999,15 +1957,23 @@ def main():
         )
         current_ref = {"id": canon_table_id, "name": current_name}
 
-        lessons = parse_table(table, domain, current_ref, raw_to_canon, names_map)
-        all_timetables_internal[canon_table_id] = lessons
+        pending_tables.append((table, domain, current_ref))
+        if not use_pool:
+            # Bez puli parsujemy od razu: encje z tej tabeli widzą już kolejne iteracje.
+            all_timetables_internal[canon_table_id] = parse_batch(pending_tables)[0]
+            pending_tables = []
+
+    for (_, _, current_ref), lessons in zip(pending_tables, parse_batch(pending_tables)):
+        all_timetables_internal[current_ref["id"]] = lessons
 
     # Upewnij się, że każda encja ma klucz w timetables (nawet pusty)
     for domain in ("teachers", "rooms", "classes"):
         for canon_id in names_map[domain].keys():
             all_timetables_internal.setdefault(canon_id, [])
 
-    assigned_subgroups, ambiguous_subgroups = reconstruct_class_subgroups(all_timetables_internal)
+    METRICS.add_phase("parse", time.perf_counter() - parse_started)
+    with METRICS.phase("subgroups"):
+        assigned_subgroups, ambiguous_subgroups = reconstruct_class_subgroups(all_timetables_internal)
 
     total_lessons = sum(len(v) for v in all_timetables_internal.values())
     print(
@@ -1023,11 +1989,6 @@ def main():
     if generation_date:
         print(f"Data obowiązywania planu: {generation_date}")
 
-    all_timetables_public = {
-        tid: to_public_lessons(lessons)
-        for tid, lessons in all_timetables_internal.items()
-    }
-
     final_data = {
         "metadata": {
             "source": source_url,
@@ -1037,9 +1998,436 @@ def main():
         "teachers": names_map["teachers"],
         "rooms": names_map["rooms"],
         "classes": names_map["classes"],
-        "timetables": all_timetables_public,
+        "timetables": iter_public_timetables(all_timetables_internal),
     }
-    save_final_data(final_data)
+    return final_data
+
+
+MODERN_TABLE_RE = re.compile(
+    r"<table\b[^>]*\bclass\s*=\s*(?:(['\"])(?:[^'\"]*\s)?plan(?:\s[^'\"]*)?\1|plan(?=[\s>]))",
+    flags=re.IGNORECASE,
+)
+LEGACY_MARKER_RE = re.compile(r"<frameset\b|lista\.html|class=['\"]tabela['\"]", flags=re.IGNORECASE)
+TABLE_TAG_RE = re.compile(r"<(/?)table\b[^>]*>", flags=re.IGNORECASE)
+TABLE_ID_RE = re.compile(r"""(?<![\w-])id\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", flags=re.IGNORECASE)
+SAFE_TABLE_ID_RE = re.compile(r"^[A-Za-z0-9_.:-]+$")
+
+
+def is_legacy_document(html_text):
+    """Stary eksport Optivum bez tabel nowego formatu - rozpoznawany na surowym tekście, bez parsowania."""
+    return not MODERN_TABLE_RE.search(html_text) and bool(LEGACY_MARKER_RE.search(html_text))
+
+
+def split_modern_document(html_text):
+    """Wycina tabele table.plan z surowego HTML nowego formatu.
+
+    Zwraca (reszta_dokumentu, [(surowe_id, fragment_tabeli), ...]) albo None, gdy strony nie da
+    się bezpiecznie podzielić (zagnieżdżone lub niezamknięte tabele, id z encjami/spacjami) -
+    wtedy parsowany jest cały dokument. Reszta dokumentu zawiera nawigację i stopkę.
+    """
+    rest_parts = []
+    tables = []
+    pos = 0
+    depth = 0
+    start = None
+    is_plan = False
+    for match in TABLE_TAG_RE.finditer(html_text):
+        if match.group(1):
+            if depth == 0:
+                continue
+            depth -= 1
+            if depth or not is_plan:
+                continue
+            start_tag = html_text[start : html_text.index(">", start) + 1]
+            id_match = TABLE_ID_RE.search(start_tag)
+            raw_id = next((g for g in id_match.groups() if g is not None), "") if id_match else ""
+            raw_id = raw_id.strip()
+            if raw_id and not SAFE_TABLE_ID_RE.match(raw_id):
+                return None
+            rest_parts.append(html_text[pos:start])
+            tables.append((raw_id, html_text[start : match.end()]))
+            pos = match.end()
+            continue
+        if depth == 0:
+            start = match.start()
+            is_plan = bool(MODERN_TABLE_RE.match(match.group(0)))
+        elif is_plan:
+            return None
+        depth += 1
+    if depth:
+        return None
+    rest_parts.append(html_text[pos:])
+    return "".join(rest_parts), tables
+
+
+_WORKER_MAPS = None
+
+
+def _init_table_worker(raw_to_canon, names_map, backend):
+    global _WORKER_MAPS, PARSER_BACKEND
+    _WORKER_MAPS = (raw_to_canon, names_map)
+    PARSER_BACKEND = backend
+
+
+def _ref_tuple(ref):
+    return (ref["id"], ref["name"]) if ref else None
+
+
+def _parse_table_fragment(job):
+    """Parsuje jedną tabelę w procesie puli. Zwraca wiersze lekcji, nowe encje i czas parsowania.
+
+    Mapy encji z nawigacji są tylko do odczytu (ChainMap), więc encje spoza nawigacji trafiają
+    do osobnej warstwy i wracają do procesu głównego, który rejestruje je w kolejności tabel.
+    """
+    fragment, domain, current_ref = job
+    started = time.perf_counter()
+    base_raw, base_names = _WORKER_MAPS
+    raw_to_canon = {d: ChainMap({}, base_raw[d]) for d in base_raw}
+    names_map = {d: ChainMap({}, base_names[d]) for d in base_names}
+    table = parse_html(fragment).select_one("table.plan")
+    lessons = parse_table(table, domain, current_ref, raw_to_canon, names_map) if table is not None else []
+    rows = [
+        (
+            lesson.day,
+            lesson.lesson_num,
+            lesson.time,
+            lesson.subject,
+            _ref_tuple(lesson.teacher),
+            _ref_tuple(lesson.group),
+            _ref_tuple(lesson.room),
+            lesson.subject_base,
+            lesson.subgroup_mark,
+        )
+        for lesson in lessons
+    ]
+    registered = {d: (raw_to_canon[d].maps[0], names_map[d].maps[0]) for d in raw_to_canon}
+    return rows, registered, time.perf_counter() - started
+
+
+def parse_tables_in_pool(entries, raw_to_canon, names_map):
+    """Parsuje fragmenty tabel (fragment, domena, current_ref) w puli procesów.
+
+    Wynik (lista lekcji na tabelę, w kolejności wejścia) i stan map encji są takie same jak
+    przy kolejnych wywołaniach parse_table w procesie głównym: nowe encje rejestrowane są
+    w kolejności tabel (wygrywa pierwsza etykieta), a odnośniki do nich dostają nazwę z mapy.
+    """
+    if not entries:
+        return []
+    known = {domain: set(names) for domain, names in names_map.items()}
+    workers = min(PARSE_WORKERS, len(entries))
+    chunksize = max(1, len(entries) // (workers * 4))
+
+    def ref(value, domain):
+        if value is None:
+            return None
+        ref_id, name = value
+        if ref_id not in known[domain]:
+            name = names_map[domain].get(ref_id) or name
+        return make_ref(ref_id, name)
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_table_worker,
+        initargs=(raw_to_canon, names_map, PARSER_BACKEND),
+    ) as pool:
+        for (_, domain, current_ref), (rows, registered, seconds) in zip(
+            entries, pool.map(_parse_table_fragment, entries, chunksize=chunksize)
+        ):
+            for reg_domain, (new_ids, new_names) in registered.items():
+                for raw, canon in new_ids.items():
+                    raw_to_canon[reg_domain].setdefault(raw, canon)
+                for canon, label in new_names.items():
+                    names_map[reg_domain].setdefault(canon, label)
+            results.append(
+                [
+                    Lesson(
+                        day,
+                        lesson_num,
+                        lesson_time,
+                        subject,
+                        ref(teacher, "teachers"),
+                        ref(group, "classes"),
+                        ref(room, "rooms"),
+                        source_domain=domain,
+                        subject_base=subject_base,
+                        subgroup_mark=subgroup_mark,
+                    )
+                    for day, lesson_num, lesson_time, subject, teacher, group, room, subject_base, subgroup_mark in rows
+                ]
+            )
+            METRICS.add_item("table", seconds, current_ref["id"])
+    return results
+
+
+def scrape_timetable(session):
+    """Pobiera i parsuje plan (nowy format lub legacy). Zwraca dane do zapisu albo None przy błędzie."""
+    try:
+        with METRICS.phase("discover"):
+            source_url, response = discover_plan(session)
+    except requests.RequestException as e:
+        print(f"Błąd pobierania planu: {e}")
+        return None
+    print(f"Pobrano właściwy plan: {source_url}")
+
+    # Wykrywanie formatu na surowym tekście, żeby niezmienione źródło nie wymagało parsowania.
+    if is_legacy_document(response_text(response)):
+        print("Wykryto stary format Optivum. Przełączam parser na tryb legacy.")
+        try:
+            return run_legacy_scraper(session, source_url)
+        except (SourceUnchanged, DeadlineReached):
+            raise
+        except Exception as e:
+            print(f"Błąd trybu legacy: {e}")
+        return None
+
+    generation_date = sniff_generation_date(response_text(response))
+    fingerprint = compute_source_fingerprint([(source_url, body_digest(response))], generation_date)
+    ensure_source_changed(fingerprint, generation_date)
+
+    document = response_text(response)
+    table_fragments = None
+    if PARSE_WORKERS > 1:
+        split = split_modern_document(document)
+        if split is None:
+            print("Nie udało się wydzielić tabel planu - parsowanie w procesie głównym.")
+        elif len(split[1]) > 1:
+            document, table_fragments = split
+            print(f"Parsowanie {len(table_fragments)} tabel w {min(PARSE_WORKERS, len(table_fragments))} procesach.")
+
+    with METRICS.phase("parse_html"):
+        soup = parse_html(document)
+    try:
+        final_data = run_modern_scraper(soup, source_url, table_fragments)
+        final_data["metadata"]["source_fingerprint"] = fingerprint
+        return final_data
+    except RuntimeError as e:
+        print(f"Błąd parsowania nowego formatu: {e}")
+        print("Próba fallback do trybu legacy...")
+        try:
+            return run_legacy_scraper(session, source_url)
+        except (SourceUnchanged, DeadlineReached):
+            raise
+        except Exception as e2:
+            print(f"Błąd trybu legacy: {e2}")
+        return None
+
+
+def scrape_and_save(session=None):
+    """Jeden pełny przebieg (pobranie, parsowanie, zapis). Zwraca słownik linii __structured_result__.
+
+    session - sesja HTTP do ponownego użycia (proces rezydentny trzyma ją między przebiegami).
+    """
+    global HTTP_CACHE, LIMITER, METRICS
+    METRICS = scrape_metrics.RunMetrics()
+    reset_ref_pool()
+    LIMITER = adaptive_concurrency.limiter_from_env("legacy", LEGACY_FETCH_WORKERS)
+    if DEADLINE:
+        # Przerwa z Retry-After nie może przeciągnąć przebiegu poza termin zadania.
+        LIMITER.max_pause = min(LIMITER.max_pause, DEADLINE.reserve)
+    print("--- Rozpoczynam scrapowanie planu lekcji ---")
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+
+    if HTTP_CACHE_ENABLED:
+        HTTP_CACHE = http_cache.ConditionalCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+
+    session = session or create_session()
+    result = {"__structured_result__": True, "ok": True, "unchanged": False, "output": OUTPUT_FILE}
+    try:
+        try:
+            final_data = scrape_timetable(session)
+        except SourceUnchanged as e:
+            print("Źródło planu nie zmieniło się od ostatniej publikacji - pomijam parsowanie i zapis.")
+            result.update({"unchanged": True, "fingerprint": e.fingerprint, "generation_date": e.generation_date})
+        except DeadlineReached as e:
+            detail = f"Przekroczono termin zadania po {e.done}/{e.total} stronach planu"
+            if e.saved:
+                detail += " - następny przebieg wznowi pracę z punktu kontrolnego"
+            result.update(
+                {
+                    "ok": False,
+                    "error": "deadline",
+                    "partial": True,
+                    "detail": detail,
+                    "progress": {"pages_done": e.done, "pages_total": e.total, "resumable": e.saved},
+                }
+            )
+        else:
+            if final_data is None:
+                result.update({"ok": False, "error": "scrape_failed", "detail": "Nie udało się pobrać lub sparsować planu"})
+            else:
+                write_stats = save_final_data(final_data)
+                if write_stats is None:
+                    result.update({"ok": False, "error": "write_failed", "detail": f"Nie udało się zapisać {OUTPUT_FILE}"})
+                else:
+                    metadata = final_data["metadata"]
+                    result.update(
+                        {
+                            "fingerprint": metadata.get("source_fingerprint"),
+                            "generation_date": metadata.get("generation_date_from_page", ""),
+                            **write_stats,
+                        }
+                    )
+    finally:
+        if HTTP_CACHE:
+            with METRICS.phase("state"):
+                try:
+                    HTTP_CACHE.save()
+                except OSError as e:
+                    print(f"Nie udało się zapisać cache HTTP: {e}")
+            print(HTTP_CACHE.summary())
+        if LIMITER.stats["requests"]:
+            print(LIMITER.summary())
+    print(METRICS.summary())
+    result["metrics"] = METRICS.snapshot()
+    if LIMITER.stats["requests"]:
+        result["metrics"]["concurrency"] = LIMITER.snapshot()
+    result["metrics"]["text_cache"] = text_norm.cache_stats()
+    if HTTP_CACHE:
+        result["metrics"]["http_cache"] = dict(HTTP_CACHE.stats)
+    return result
+
+
+def page_signal(response):
+    """Tanie sygnały zmiany strony: URL, ETag, Last-Modified, skrót treści i data wygenerowania ze stopki."""
+    return (
+        response.url,
+        response.headers.get("ETag", ""),
+        response.headers.get("Last-Modified", ""),
+        body_digest(response),
+        sniff_generation_date(response_text(response)),
+    )
+
+
+def probe_source(session):
+    """Lekkie sprawdzenie źródła dla trybu --watch: strona osadzająca -> strona planu, w starym formacie
+    także lista.html. Żądania są warunkowe (cache HTTP), bez parsowania planu. Zwraca krotkę sygnałów stron."""
+    _, response = discover_plan(session)
+    signals = [page_signal(response)]
+    if is_legacy_document(response_text(response)):
+        list_url = urljoin(detect_legacy_root(response.url), "lista.html")
+        signals.append(page_signal(request_with_retries(session, list_url)))
+    return tuple(signals)
+
+
+def watch(session=None, checks=None):
+    """Tryb obserwacji źródła: sprawdza sygnały co zadany odstęp i uruchamia pełny przebieg tylko po zmianie.
+
+    Po każdym pełnym przebiegu wypisuje jego linię wyniku. checks - liczba sprawdzeń (None = bez końca).
+    """
+    global HTTP_CACHE, METRICS
+    session = session or create_session()
+    interval = WATCH_INTERVAL
+    signals = None
+    last_full = None
+    check = 0
+    print(f"--- Tryb obserwacji źródła planu (odstęp {WATCH_INTERVAL:.0f}-{WATCH_MAX_INTERVAL:.0f}s) ---")
+    while checks is None or check < checks:
+        check += 1
+        METRICS = scrape_metrics.RunMetrics()
+        if HTTP_CACHE_ENABLED and HTTP_CACHE is None:
+            HTTP_CACHE = http_cache.ConditionalCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES)
+        probe = None
+        try:
+            probe = probe_source(session)
+        except requests.RequestException as e:
+            print(f"[watch] Nie udało się sprawdzić źródła: {e}")
+        finally:
+            if HTTP_CACHE:
+                try:
+                    HTTP_CACHE.save()
+                except OSError as e:
+                    print(f"Nie udało się zapisać cache HTTP: {e}")
+
+        reason = None
+        if probe is not None:
+            if signals is None:
+                reason = "pierwsze sprawdzenie"
+            elif probe != signals:
+                reason = "zmiana sygnałów źródła"
+            elif WATCH_FULL_CHECK and time.monotonic() - last_full >= WATCH_FULL_CHECK:
+                reason = "okresowe pełne sprawdzenie"
+
+        changed = False
+        if reason:
+            print(f"[watch] Pełny przebieg: {reason}.")
+            result = scrape_and_save(session)
+            result["watch"] = {"check": check, "reason": reason}
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+            last_full = time.monotonic()
+            # Po nieudanym przebiegu następne sprawdzenie ponawia pełny przebieg.
+            signals = probe if result["ok"] else None
+            changed = result["ok"] and not result["unchanged"]
+        elif probe is not None:
+            print(f"[watch] Bez zmian (data planu: {probe[0][4] or '?'}).")
+
+        interval = WATCH_INTERVAL if changed else min(WATCH_MAX_INTERVAL, interval * WATCH_BACKOFF)
+        if checks is not None and check >= checks:
+            break
+        print(f"[watch] Następne sprawdzenie za {interval:.0f}s.", flush=True)
+        time.sleep(interval)
+
+
+def main(argv=None, session=None):
+    parser = argparse.ArgumentParser(description="Scraper planu lekcji Optivum (wynik: public/timetable_data.json).")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="PLIK",
+        help="zapisz statystyki cProfile przebiegu (domyślnie server/runtime/profiles/scraper-DATA.pstats); "
+        "profilowany jest wątek główny, bez wątków pobierających",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="obserwuj źródło i uruchamiaj pełny przebieg tylko po zmianie (SCRAPER_WATCH_* w env)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SEKUNDY",
+        help="termin przebiegu: przed jego upływem przebieg legacy zapisuje punkt kontrolny i kończy się "
+        "wynikiem częściowym (kolejny przebieg wznawia pracę); zapas SCRAPER_DEADLINE_RESERVE",
+    )
+    args = parser.parse_args(argv)
+    global DEADLINE
+    DEADLINE = None
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline musi być dodatni")
+    if args.watch:
+        if args.profile is not None:
+            parser.error("--profile nie działa z --watch")
+        if args.deadline is not None:
+            parser.error("--deadline nie działa z --watch")
+        try:
+            watch(session)
+        except KeyboardInterrupt:
+            print("Zatrzymano tryb obserwacji.")
+        return None
+
+    if args.deadline is not None:
+        DEADLINE = Deadline(args.deadline)
+    profiler = cProfile.Profile() if args.profile is not None else None
+    if profiler:
+        profiler.enable()
+    try:
+        result = scrape_and_save(session)
+    finally:
+        DEADLINE = None
+        if profiler:
+            profiler.disable()
+    if profiler:
+        profile_path = args.profile or os.path.join(
+            RUNTIME_DIR, "profiles", f"scraper-{datetime.datetime.now():%Y%m%d-%H%M%S}.pstats"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(profile_path)), exist_ok=True)
+        profiler.dump_stats(profile_path)
+        print(f"Profil cProfile zapisano do: {profile_path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        result["profile"] = profile_path
+    print(json.dumps(result, ensure_ascii=False), flush=True)
+    return result
 
 
 if __name__ == "__main__":
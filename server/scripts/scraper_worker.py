@@ -0,0 +1,220 @@
+"""
+Rezydentny proces scraperów: jeden interpreter z załadowanymi scraper.py, article_scraper.py,
+documents_scraper.py i parser_supreme_statut.py obsługuje kolejne zadania. Powtórne zadanie
+nie płaci za start Pythona, importy (requests, bs4, lxml) ani nowe połączenia TLS - sesje HTTP
+skryptów (i ich pule połączeń) oraz internowane odnośniki lekcji żyją między zadaniami.
+
+Użycie:
+    python scraper_worker.py                  # żądania na stdin, zdarzenia na stdout
+    python scraper_worker.py --socket PLIK    # to samo przez gniazdo Unix
+
+Protokół (JSON, jedna wiadomość na linię):
+    żądanie:  {"id": "1", "job": "timetable", "args": ["--profile"]}
+    log:      {"id": "1", "event": "log", "stream": "stdout", "line": "..."}
+    wynik:    {"id": "1", "event": "result", "code": 0, "seconds": 1.234, "result": {...}}
+
+Zadania: timetable (args jak w wierszu poleceń scraper.py), articles, documents, statut,
+a także ping i shutdown. Zadania wykonywane są po kolei - skrypty trzymają stan przebiegu
+w zmiennych modułów. Konfiguracja z env czytana jest przy imporcie, więc jej zmiana wymaga
+restartu procesu.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+import article_scraper
+import documents_scraper
+import parser_supreme_statut
+import scraper
+
+
+JOB_LOCK = threading.Lock()
+_TIMETABLE_SESSION = None
+
+
+def _run_timetable(args):
+    global _TIMETABLE_SESSION
+    if _TIMETABLE_SESSION is None:
+        _TIMETABLE_SESSION = scraper.create_session()
+    return scraper.main(args, session=_TIMETABLE_SESSION)
+
+
+def _without_args(entry):
+    def run(args):
+        if args:
+            raise ValueError(f"Zadanie nie przyjmuje argumentów: {' '.join(args)}")
+        return entry()
+
+    return run
+
+
+JOBS = {
+    "timetable": _run_timetable,
+    "articles": _without_args(article_scraper.main),
+    "documents": _without_args(documents_scraper.main),
+    "statut": _without_args(parser_supreme_statut.main),
+}
+
+
+class EventStream:
+    """Strumień tekstowy zamieniający pełne linie wyjścia zadania na zdarzenia "log"."""
+
+    encoding = "utf-8"
+
+    def __init__(self, send, job_id, stream):
+        self.send = send
+        self.job_id = job_id
+        self.stream = stream
+        self.buffer = ""
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer += text
+            if "\n" in self.buffer:
+                *lines, self.buffer = self.buffer.split("\n")
+                for line in lines:
+                    self.send({"id": self.job_id, "event": "log", "stream": self.stream, "line": line})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        if self.buffer:
+            self.write("\n")
+
+
+def run_job(request, send):
+    job_id = request.get("id")
+    job = request.get("job")
+    started = time.perf_counter()
+    if job == "ping":
+        send({"id": job_id, "event": "result", "code": 0, "seconds": 0.0, "result": {"ok": True, "pid": os.getpid()}})
+        return
+
+    handler = JOBS.get(job)
+    if handler is None:
+        result = {"ok": False, "error": "unknown_job", "detail": f"Nieznane zadanie: {job}"}
+        send({"id": job_id, "event": "result", "code": 2, "seconds": 0.0, "result": result})
+        return
+
+    with JOB_LOCK:
+        out = EventStream(send, job_id, "stdout")
+        err = EventStream(send, job_id, "stderr")
+        code = 0
+        result = None
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    result = handler([str(arg) for arg in request.get("args") or []])
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 1
+                except Exception as e:
+                    traceback.print_exc()
+                    code = 1
+                    result = {"ok": False, "error": str(e), "detail": f"{job} failed"}
+        finally:
+            out.close()
+            err.close()
+        seconds = round(time.perf_counter() - started, 3)
+        send({"id": job_id, "event": "result", "code": code, "seconds": seconds, "result": result})
+
+
+def handle_line(raw, send):
+    """Obsługuje jedną linię żądania. Zwraca False dla "shutdown"."""
+    raw = raw.strip()
+    if not raw:
+        return True
+    try:
+        request = json.loads(raw)
+    except ValueError as e:
+        send({"event": "error", "error": f"Niepoprawny JSON żądania: {e}"})
+        return True
+    if not isinstance(request, dict):
+        send({"event": "error", "error": "Żądanie musi być obiektem JSON"})
+        return True
+    if request.get("job") == "shutdown":
+        send({"id": request.get("id"), "event": "result", "code": 0, "seconds": 0.0, "result": {"ok": True}})
+        return False
+    run_job(request, send)
+    return True
+
+
+def serve_stdio():
+    out = sys.stdout
+    lock = threading.Lock()
+
+    def send(message):
+        line = json.dumps(message)
+        with lock:
+            out.write(line + "\n")
+            out.flush()
+
+    send({"event": "ready", "pid": os.getpid(), "jobs": sorted(JOBS)})
+    for raw in sys.stdin:
+        if not handle_line(raw, send):
+            break
+
+
+class _SocketJobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lock = threading.Lock()
+        connected = [True]
+
+        def send(message):
+            data = (json.dumps(message) + "\n").encode("ascii")
+            with lock:
+                if not connected[0]:
+                    return
+                try:
+                    self.wfile.write(data)
+                    self.wfile.flush()
+                except OSError:
+                    # Klient się rozłączył - zadanie kończy się normalnie, bez wysyłania zdarzeń.
+                    connected[0] = False
+
+        send({"event": "ready", "pid": os.getpid(), "jobs": sorted(JOBS)})
+        for raw in self.rfile:
+            if not handle_line(raw.decode("utf-8", errors="replace"), send):
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                break
+
+
+def serve_socket(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, _SocketJobHandler)
+    server.daemon_threads = True
+    os.chmod(path, 0o600)
+    print(f"Proces rezydentny scraperów nasłuchuje na: {path}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rezydentny proces scraperów (żądania JSON-lines).")
+    parser.add_argument("--socket", metavar="PLIK", help="nasłuchuj na gnieździe Unix zamiast stdin/stdout")
+    args = parser.parse_args(argv)
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdio()
+
+
+if __name__ == "__main__":
+    main()
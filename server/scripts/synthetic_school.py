@@ -0,0 +1,457 @@
+"""
+Syntetyczna szkoła w formacie Optivum (nowy i stary eksport) oraz lokalny serwer HTTP z opóźnieniem.
+
+Generator buduje spójny model szkoły (oddziały, nauczyciele, sale, lekcje bez kolizji
+nauczycieli i sal w slocie), a następnie renderuje go jako:
+
+- modern: landing.html (iframe) + index.html z nawigacją `nav > div` i tabelami `table.plan`
+  (lekcje blokowe jako rowspan, podgrupy oznaczone w planach nauczycieli i sal),
+- legacy: landing.html + index.html (frameset) + lista.html + plany/{o,n,s}N.html
+  z tabelami `table.tabela` (lekcje rozdzielone <br>, podgrupy jako "-1/2").
+
+Użycie:
+    python synthetic_school.py generate KATALOG [--classes N] [--teachers N] [--rooms N]
+                                        [--days N] [--bells N] [--rowspan-rate P] [--subgroup-rate P] [--seed N]
+    python synthetic_school.py serve KATALOG [--port N] [--latency-ms N] [--jitter-ms N]
+
+Po `serve` scraper wskazuje się na http://HOST:PORT/modern/landing.html albo
+http://HOST:PORT/legacy/landing.html (TIMETABLE_LANDING_URL).
+"""
+
+import argparse
+import html
+import os
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+DAY_NAMES = ["Poniedziałek", "Wtorek", "Środa", "Czwartek", "Piątek", "Sobota", "Niedziela"]
+BELL_TIMES = [
+    "7:10- 7:55",
+    "8:00- 8:45",
+    "8:50- 9:35",
+    "9:45-10:30",
+    "10:45-11:30",
+    "11:35-12:20",
+    "12:30-13:15",
+    "13:20-14:05",
+    "14:10-14:55",
+    "15:00-15:45",
+    "15:50-16:35",
+    "16:40-17:25",
+]
+SUBJECTS = [
+    "matematyka",
+    "j.polski",
+    "j.angielski",
+    "j.niemiecki",
+    "fizyka",
+    "chemia",
+    "biologia",
+    "historia",
+    "geografia",
+    "informatyka",
+    "wf",
+    "religia",
+    "pracownia aplikacji internetowych",
+    "systemy operacyjne",
+]
+SURNAMES = ["Nowak", "Kowalski", "Wiśniewska", "Wójcik", "Kowalczyk", "Kamińska", "Lewandowski", "Zielińska", "Szymański", "Dąbrowska"]
+GENERATION_DATE = "01.09.2024"
+
+SyntheticLesson = namedtuple("SyntheticLesson", "cls day bell span subject teacher room mark")
+
+
+class SyntheticSchool:
+    """Model szkoły: nazwy encji, dni, dzwonki i lekcje (indeksy do list encji)."""
+
+    def __init__(self, classes, teachers, rooms, days, bells, lessons):
+        self.classes = classes
+        self.teachers = teachers
+        self.rooms = rooms
+        self.days = days
+        self.bells = bells
+        self.lessons = lessons
+
+    def teacher_code(self, idx):
+        return f"{self.teachers[idx].split('.')[1][:2].upper()}{idx + 1}"
+
+    def room_code(self, idx):
+        return self.rooms[idx].split(" ")[0]
+
+    def slots_by_owner(self, field):
+        """Lekcje pogrupowane jako {encja: {(dzień, dzwonek): [lekcje]}} dla pola cls/teacher/room."""
+        out = {}
+        for lesson in self.lessons:
+            owner = getattr(lesson, field)
+            if owner is not None:
+                out.setdefault(owner, {}).setdefault((lesson.day, lesson.bell), []).append(lesson)
+        return out
+
+
+def _class_name(idx):
+    return f"{1 + idx // 6 % 5}{'ABCDEF'[idx % 6]}{'T' if idx < 30 else idx // 30}"
+
+
+def build_school(
+    classes,
+    teachers,
+    rooms,
+    days=5,
+    bells=8,
+    rowspan_rate=0.1,
+    subgroup_rate=0.2,
+    fill=0.8,
+    seed=1,
+):
+    """Losowa, ale deterministyczna (seed) szkoła bez kolizji nauczycieli i sal w tym samym slocie."""
+    if not 1 <= days <= len(DAY_NAMES):
+        raise ValueError(f"Liczba dni musi być z zakresu 1-{len(DAY_NAMES)}")
+    if not 1 <= bells <= len(BELL_TIMES):
+        raise ValueError(f"Liczba lekcji w dniu musi być z zakresu 1-{len(BELL_TIMES)}")
+    rnd = random.Random(seed)
+    class_names = [_class_name(i) for i in range(classes)]
+    teacher_names = [
+        f"{'ABDEGJKMPT'[i % 10]}.{SURNAMES[i // 10 % len(SURNAMES)]}{'' if i < 100 else i // 100}" for i in range(teachers)
+    ]
+    room_names = [f"{100 + i}" if i % 7 else f"{100 + i} sala gim" for i in range(rooms)]
+
+    lessons = []
+    for d in range(days):
+        # Oddziały, nauczyciele i sale zajęci przez lekcję blokową z poprzedniego dzwonka.
+        carried_classes, carried_teachers, carried_rooms = set(), set(), set()
+        for b in range(bells):
+            free_teachers = [t for t in range(teachers) if t not in carried_teachers]
+            free_rooms = [r for r in range(rooms) if r not in carried_rooms]
+            rnd.shuffle(free_teachers)
+            rnd.shuffle(free_rooms)
+            next_classes, next_teachers, next_rooms = set(), set(), set()
+            for c in range(classes):
+                if c in carried_classes or rnd.random() >= fill:
+                    continue
+                marks = ["1/2", "2/2"] if rnd.random() < subgroup_rate else [None]
+                span = 2 if marks == [None] and b + 1 < bells and rnd.random() < rowspan_rate else 1
+                if len(free_teachers) < len(marks):
+                    continue
+                for mark in marks:
+                    teacher = free_teachers.pop()
+                    room = free_rooms.pop() if free_rooms else None
+                    lessons.append(SyntheticLesson(c, d, b, span, rnd.choice(SUBJECTS), teacher, room, mark))
+                    if span == 2:
+                        next_classes.add(c)
+                        next_teachers.add(teacher)
+                        if room is not None:
+                            next_rooms.add(room)
+            carried_classes, carried_teachers, carried_rooms = next_classes, next_teachers, next_rooms
+
+    return SyntheticSchool(class_names, teacher_names, room_names, DAY_NAMES[:days], BELL_TIMES[:bells], lessons)
+
+
+def _modern_table(school, table_id, caption, span, slots, render_cells):
+    esc = html.escape
+    parts = [f'<table class="plan" id="{table_id}"><caption>{esc(caption)}</caption><thead><tr><td>Nr</td><td>Godz</td>']
+    parts.extend(f'<td colspan="{span}">{day}</td>' for day in school.days)
+    parts.append("</tr></thead><tbody>")
+    covered = set()
+    for b, bell in enumerate(school.bells):
+        parts.append(f"<tr><td>{b + 1}</td><td>{bell}</td>")
+        for d in range(len(school.days)):
+            if (d, b) in covered:
+                continue
+            lessons = slots.get((d, b))
+            if not lessons:
+                parts.append("<td></td>" * span)
+                continue
+            lesson = lessons[0]
+            rowspan = ' rowspan="2"' if lesson.span == 2 else ""
+            if lesson.span == 2:
+                covered.add((d, b + 1))
+            parts.append("".join(f"<td{rowspan}>{cell}</td>" for cell in render_cells(lesson)))
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def render_modern(school):
+    """Strona index.html nowego eksportu (wszystkie tabele na jednej stronie)."""
+    esc = html.escape
+
+    def class_link(lesson):
+        mark = f" ({lesson.mark})" if lesson.mark else ""
+        return f'<div class="g"><a href="#c{lesson.cls}">{esc(school.classes[lesson.cls])}</a>{mark}</div>'
+
+    def teacher_link(lesson):
+        return f'<a href="#t{lesson.teacher}">{esc(school.teachers[lesson.teacher])}</a>'
+
+    def room_link(lesson):
+        return "" if lesson.room is None else f'<a href="#r{lesson.room}">{esc(school.rooms[lesson.room])}</a>'
+
+    parts = ['<html><head><meta charset="utf-8"><title>Plan lekcji</title></head><body><nav><div>']
+    parts.append('<div class="h">Oddziały</div>')
+    parts.extend(f'<a class="l" href="#c{i}">{esc(name)}</a>' for i, name in enumerate(school.classes))
+    parts.append('<div class="h">Nauczyciele</div>')
+    parts.extend(f'<a class="l" href="#t{i}">{esc(name)}</a>' for i, name in enumerate(school.teachers))
+    parts.append('<div class="h">Sale</div>')
+    parts.extend(f'<a class="l" href="#r{i}">{esc(name)}</a>' for i, name in enumerate(school.rooms))
+    parts.append("</div></nav><main>")
+
+    tables = (
+        ("c", "cls", school.classes, 3, lambda l: (esc(l.subject), teacher_link(l), room_link(l))),
+        ("t", "teacher", school.teachers, 2, lambda l: (esc(l.subject) + class_link(l), room_link(l))),
+        ("r", "room", school.rooms, 2, lambda l: (esc(l.subject) + class_link(l), teacher_link(l))),
+    )
+    for prefix, field, names, span, render_cells in tables:
+        by_owner = school.slots_by_owner(field)
+        for i, name in enumerate(names):
+            parts.append(_modern_table(school, f"{prefix}{i}", name, span, by_owner.get(i, {}), render_cells))
+    parts.append(f"</main><footer>wygenerowano {GENERATION_DATE}</footer></body></html>")
+    return "".join(parts)
+
+
+def render_legacy(school):
+    """Pliki starego eksportu: {ścieżka względna: treść}."""
+    esc = html.escape
+    files = {"index.html": '<html><head><title>Plan lekcji</title></head><frameset cols="200,*"><frame src="lista.html" name="list"><frame src="plany/o1.html" name="plan"></frameset></html>'}
+
+    lista = ['<html><head><meta charset="utf-8"></head><body><h4>Oddziały</h4><ul>']
+    lista.extend(f'<li><a href="plany/o{i + 1}.html" target="plan">{esc(name)}</a></li>' for i, name in enumerate(school.classes))
+    lista.append("</ul><h4>Nauczyciele</h4><ul>")
+    lista.extend(
+        f'<li><a href="plany/n{i + 1}.html" target="plan">{esc(name)} ({school.teacher_code(i)})</a></li>'
+        for i, name in enumerate(school.teachers)
+    )
+    lista.append("</ul><h4>Sale</h4><ul>")
+    lista.extend(f'<li><a href="plany/s{i + 1}.html" target="plan">{esc(name)}</a></li>' for i, name in enumerate(school.rooms))
+    lista.append("</ul></body></html>")
+    files["lista.html"] = "".join(lista)
+
+    def subject(lesson, with_mark):
+        mark = f"-{lesson.mark}" if with_mark and lesson.mark else ""
+        return f'<span class="p">{esc(lesson.subject)}{mark}</span>'
+
+    def teacher(lesson):
+        return f'<a href="n{lesson.teacher + 1}.html" class="n">{school.teacher_code(lesson.teacher)}</a>'
+
+    def room(lesson):
+        return "" if lesson.room is None else f'<a href="s{lesson.room + 1}.html" class="s">{esc(school.room_code(lesson.room))}</a>'
+
+    def group(lesson):
+        mark = f"-{lesson.mark}" if lesson.mark else ""
+        return f'<a href="o{lesson.cls + 1}.html" class="o">{esc(school.classes[lesson.cls])}</a>{mark}'
+
+    chunk_renderers = {
+        "o": lambda l: " ".join(filter(None, (subject(l, True), teacher(l), room(l)))),
+        "n": lambda l: " ".join(filter(None, (group(l), subject(l, False), room(l)))),
+        "s": lambda l: " ".join((teacher(l), group(l), subject(l, False))),
+    }
+
+    def page(title, slots, render_chunk):
+        parts = [
+            '<html><head><meta charset="utf-8"></head><body>',
+            f'<span class="tytulnapis">{esc(title)}</span>',
+            '<table border="1" cellspacing="0" cellpadding="4" class="tabela"><tr><th>Nr</th><th>Godz</th>',
+        ]
+        parts.extend(f"<th>{day}</th>" for day in school.days)
+        parts.append("</tr>")
+        for b, bell in enumerate(school.bells):
+            parts.append(f'<tr><td class="nr">{b + 1}</td><td class="g">{bell}</td>')
+            for d in range(len(school.days)):
+                # Lekcja blokowa występuje w starym eksporcie w każdym wierszu, który zajmuje.
+                lessons = slots.get((d, b), []) + [l for l in slots.get((d, b - 1), []) if l.span == 2]
+                body = "<br>".join(render_chunk(lesson) for lesson in lessons) if lessons else "&nbsp;"
+                parts.append(f'<td class="l">{body}</td>')
+            parts.append("</tr>")
+        parts.append(f'</table><table><tr><td class="op">wygenerowano {GENERATION_DATE}<br>za pomocą programu Plan lekcji Optivum</td></tr></table></body></html>')
+        return "".join(parts)
+
+    for prefix, field, names in (("o", "cls", school.classes), ("n", "teacher", school.teachers), ("s", "room", school.rooms)):
+        by_owner = school.slots_by_owner(field)
+        for i, name in enumerate(names):
+            files[f"plany/{prefix}{i + 1}.html"] = page(name, by_owner.get(i, {}), chunk_renderers[prefix])
+    return files
+
+
+def landing_page(target="index.html"):
+    return f'<html><body><h1>Plan lekcji</h1><iframe id="planIframe" src="{target}" width="100%"></iframe></body></html>'
+
+
+def write_site(root, school, modes=("modern", "legacy")):
+    """Zapisuje strony szkoły w KATALOG/modern i/lub KATALOG/legacy. Zwraca liczbę bajtów HTML per tryb."""
+    sizes = {}
+    for mode in modes:
+        files = {"index.html": render_modern(school)} if mode == "modern" else render_legacy(school)
+        files["landing.html"] = landing_page()
+        total = 0
+        for rel, text in files.items():
+            path = os.path.join(root, mode, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = text.encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(payload)
+            total += len(payload)
+        sizes[mode] = total
+    return sizes
+
+
+class _LatencyHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, server_state, **kwargs):
+        self.server_state = server_state
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        state = self.server_state
+        with state.lock:
+            state.inflight += 1
+            inflight = state.inflight
+        try:
+            delay = state.latency + (random.uniform(0, state.jitter) if state.jitter else 0)
+            if state.capacity:
+                # Przeciążony hosting: ponad pojemność opóźnienie rośnie z liczbą żądań, ponad dwukrotność - 429.
+                delay *= max(1.0, inflight / state.capacity)
+                if inflight > 2 * state.capacity:
+                    with state.lock:
+                        state.throttled += 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(state.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return None
+            if delay:
+                time.sleep(delay)
+        finally:
+            with state.lock:
+                state.inflight -= 1
+        result = super().send_head()
+        with state.lock:
+            state.requests += 1
+            if result is not None and self.headers.get("Range") is None:
+                try:
+                    state.bytes_sent += os.fstat(result.fileno()).st_size
+                except (AttributeError, OSError, ValueError):
+                    pass
+        return result
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyntheticServer:
+    """Serwer HTTP katalogu ze sztucznym opóźnieniem odpowiedzi (w osobnym wątku).
+
+    Użycie jako context manager; `base_url` wskazuje katalog główny, a liczniki
+    `requests`/`bytes_sent` pozwalają policzyć przepustowość przebiegu scrapera.
+    capacity > 0 symuluje przeciążany hosting: przy większej liczbie równoczesnych żądań
+    opóźnienie rośnie proporcjonalnie, a ponad 2 * capacity serwer odpowiada 429 z Retry-After
+    (licznik `throttled`).
+    """
+
+    def __init__(self, root, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, capacity=0, retry_after=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.inflight = 0
+        self.throttled = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        handler = partial(_LatencyHandler, directory=root, server_state=self)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def counters(self):
+        with self.lock:
+            return self.requests, self.bytes_sent
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_school_arguments(parser):
+    parser.add_argument("--classes", type=int, default=30)
+    parser.add_argument("--teachers", type=int, default=60)
+    parser.add_argument("--rooms", type=int, default=45)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--bells", type=int, default=8, help="liczba lekcji w dniu")
+    parser.add_argument("--rowspan-rate", type=float, default=0.1, help="udział lekcji blokowych (2 godziny)")
+    parser.add_argument("--subgroup-rate", type=float, default=0.2, help="udział slotów z podziałem na podgrupy")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def school_from_args(args, scale=1):
+    return build_school(
+        args.classes * scale,
+        args.teachers * scale,
+        args.rooms * scale,
+        days=args.days,
+        bells=args.bells,
+        rowspan_rate=args.rowspan_rate,
+        subgroup_rate=args.subgroup_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="zapisz strony syntetycznej szkoły")
+    gen.add_argument("root")
+    gen.add_argument("--mode", choices=("modern", "legacy", "both"), default="both")
+    add_school_arguments(gen)
+    srv = sub.add_parser("serve", help="serwuj katalog z opóźnieniem")
+    srv.add_argument("root")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--latency-ms", type=float, default=20.0)
+    srv.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        school = school_from_args(args)
+        modes = ("modern", "legacy") if args.mode == "both" else (args.mode,)
+        sizes = write_site(args.root, school, modes)
+        for mode, size in sizes.items():
+            print(
+                f"{mode}: {os.path.join(args.root, mode)} ({size} B, oddziały={len(school.classes)}, "
+                f"nauczyciele={len(school.teachers)}, sale={len(school.rooms)}, lekcje={len(school.lessons)})"
+            )
+        return 0
+
+    server = SyntheticServer(args.root, args.host, args.port, args.latency_ms / 1000, args.jitter_ms / 1000)
+    print(f"Serwer: {server.base_url} (opóźnienie {args.latency_ms} ms, jitter {args.jitter_ms} ms)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
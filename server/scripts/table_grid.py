@@ -0,0 +1,98 @@
+"""
+Rozwijanie tabel HTML z rowspan/colspan do siatki wiersz x kolumna.
+
+Silnik nie zależy od parsera HTML - dostaje wiersze jako listy komórek i funkcję
+zwracającą (rowspan, colspan) dla komórki. Oczekujące rowspany trzymane są w tablicy
+indeksowanej kolumną, więc koszt jest liniowy względem liczby pól siatki
+(bez ponownego przeszukiwania aktywnych kluczy w każdym wierszu).
+"""
+
+
+class GridRow:
+    """Rozwinięty wiersz: cells[col] to komórka (lub None), continued[col] - czy pochodzi z rowspan z wyższego wiersza."""
+
+    __slots__ = ("cells", "continued")
+
+    def __init__(self, cells, continued):
+        self.cells = cells
+        self.continued = continued
+
+    def __len__(self):
+        return len(self.cells)
+
+    def get(self, col):
+        """Zwraca (komórka, z_rowspan) albo None dla pustego pola."""
+        if 0 <= col < len(self.cells):
+            cell = self.cells[col]
+            if cell is not None:
+                return cell, self.continued[col]
+        return None
+
+
+def expand_grid(rows, spans_of):
+    """Rozwija wiersze komórek do listy GridRow.
+
+    rows     - iterowalne wiersze, każdy to iterowalna lista komórek (np. <td>),
+    spans_of - funkcja cell -> (rowspan, colspan), obie wartości >= 1.
+
+    Reguły rozmieszczenia odpowiadają przeglądarce dla poprawnych tabel; dla niepoprawnych
+    (komórka nachodząca na trwający rowspan) komórka nadpisuje pole, a rowspan czeka na kolejny wiersz.
+    """
+    pending_cell = []  # col -> komórka z trwającym rowspan (lub None)
+    pending_left = []  # col -> ile jeszcze wierszy obejmuje
+    expanded = []
+
+    for tr_cells in rows:
+        cells = []
+        continued = []
+
+        def place(col, cell, from_pending):
+            if col >= len(cells):
+                grow = col + 1 - len(cells)
+                cells.extend([None] * grow)
+                continued.extend([False] * grow)
+            cells[col] = cell
+            continued[col] = from_pending
+
+        def consume(col):
+            place(col, pending_cell[col], True)
+            if pending_left[col] <= 1:
+                pending_cell[col] = None
+                pending_left[col] = 0
+            else:
+                pending_left[col] -= 1
+
+        def consume_until_gap(col):
+            while col < len(pending_cell) and pending_cell[col] is not None:
+                consume(col)
+                col += 1
+            return col
+
+        col = consume_until_gap(0)
+        for cell in tr_cells:
+            col = consume_until_gap(col)
+            rowspan, colspan = spans_of(cell)
+            end = col + colspan
+            if rowspan > 1 and end > len(pending_cell):
+                grow = end - len(pending_cell)
+                pending_cell.extend([None] * grow)
+                pending_left.extend([0] * grow)
+            for idx in range(col, end):
+                place(idx, cell, False)
+                if rowspan > 1:
+                    pending_cell[idx] = cell
+                    pending_left[idx] = rowspan - 1
+            col = consume_until_gap(end)
+
+        # Rowspany na prawo od ostatniej komórki wiersza (także za przerwami).
+        for idx in range(col, len(pending_cell)):
+            if pending_cell[idx] is not None:
+                consume(idx)
+
+        while pending_cell and pending_cell[-1] is None:
+            pending_cell.pop()
+            pending_left.pop()
+
+        expanded.append(GridRow(cells, continued))
+
+    return expanded
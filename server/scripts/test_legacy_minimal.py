@@ -0,0 +1,117 @@
+"""Tryb minimalny legacy: plany nauczycieli i sal wyprowadzone z planów oddziałów muszą być takie jak z pełnego parsowania.
+
+Uruchomienie: python -m pytest server/scripts albo python -m unittest test_legacy_minimal (z katalogu server/scripts).
+"""
+
+import types
+import unittest
+
+import scraper
+
+
+HEADER = '<tr><th>Nr</th><th>Godz</th><th>Poniedziałek</th><th>Wtorek</th></tr>'
+
+
+def page(rows):
+    body = "".join(
+        f'<tr><td class="nr">{num}</td><td class="g">{time}</td>'
+        + "".join(f'<td class="l">{cell or "&nbsp;"}</td>' for cell in cells)
+        + "</tr>"
+        for num, time, cells in rows
+    )
+    return (
+        f'<html><body><table class="tabela">{HEADER}{body}</table>'
+        '<table><tr><td class="op">wygenerowano 15.02.2026</td></tr></table></body></html>'
+    )
+
+
+# Układ jak na stronie szkoły: w planie oddziału oznaczenie podgrupy jest sklejone z przedmiotem,
+# w planach nauczyciela i sali dopisane do odnośnika oddziału.
+CLASS_PAGE = page(
+    [
+        (
+            "1",
+            "8:00- 8:45",
+            [
+                '<span class="p">informatyka-2/3</span> <a href="n1.html" class="n">PA</a> <a href="s1.html" class="s">001</a>'
+                '<br><span class="p">religia</span> <a href="n2.html" class="n">RZ</a> <a href="s2.html" class="s">203</a>',
+                '<span class="p">matematyka</span> <a href="n1.html" class="n">PA</a> <a href="s2.html" class="s">203</a>',
+            ],
+        ),
+    ]
+)
+TEACHER_PAGE = page(
+    [
+        (
+            "1",
+            "8:00- 8:45",
+            [
+                '<span class="p">informatyka</span> <a href="o1.html" class="o">1TA</a>-2/3 <a href="s1.html" class="s">001</a>',
+                '<span class="p">matematyka</span> <a href="o1.html" class="o">1TA</a> <a href="s2.html" class="s">203</a>',
+            ],
+        ),
+    ]
+)
+ROOM_PAGE = page(
+    [
+        (
+            "1",
+            "8:00- 8:45",
+            [
+                '<span class="p">religia</span> <a href="n2.html" class="n">RZ</a> <a href="o1.html" class="o">1TA</a>',
+                '<span class="p">matematyka</span> <a href="n1.html" class="n">PA</a> <a href="o1.html" class="o">1TA</a>',
+            ],
+        ),
+    ]
+)
+
+
+class LegacyMinimalFetchTest(unittest.TestCase):
+    def setUp(self):
+        self.raw_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
+        self.names_map = {"teachers": {}, "rooms": {}, "classes": {}}
+        self.file_to_canon = {"teachers": {}, "rooms": {}, "classes": {}}
+        self.refs = {}
+        for domain, file_id, label in (
+            ("classes", "o1", "1TA"),
+            ("teachers", "n1", "PA"),
+            ("teachers", "n2", "RZ"),
+            ("rooms", "s1", "001"),
+            ("rooms", "s2", "203"),
+        ):
+            self.refs[file_id] = scraper.resolve_legacy_ref(
+                domain, file_id, label, self.raw_to_canon, self.names_map, self.file_to_canon
+            )
+
+    def parse(self, markup, domain, file_id):
+        response = types.SimpleNamespace(content=markup.encode("utf-8"), encoding="utf-8")
+        lessons, _ = scraper.parse_legacy_timetable_page(
+            response, domain, dict(self.refs[file_id]), self.raw_to_canon, self.names_map, self.file_to_canon
+        )
+        return lessons
+
+    def test_derived_views_match_full_parse(self):
+        class_id = self.refs["o1"]["id"]
+        all_timetables = {class_id: self.parse(CLASS_PAGE, "classes", "o1")}
+        covered = scraper.referenced_entity_ids(all_timetables)
+        derived = scraper.derive_views_from_classes(all_timetables, covered)
+
+        full = {
+            self.refs["n1"]["id"]: self.parse(TEACHER_PAGE, "teachers", "n1"),
+            self.refs["s2"]["id"]: self.parse(ROOM_PAGE, "rooms", "s2"),
+        }
+        for entity_id, lessons in full.items():
+            with self.subTest(entity=entity_id):
+                self.assertEqual(
+                    scraper.to_public_lessons(derived[entity_id]),
+                    scraper.to_public_lessons(lessons),
+                )
+
+    def test_derived_subject_uses_spaced_mark(self):
+        self.assertEqual(scraper.derived_subject("informatyka-2/3"), "informatyka - 2/3")
+        self.assertEqual(scraper.derived_subject("informatyka - 2/3"), "informatyka - 2/3")
+        self.assertEqual(scraper.derived_subject("religia"), "religia")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Rozwijanie siatki table_grid.expand_grid dla tabel poprawnych i niepoprawnych.
+
+Uruchomienie: python -m pytest server/scripts albo python -m unittest test_table_grid (z katalogu server/scripts).
+"""
+
+import unittest
+
+import table_grid
+from scraper import cell_spans
+
+
+def cell(name, rowspan=None, colspan=None):
+    # Komórka jak <td>: atrybuty jako tekst (albo brak), cell_spans czyta je przez .get().
+    attrs = {"name": name}
+    if rowspan is not None:
+        attrs["rowspan"] = rowspan
+    if colspan is not None:
+        attrs["colspan"] = colspan
+    return attrs
+
+
+def layout(rows):
+    """Siatka jako listy nazw komórek; "x*" to pole z rowspan z wyższego wiersza, None - puste pole."""
+    result = []
+    for grid_row in table_grid.expand_grid(rows, cell_spans):
+        line = []
+        for col in range(len(grid_row)):
+            entry = grid_row.get(col)
+            if entry is None:
+                line.append(None)
+            else:
+                td, continued = entry
+                line.append(td["name"] + ("*" if continued else ""))
+        result.append(line)
+    return result
+
+
+class ExpandGridTest(unittest.TestCase):
+    def test_plain_rowspan_and_colspan(self):
+        rows = [
+            [cell("nr", rowspan="2"), cell("a", colspan="2")],
+            [cell("b"), cell("c")],
+        ]
+        self.assertEqual(layout(rows), [["nr", "a", "a"], ["nr*", "b", "c"]])
+
+    def test_overlapping_spans(self):
+        # Komórka wiersza 1 przykrywa trwający rowspan "b" - nadpisuje pole, a "b" czeka na kolejny wiersz.
+        rows = [
+            [cell("a"), cell("b", rowspan="2")],
+            [cell("x", colspan="3")],
+            [],
+        ]
+        self.assertEqual(layout(rows), [["a", "b"], ["x", "x", "x"], [None, "b*"]])
+
+    def test_colspan_over_pending_rowspans(self):
+        rows = [
+            [cell("tall", rowspan="4"), cell("b")],
+            [cell("wide", colspan="3")],
+            [cell("c", rowspan="3", colspan="2")],
+            [cell("d"), cell("e", colspan="2")],
+            [],
+            [],
+        ]
+        self.assertEqual(
+            layout(rows),
+            [
+                ["tall", "b"],
+                ["tall*", "wide", "wide", "wide"],
+                ["tall*", "c", "c"],
+                ["tall*", "c*", "c*", "d", "e", "e"],
+                [None, "c*", "c*"],
+                [],
+            ],
+        )
+
+    def test_rowspan_past_table_end(self):
+        rows = [
+            [cell("a", rowspan="5"), cell("b")],
+            [cell("c")],
+        ]
+        self.assertEqual(layout(rows), [["a", "b"], ["a*", "c"]])
+
+    def test_invalid_span_values_count_as_one(self):
+        for value in ("0", "-2", "abc", "", "1.5", None):
+            with self.subTest(value=value):
+                rows = [
+                    [cell("a", rowspan=value, colspan=value), cell("b")],
+                    [cell("c"), cell("d")],
+                ]
+                self.assertEqual(layout(rows), [["a", "b"], ["c", "d"]])
+
+    def test_ragged_rows(self):
+        rows = [
+            [cell("a"), cell("b"), cell("c")],
+            [cell("d")],
+            [cell("e"), cell("f"), cell("g"), cell("h")],
+        ]
+        self.assertEqual(layout(rows), [["a", "b", "c"], ["d"], ["e", "f", "g", "h"]])
+
+    def test_rowspans_right_of_short_row(self):
+        # Krótki wiersz nie kończy rowspanów po prawej - pola między nimi zostają puste.
+        rows = [
+            [cell("a"), cell("b", rowspan="2"), cell("c"), cell("d", rowspan="2")],
+            [cell("e")],
+        ]
+        self.assertEqual(layout(rows), [["a", "b", "c", "d"], ["e", "b*", None, "d*"]])
+
+    def test_grid_row_get_outside_row(self):
+        grid_row = table_grid.expand_grid([[cell("a")]], cell_spans)[0]
+        self.assertIsNone(grid_row.get(-1))
+        self.assertIsNone(grid_row.get(5))
+        self.assertEqual(grid_row.get(0), ({"name": "a"}, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Raport spójności planu (timetable_checks.build_report) na małych danych.
+
+Uruchomienie: python -m pytest server/scripts albo python -m unittest test_timetable_checks (z katalogu server/scripts).
+"""
+
+import unittest
+
+import timetable_checks
+
+
+def ref(entity_id):
+    return {"id": entity_id, "name": entity_id[1:]} if entity_id else None
+
+
+def lesson(day, num, subject, teacher, group, room, group_name=None):
+    group_ref = ref(group)
+    if group_ref and group_name:
+        group_ref["name"] = group_name
+    return {
+        "day": day,
+        "lesson_num": num,
+        "time": "8:00 - 8:45",
+        "subject": subject,
+        "teacher": ref(teacher),
+        "group": group_ref,
+        "room": ref(room),
+    }
+
+
+def plan(timetables):
+    data = {"metadata": {"source": "test"}, "teachers": {}, "rooms": {}, "classes": {}, "timetables": timetables}
+    prefixes = {"n": "teachers", "s": "rooms", "o": "classes"}
+    for entity_id in timetables:
+        data[prefixes[entity_id[0]]][entity_id] = entity_id[1:]
+    return data
+
+
+class BuildReportTest(unittest.TestCase):
+    def test_consistent_views(self):
+        data = plan(
+            {
+                "nRZ": [lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203")],
+                "s203": [lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203")],
+                "o3TA": [lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203")],
+            }
+        )
+        report = timetable_checks.build_report(data)
+        self.assertEqual(set(report["summary"].values()), {0})
+
+    def test_class_view_without_teacher_matches_full_lesson(self):
+        # Plan oddziału podaje lekcję raz z nauczycielem, raz bez (jak o3TA w planie szkoły).
+        full = lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203")
+        data = plan(
+            {
+                "nRZ": [full],
+                "s203": [full],
+                "o3TA": [full, lesson("Czwartek", "1", "religia", None, "o3TA", "s203")],
+            }
+        )
+        report = timetable_checks.build_report(data)
+        self.assertEqual(set(report["summary"].values()), {0})
+
+    def test_class_view_without_teacher_only(self):
+        # Jedyny wpis w planie oddziału nie ma nauczyciela - plan nauczyciela nie jest "brakujący" w oddziale.
+        full = lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203")
+        data = plan(
+            {
+                "nRZ": [full],
+                "s203": [full],
+                "o3TA": [lesson("Czwartek", "1", "religia", None, "o3TA", "s203")],
+            }
+        )
+        summary = timetable_checks.build_report(data)["summary"]
+        self.assertEqual(summary["missing_in_class_view"], 0)
+        self.assertEqual(summary["class_overlap"], 0)
+
+    def test_different_room_still_overlaps(self):
+        # Pusty nauczyciel nie maskuje innej sali w tym samym slocie.
+        data = plan(
+            {
+                "o3TA": [
+                    lesson("Czwartek", "1", "religia", "nRZ", "o3TA", "s203"),
+                    lesson("Czwartek", "1", "fizyka", None, "o3TA", "s101"),
+                ],
+            }
+        )
+        summary = timetable_checks.build_report(data)["summary"]
+        self.assertEqual(summary["class_overlap"], 1)
+
+    def test_subgroups_do_not_overlap(self):
+        data = plan(
+            {
+                "o1TA": [
+                    lesson("Poniedziałek", "1", "informatyka-1/2", "nPA", "o1TA", "s001", "1TA (1/2)"),
+                    lesson("Poniedziałek", "1", "wf-2/2", "nBK", "o1TA", "sGIM", "1TA (2/2)"),
+                ],
+            }
+        )
+        summary = timetable_checks.build_report(data)["summary"]
+        self.assertEqual(summary["class_overlap"], 0)
+
+    def test_double_booking_and_missing_view(self):
+        data = plan(
+            {
+                "nPA": [
+                    lesson("Wtorek", "2", "matematyka", "nPA", "o1TA", "s101"),
+                    lesson("Wtorek", "2", "matematyka", "nPA", "o2TA", "s102"),
+                ],
+                "o1TA": [lesson("Wtorek", "2", "matematyka", "nPA", "o1TA", "s101")],
+                "o2TA": [lesson("Wtorek", "3", "fizyka", "nLS", "o2TA", "s102")],
+            }
+        )
+        report = timetable_checks.build_report(data)
+        self.assertEqual(report["summary"]["teacher_double_booking"], 1)
+        self.assertEqual(report["summary"]["missing_in_class_view"], 1)
+        self.assertEqual(report["examples"]["missing_in_class_view"][0]["view"], "o2TA")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Normalizacja tekstów planu: wspólne, skompilowane raz wzorce i pamięć podręczna wyników.
+
+Funkcje wywoływane są dla każdej lekcji, a ich argumenty (nazwiska, sale, przedmioty,
+oznaczenia podgrup) powtarzają się tysiące razy. Wyniki trzymane są w ograniczonych
+pamięciach LRU (functools.lru_cache), a wzorce zależne od oznaczenia podgrupy albo nazwy
+grupy kompilowane są raz na wartość. Wszystkie funkcje są czyste i zwracają wartości
+niezmienne, więc współdzielenie wyników jest bezpieczne (także między przebiegami
+w procesie rezydentnym). cache_stats() podaje trafienia i chybienia każdej pamięci.
+"""
+
+import re
+from functools import lru_cache
+
+
+# Oznaczenie podgrupy: "1/2" albo litera z numerem ("a1", "ż2").
+_MARK = r"[0-9]+/[0-9]+|[a-ząćęłńóśżź]\d+"
+
+WHITESPACE_RE = re.compile(r"\s+")
+TIME_DASH_RE = re.compile(r"\s*-\s*")
+SUBJECT_DASH_MARK_RE = re.compile(rf"\s*-\s*({_MARK})\s*$", re.IGNORECASE)
+SUBJECT_PAREN_MARK_RE = re.compile(rf"\s*\(({_MARK})\)\s*$", re.IGNORECASE)
+ANY_DASH_MARK_RE = re.compile(rf"-\s*({_MARK})\b", re.IGNORECASE)
+GROUP_MARK_SUFFIX_RE = re.compile(r"\s*\([^()]+\)\s*$")
+FRACTION_MARK_RE = re.compile(r"^(\d+)/(\d+)$")
+
+TEXT_CACHE_SIZE = 16384
+DERIVED_CACHE_SIZE = 8192
+PATTERN_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _normalize_str(value):
+    return WHITESPACE_RE.sub(" ", value.replace("\xa0", " ")).strip()
+
+
+def normalize_text(value):
+    if value is None:
+        return ""
+    # Klucz zawsze jako zwykły str: podklasy (np. NavigableString) trzymałyby w pamięci całe drzewo.
+    return _normalize_str(value if type(value) is str else str(value))
+
+
+@lru_cache(maxsize=DERIVED_CACHE_SIZE)
+def normalize_time(value):
+    text = normalize_text(value)
+    text = text.replace("–", "-").replace("—", "-")
+    return normalize_text(TIME_DASH_RE.sub(" - ", text))
+
+
+@lru_cache(maxsize=DERIVED_CACHE_SIZE)
+def normalize_subject_for_match(subject):
+    s = normalize_text(subject).lower()
+    if not s:
+        return ""
+    s = SUBJECT_DASH_MARK_RE.sub("", s)
+    s = SUBJECT_PAREN_MARK_RE.sub("", s)
+    return normalize_text(s)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _mark_in_subject_re(mark):
+    return re.compile(rf"(?:^|[\s\-(]){re.escape(mark)}(?:$|[\s)])", re.IGNORECASE)
+
+
+@lru_cache(maxsize=DERIVED_CACHE_SIZE)
+def add_mark_to_subject(subject, mark):
+    subject = normalize_text(subject)
+    mark = normalize_text(mark)
+    if not subject or not mark:
+        return subject
+    if _mark_in_subject_re(mark).search(subject):
+        return subject
+    return f"{subject} - {mark}"
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _group_dash_mark_re(group_name):
+    return re.compile(rf"{re.escape(group_name)}\s*-\s*({_MARK})\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=DERIVED_CACHE_SIZE)
+def extract_chunk_mark(chunk_text, group_name="", subject=""):
+    m_subject = SUBJECT_DASH_MARK_RE.search(normalize_text(subject))
+    if m_subject:
+        return normalize_text(m_subject.group(1))
+
+    chunk_norm = normalize_text(chunk_text)
+    group_norm = normalize_text(group_name)
+    if group_norm:
+        m_group = _group_dash_mark_re(group_norm).search(chunk_norm)
+        if m_group:
+            return normalize_text(m_group.group(1))
+
+    m_any = ANY_DASH_MARK_RE.search(chunk_norm)
+    if m_any:
+        return normalize_text(m_any.group(1))
+
+    return None
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _group_paren_mark_re(mark):
+    return re.compile(rf"\({re.escape(mark)}\)\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=DERIVED_CACHE_SIZE)
+def maybe_add_mark_to_group_name(group_name, mark):
+    gn = normalize_text(group_name)
+    mk = normalize_text(mark)
+    if not gn or not mk:
+        return gn
+    if _group_paren_mark_re(mk).search(gn):
+        return gn
+    return f"{gn} ({mk})"
+
+
+def strip_group_mark(group_name):
+    """Nazwa grupy bez końcowego "(oznaczenie)"."""
+    return GROUP_MARK_SUFFIX_RE.sub("", normalize_text(group_name))
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def mark_sort_key(mark):
+    mark = normalize_text(mark)
+    m = FRACTION_MARK_RE.match(mark)
+    if m:
+        num = int(m.group(1))
+        den = int(m.group(2))
+        return (0, den, num, mark)
+    return (1, mark.lower(), mark)
+
+
+CACHED = {
+    "normalize_text": _normalize_str,
+    "normalize_time": normalize_time,
+    "normalize_subject_for_match": normalize_subject_for_match,
+    "add_mark_to_subject": add_mark_to_subject,
+    "extract_chunk_mark": extract_chunk_mark,
+    "maybe_add_mark_to_group_name": maybe_add_mark_to_group_name,
+    "mark_sort_key": mark_sort_key,
+    "mark_in_subject_re": _mark_in_subject_re,
+    "group_dash_mark_re": _group_dash_mark_re,
+    "group_paren_mark_re": _group_paren_mark_re,
+}
+
+
+def cache_stats():
+    """Trafienia, chybienia, zajętość i skuteczność każdej pamięci (od startu procesu albo cache_clear)."""
+    stats = {}
+    for name, fn in CACHED.items():
+        info = fn.cache_info()
+        calls = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": round(info.hits / calls, 4) if calls else 0.0,
+        }
+    return stats
+
+
+def cache_clear():
+    for fn in CACHED.values():
+        fn.cache_clear()
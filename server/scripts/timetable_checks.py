@@ -0,0 +1,240 @@
+"""
+Kontrola spójności planu: konflikty w slotach i niezgodności między widokami.
+
+Jeden przebieg po wszystkich lekcjach buduje indeks (domena, encja, dzień, numer lekcji) ->
+zajęcia w tym slocie. Te same zajęcia widziane z planu oddziału, nauczyciela i sali dają
+jeden wpis (klucz: nauczyciel, sala, grupa, podgrupa). Pusty nauczyciel albo sala (eksport
+pomija je czasem w jednym z widoków) pasuje do każdej wartości - takie zajęcia to te same
+zajęcia co pełniejszy wpis w tym slocie. Koszt jest liniowy względem liczby lekcji, bez
+porównywania par encji (porównywane są tylko zajęcia w jednym slocie).
+
+Zgłaszane rodzaje:
+- teacher_double_booking - nauczyciel w jednym slocie w dwóch różnych salach,
+- room_collision         - sala w jednym slocie z dwoma różnymi nauczycielami,
+- class_overlap          - oddział w jednym slocie na dwóch zajęciach tej samej podgrupy
+                           (albo całego oddziału) z różnymi nauczycielami lub salami,
+- missing_in_teacher_view / missing_in_room_view - lekcja z planu oddziału, której nie ma
+                           w planie jej nauczyciela / sali,
+- missing_in_class_view  - lekcja z planu nauczyciela lub sali, której slot jest pusty
+                           w planie oddziału (nowy eksport pokazuje w planie oddziału jedną
+                           podgrupę na slot, więc lekcja podgrupy wystarczy, że slot jest zajęty).
+
+Plik (public/timetable_conflicts.json):
+    {"format": "timetable-conflicts", "version": 1, "source": ..., "generation_date": ...,
+     "summary": {rodzaj: liczba}, "examples": {rodzaj: [do MAX_EXAMPLES przykładów]}}
+
+Użycie:
+    python timetable_checks.py [--file timetable_data.json] [--examples N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+
+from text_norm import SUBJECT_DASH_MARK_RE
+
+
+FORMAT_NAME = "timetable-conflicts"
+FORMAT_VERSION = 1
+DOMAINS = ("teachers", "rooms", "classes")
+KINDS = (
+    "teacher_double_booking",
+    "room_collision",
+    "class_overlap",
+    "missing_in_teacher_view",
+    "missing_in_room_view",
+    "missing_in_class_view",
+)
+MAX_EXAMPLES = 50
+DEFAULT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "public",
+    "timetable_data.json",
+)
+
+_GROUP_MARK_RE = re.compile(r"\(([^()]+)\)\s*$")
+
+
+def _ref_id(ref):
+    return (ref.get("id") or "") if ref else ""
+
+
+def _subgroup_mark(lesson):
+    """Oznaczenie podgrupy z nazwy grupy ("1A (1/2)") albo, jak w planach nauczycieli, z przedmiotu ("fizyka - 1/2")."""
+    group = lesson.get("group")
+    m = _GROUP_MARK_RE.search((group.get("name") or "") if group else "")
+    if m:
+        return m.group(1).strip()
+    m = SUBJECT_DASH_MARK_RE.search(lesson.get("subject") or "")
+    return m.group(1) if m else None
+
+
+def _wildcard_match(a, b):
+    """Czy krotki identyfikatorów się zgadzają, gdy pusta wartość pasuje do każdej."""
+    return all(not x or not y or x == y for x, y in zip(a, b))
+
+
+def _completeness(activity):
+    teacher, room, _, mark = activity
+    return bool(teacher) + bool(room) + bool(mark)
+
+
+def _lesson_summary(lesson):
+    return {field: lesson.get(field) for field in ("subject", "teacher", "group", "room")}
+
+
+class _Report:
+    def __init__(self, max_examples):
+        self.max_examples = max_examples
+        self.summary = {kind: 0 for kind in KINDS}
+        self.examples = {kind: [] for kind in KINDS}
+
+    def add(self, kind, example):
+        self.summary[kind] += 1
+        if len(self.examples[kind]) < self.max_examples:
+            self.examples[kind].append(example)
+
+
+def _slot_conflicts(domain, activities):
+    """Rodzaj konfliktu dla zajęć encji w jednym slocie albo None. activities: {(nauczyciel, sala, grupa, podgrupa): lekcja}."""
+    if domain == "teachers":
+        return "teacher_double_booking" if len({room for _, room, _, _ in activities if room}) > 1 else None
+    if domain == "rooms":
+        return "room_collision" if len({teacher for teacher, _, _, _ in activities if teacher}) > 1 else None
+    # Zajęcia bez podgrupy albo bez nauczyciela/sali, które mają pełniejszy odpowiednik (zgodny nauczyciel
+    # i sala), to ta sama lekcja widziana z planu oddziału przed odtworzeniem podgrup lub bez części danych.
+    by_mark = defaultdict(set)
+    for activity in activities:
+        teacher, room, _, mark = activity
+        if any(
+            _completeness(other) > _completeness(activity)
+            and (mark is None or mark == other[3])
+            and _wildcard_match((teacher, room), other[:2])
+            for other in activities
+        ):
+            continue
+        by_mark[mark].add((teacher, room))
+    if any(len(pairs) > 1 for pairs in by_mark.values()):
+        return "class_overlap"
+    if None in by_mark and len(by_mark) > 1:
+        return "class_overlap"
+    return None
+
+
+def build_report(final_data, max_examples=MAX_EXAMPLES):
+    """Raport konfliktów dla danych planu (słowniki lekcji jak w timetable_data.json)."""
+    timetables = final_data.get("timetables", {})
+    domain_of = {}
+    for domain in DOMAINS:
+        for entity_id in final_data.get(domain, {}):
+            domain_of.setdefault(entity_id, domain)
+
+    slots = defaultdict(dict)  # (domena, encja, dzień, numer) -> {klucz zajęć: lekcja}
+    seen = set()  # (właściciel planu, dzień, numer, encja z lekcji)
+    busy = set()  # (właściciel planu, dzień, numer)
+    partial = defaultdict(list)  # (właściciel planu, dzień, numer) -> [(nauczyciel, sala, grupa)] lekcji bez nauczyciela lub sali
+    for owner_id, lessons in timetables.items():
+        for lesson in lessons:
+            day = lesson.get("day") or ""
+            num = lesson.get("lesson_num") or ""
+            teacher_id = _ref_id(lesson.get("teacher"))
+            room_id = _ref_id(lesson.get("room"))
+            group_id = _ref_id(lesson.get("group"))
+            activity = (teacher_id, room_id, group_id, _subgroup_mark(lesson))
+            busy.add((owner_id, day, num))
+            if not teacher_id or not room_id:
+                partial[(owner_id, day, num)].append((teacher_id, room_id, group_id))
+            for domain, entity_id in (("teachers", teacher_id), ("rooms", room_id), ("classes", group_id)):
+                if entity_id and domain_of.get(entity_id) == domain:
+                    slots[(domain, entity_id, day, num)].setdefault(activity, lesson)
+                    if entity_id != owner_id:
+                        seen.add((owner_id, day, num, entity_id))
+
+    def in_view(view_id, day, num, entity_id, lesson):
+        if (view_id, day, num, entity_id) in seen:
+            return True
+        pair = (_ref_id(lesson.get("teacher")), _ref_id(lesson.get("room")))
+        group_id = _ref_id(lesson.get("group"))
+        return any(
+            group == group_id and _wildcard_match(pair, (teacher, room))
+            for teacher, room, group in partial.get((view_id, day, num), ())
+        )
+
+    report = _Report(max_examples)
+    for (domain, entity_id, day, num), activities in slots.items():
+        kind = _slot_conflicts(domain, activities)
+        if kind:
+            report.add(
+                kind,
+                {
+                    "entity": entity_id,
+                    "day": day,
+                    "lesson_num": num,
+                    "lessons": [_lesson_summary(lesson) for lesson in activities.values()],
+                },
+            )
+
+    # Niezgodności widoków sprawdzamy tylko wobec planów, które w ogóle mają lekcje.
+    for owner_id, lessons in timetables.items():
+        owner_domain = domain_of.get(owner_id)
+        for lesson in lessons:
+            day = lesson.get("day") or ""
+            num = lesson.get("lesson_num") or ""
+            if owner_domain == "classes":
+                checks = (
+                    ("missing_in_teacher_view", _ref_id(lesson.get("teacher")), "teachers"),
+                    ("missing_in_room_view", _ref_id(lesson.get("room")), "rooms"),
+                )
+                for kind, other_id, domain in checks:
+                    if domain_of.get(other_id) == domain and timetables.get(other_id) and not in_view(other_id, day, num, owner_id, lesson):
+                        report.add(kind, {"entity": owner_id, "view": other_id, "day": day, "lesson_num": num, "lesson": _lesson_summary(lesson)})
+            elif owner_domain in ("teachers", "rooms"):
+                class_id = _ref_id(lesson.get("group"))
+                if domain_of.get(class_id) != "classes" or not timetables.get(class_id):
+                    continue
+                if in_view(class_id, day, num, owner_id, lesson):
+                    continue
+                if _subgroup_mark(lesson) and (class_id, day, num) in busy:
+                    continue
+                report.add(
+                    "missing_in_class_view",
+                    {"entity": owner_id, "view": class_id, "day": day, "lesson_num": num, "lesson": _lesson_summary(lesson)},
+                )
+
+    metadata = final_data.get("metadata", {})
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "source": metadata.get("source", ""),
+        "generation_date": metadata.get("generation_date_from_page", ""),
+        "summary": report.summary,
+        "examples": {kind: examples for kind, examples in report.examples.items() if examples},
+    }
+
+
+def summary_line(report):
+    parts = [f"{kind}={count}" for kind, count in report["summary"].items()]
+    return f"Kontrola spójności planu: {', '.join(parts)}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default=DEFAULT_FILE, help="plik timetable_data.json")
+    parser.add_argument("--examples", type=int, default=MAX_EXAMPLES, help="maksymalna liczba przykładów na rodzaj")
+    args = parser.parse_args(argv)
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            final_data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False))
+        return 1
+    report = build_report(final_data, max(0, args.examples))
+    print(json.dumps({"ok": True, "data": report}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Publikacja planu jako osobnych plików encji (public/timetables/<id>.json) z manifestem.
+
+Manifest (manifest.json) zawiera metadata, słowniki nazw (teachers/rooms/classes) oraz dla
+każdej encji: nazwę pliku, skrót SHA-256 i rozmiar treści. Pliki encji są zapisywane
+atomowo i tylko wtedy, gdy ich treść się zmieniła; manifest zapisywany jest na końcu,
+a pliki, do których manifest już się nie odwołuje, są usuwane.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = "timetable-shards"
+MANIFEST_VERSION = 1
+
+_SAFE_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._+-]{0,100}$")
+
+
+def shard_filename(entity_id):
+    """Nazwa pliku encji; id z nietypowymi znakami dostają nazwę ze skrótu (mapowanie jest w manifeście)."""
+    if _SAFE_ID_RE.match(entity_id) and entity_id != MANIFEST_FILE[: -len(".json")]:
+        return f"{entity_id}.json"
+    return "x" + hashlib.sha256(entity_id.encode("utf-8")).hexdigest()[:24] + ".json"
+
+
+def entity_domain(final_data, entity_id):
+    for domain in ("classes", "teachers", "rooms"):
+        if entity_id in final_data.get(domain, {}):
+            return domain
+    return None
+
+
+def encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_bytes_atomic(path, payload):
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_manifest(shard_dir):
+    try:
+        with open(os.path.join(shard_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+def write_shards(final_data, shard_dir):
+    """Zapisuje pliki encji i manifest. Zwraca statystyki (zapisane/pominięte/usunięte, bajty)."""
+    os.makedirs(shard_dir, exist_ok=True)
+    previous = (load_manifest(shard_dir) or {}).get("entities", {})
+    stats = {"shards": 0, "written": 0, "unchanged": 0, "removed": 0, "bytes_written": 0}
+
+    entities = {}
+    for entity_id, lessons in final_data.get("timetables", {}).items():
+        domain = entity_domain(final_data, entity_id)
+        name = final_data.get(domain, {}).get(entity_id, entity_id) if domain else entity_id
+        payload = encode_json({"id": entity_id, "domain": domain, "name": name, "lessons": lessons})
+        digest = hashlib.sha256(payload).hexdigest()
+        filename = shard_filename(entity_id)
+        path = os.path.join(shard_dir, filename)
+        stats["shards"] += 1
+
+        old = previous.get(entity_id)
+        if (
+            old
+            and old.get("sha256") == digest
+            and old.get("file") == filename
+            and os.path.exists(path)
+            and os.path.getsize(path) == len(payload)
+        ):
+            stats["unchanged"] += 1
+        else:
+            _write_bytes_atomic(path, payload)
+            stats["written"] += 1
+            stats["bytes_written"] += len(payload)
+
+        entities[entity_id] = {"domain": domain, "file": filename, "sha256": digest, "size": len(payload)}
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "metadata": final_data.get("metadata", {}),
+        "teachers": final_data.get("teachers", {}),
+        "rooms": final_data.get("rooms", {}),
+        "classes": final_data.get("classes", {}),
+        "entities": entities,
+    }
+    payload = encode_json(manifest)
+    _write_bytes_atomic(os.path.join(shard_dir, MANIFEST_FILE), payload)
+    stats["bytes_written"] += len(payload)
+
+    live = {entry["file"] for entry in entities.values()}
+    live.add(MANIFEST_FILE)
+    for name in os.listdir(shard_dir):
+        if name.endswith(".json") and name not in live:
+            try:
+                os.remove(os.path.join(shard_dir, name))
+                stats["removed"] += 1
+            except OSError:
+                pass
+    return stats
@@ -0,0 +1,191 @@
+"""
+Znormalizowany format planu (v2) i czytnik referencyjny.
+
+W formacie v1 (timetable_data.json) ta sama lekcja występuje do trzech razy (oddział,
+nauczyciel, sala), a każde wystąpienie powtarza pełne obiekty {"id","name"} oraz napisy
+dnia i godzin. Format v2 trzyma:
+
+- "days"      - tablicę nazw dni,
+- "bells"     - numer lekcji -> godziny (najczęstsze dla danego numeru),
+- "subjects"  - tablicę przedmiotów,
+- "refs"      - tablicę par [id, nazwa] używanych jako teacher/group/room,
+- "lessons"   - tablicę unikalnych lekcji [dzień, numer, godziny|null, przedmiot, nauczyciel, grupa, sala]
+                (indeksy do powyższych tablic, -1 dla braku; godziny null = z "bells"),
+- "timetables" - id encji -> lista indeksów lekcji.
+
+expand() odtwarza dokładnie kształt v1 (te same klucze i kolejność).
+
+Użycie:
+    python timetable_v2.py convert WEJŚCIE_V1 WYJŚCIE_V2   # konwersja + kontrola round-trip
+"""
+
+import json
+import os
+import sys
+from collections import Counter
+
+
+FORMAT_NAME = "timetable-v2"
+FORMAT_VERSION = 2
+
+
+class _Interner:
+    __slots__ = ("index", "items")
+
+    def __init__(self):
+        self.index = {}
+        self.items = []
+
+    def add(self, key, item=None):
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.items)
+            self.index[key] = idx
+            self.items.append(key if item is None else item)
+        return idx
+
+
+def _ref_key(ref):
+    if not ref:
+        return None
+    return (ref.get("id"), ref.get("name"))
+
+
+def compact(final_data):
+    """Zamienia dane w kształcie v1 na dokument v2."""
+    timetables = final_data.get("timetables", {})
+
+    bell_votes = {}
+    for lessons in timetables.values():
+        for lesson in lessons:
+            bell_votes.setdefault(lesson.get("lesson_num", ""), Counter())[lesson.get("time", "")] += 1
+    # Najczęstsze godziny dla numeru lekcji; przy remisie pierwsze napotkane (Counter zachowuje kolejność).
+    bells = {num: votes.most_common(1)[0][0] for num, votes in bell_votes.items()}
+
+    days = _Interner()
+    subjects = _Interner()
+    refs = _Interner()
+    lessons_table = _Interner()
+    out_timetables = {}
+
+    def ref_idx(ref):
+        key = _ref_key(ref)
+        if key is None:
+            return -1
+        return refs.add(key, [key[0], key[1]])
+
+    for entity_id, lessons in timetables.items():
+        indices = []
+        for lesson in lessons:
+            lesson_num = lesson.get("lesson_num", "")
+            time = lesson.get("time", "")
+            row = (
+                days.add(lesson.get("day", "")),
+                lesson_num,
+                None if bells.get(lesson_num) == time else time,
+                subjects.add(lesson.get("subject", "")),
+                ref_idx(lesson.get("teacher")),
+                ref_idx(lesson.get("group")),
+                ref_idx(lesson.get("room")),
+            )
+            indices.append(lessons_table.add(row, list(row)))
+        out_timetables[entity_id] = indices
+
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "metadata": final_data.get("metadata", {}),
+        "teachers": final_data.get("teachers", {}),
+        "rooms": final_data.get("rooms", {}),
+        "classes": final_data.get("classes", {}),
+        "days": days.items,
+        "bells": bells,
+        "subjects": subjects.items,
+        "refs": refs.items,
+        "lessons": lessons_table.items,
+        "timetables": out_timetables,
+    }
+
+
+def is_v2(doc):
+    return isinstance(doc, dict) and doc.get("format") == FORMAT_NAME
+
+
+def expand(doc):
+    """Czytnik referencyjny: dokument v2 -> dane w kształcie v1.
+
+    Obiekty lekcji są współdzielone między encjami wskazującymi ten sam indeks - wynik
+    należy traktować jako tylko do odczytu.
+    """
+    if not is_v2(doc):
+        raise ValueError("To nie jest dokument timetable-v2")
+    if doc.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja timetable-v2: {doc.get('version')}")
+
+    days = doc["days"]
+    bells = doc["bells"]
+    subjects = doc["subjects"]
+    refs = doc["refs"]
+
+    def ref(idx):
+        if idx < 0:
+            return None
+        ref_id, name = refs[idx]
+        return {"id": ref_id, "name": name}
+
+    lessons = []
+    for day, lesson_num, time, subject, teacher, group, room in doc["lessons"]:
+        lessons.append(
+            {
+                "day": days[day],
+                "lesson_num": lesson_num,
+                "time": bells.get(lesson_num, "") if time is None else time,
+                "subject": subjects[subject],
+                "teacher": ref(teacher),
+                "group": ref(group),
+                "room": ref(room),
+            }
+        )
+
+    return {
+        "metadata": doc.get("metadata", {}),
+        "teachers": doc.get("teachers", {}),
+        "rooms": doc.get("rooms", {}),
+        "classes": doc.get("classes", {}),
+        "timetables": {
+            entity_id: [lessons[idx] for idx in indices]
+            for entity_id, indices in doc["timetables"].items()
+        },
+    }
+
+
+def dump(doc, f):
+    json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def convert(src, dst):
+    with open(src, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    doc = compact(data)
+    if expand(json.loads(json.dumps(doc))) != data:
+        print("Round-trip v1 -> v2 -> v1 daje inne dane!")
+        return False
+    with open(dst, "w", encoding="utf-8") as f:
+        dump(doc, f)
+    lesson_refs = sum(len(v) for v in data.get("timetables", {}).values())
+    print(
+        f"{src}: {os.path.getsize(src)} B -> {dst}: {os.path.getsize(dst)} B "
+        f"(lekcje: {lesson_refs} wystąpień, {len(doc['lessons'])} unikalnych)"
+    )
+    return True
+
+
+def main(argv):
+    if len(argv) != 4 or argv[1] != "convert":
+        print(__doc__)
+        return 2
+    return 0 if convert(argv[2], argv[3]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
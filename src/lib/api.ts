@@ -11,6 +11,7 @@ export const Meta = z.object({
   source: z.string().optional(),
   scraped_on: z.string().optional(),
   generation_date_from_page: z.string().optional(),
+  source_fingerprint: z.string().optional(),
 })
 export const RefObj = z.object({ id: z.string(), name: z.string() }).nullable()
 export const Lesson = z.object({
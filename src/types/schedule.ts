@@ -6,6 +6,7 @@ export type Meta = {
   source?: string;
   scraped_on?: string;
   generation_date_from_page?: string;
+  source_fingerprint?: string;
 };
 
 export type RefObj = { id: string; name: string } | null;